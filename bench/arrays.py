@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+
+# Compares running the model in bench/batch.gr once per start value
+# against running it once for an array of all start values.
+#
+# Usage: python bench/arrays.py [start values]
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from grape import Grape
+
+MODEL = os.path.join(ROOT, "bench", "batch.gr")
+
+def measure(grape: Grape, source: str) -> float:
+    start = time.perf_counter()
+    grape.run(source)
+
+    if grape.errorHandler.hadError:
+        sys.exit(1)
+
+    return (time.perf_counter() - start) * 1000
+
+def main(argv: list[str]) -> int:
+    # The loop over the start values is recursive as well
+    sys.setrecursionlimit(100000)
+
+    count = int(argv[1]) if len(argv) > 1 else 1000
+
+    grape = Grape()
+    grape.debug = False
+    grape.engine = "closures"
+    grape.runFile(MODEL)
+    grape.run("fn each(i, n) do\n  if i < n do\n    run(B, i, 0, 100, 1)\n    each(i + 1, n)\n  end\nend\n")
+    grape.run("starts = array([" + ", ".join(str(n) for n in range(count)) + "])\n")
+
+    scalars = measure(grape, "each(0, " + str(count) + ")\n")
+    batch = measure(grape, "run(B, starts, 0, 100, 1)\n")
+
+    print("one run per start value: " + format(scalars, ".1f") + " ms")
+    print("one run for all " + str(count) + " start values: " + format(batch, ".1f") + " ms (" + format(scalars / batch, ".1f") + "x)")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
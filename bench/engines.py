@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+
+# Compares the execution engines on the simulation loop of
+# examples/model.gr (bench/model.gr is the same loop, written without
+# the imports that the parser doesn't support yet).
+# The program is parsed once, and only executing it is timed.
+#
+# Usage: python bench/engines.py [runs]
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from grape import Grape
+
+MODEL = os.path.join(ROOT, "bench", "model.gr")
+
+def measure(engine: str, runs: int) -> float:
+    grape = Grape()
+    grape.debug = False
+    grape.engine = engine
+
+    ast = grape.checkFile(MODEL)
+    times = []
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        grape.interpret(ast)
+        times.append((time.perf_counter() - start) * 1000)
+
+        if grape.errorHandler.hadError:
+            sys.exit(1)
+
+    return statistics.median(times)
+
+def main(argv: list[str]) -> int:
+    runs = int(argv[1]) if len(argv) > 1 else 50
+    baseline = None
+
+    for engine in Grape.ENGINES:
+        median = measure(engine, runs)
+        baseline = baseline or median
+
+        print(engine + ": " + format(median, ".2f") + " ms (" + format(baseline / median, ".2f") + "x)")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+
+# Compares building a long string out of many short pieces with ropes
+# against building it with plain string concatenation.
+#
+# Usage: python bench/ropes.py [pieces in thousands]
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+import ropes
+from grape import Grape
+
+# Appends a character n * 1000 times. The loops are recursive, so two of
+# them keep the recursion 2000 calls deep instead of one per piece.
+SOURCE = "fn inner(j, s) do\n" \
+    "  if j > 0 do\n    inner(j - 1, s + \"x\")\n  else\n    s\n  end\nend\n" \
+    "fn outer(i, s) do\n" \
+    "  if i > 0 do\n    outer(i - 1, inner(1000, s))\n  else\n    s\n  end\nend\n"
+
+def measure(count: int) -> float:
+    grape = Grape()
+    grape.debug = False
+    grape.engine = "closures"
+
+    # The strings are arguments, so caching the calls
+    # would only measure hashing them.
+    grape.memoSize = 0
+
+    grape.run(SOURCE)
+
+    start = time.perf_counter()
+    grape.run("s = outer(" + str(count) + ", \"a\")\n")
+    grape.run("if len(s) != " + str(count * 1000 + 1) + " do print(\"wrong length\")\n")
+
+    if grape.errorHandler.hadError:
+        sys.exit(1)
+
+    return time.perf_counter() - start
+
+def main(argv: list[str]) -> int:
+    sys.setrecursionlimit(100000)
+
+    count = int(argv[1]) if len(argv) > 1 else 1000
+
+    threshold = ropes.ROPE_THRESHOLD
+    withRopes = measure(count)
+
+    # Never make a rope
+    ropes.ROPE_THRESHOLD = float("inf")
+    strings = measure(count)
+    ropes.ROPE_THRESHOLD = threshold
+
+    print(str(count * 1000) + " appends with ropes: " + format(withRopes, ".2f") + " s")
+    print(str(count * 1000) + " appends with strings: " + format(strings, ".2f") + " s (" + format(strings / withRopes, ".1f") + "x)")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
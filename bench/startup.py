@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+# Measures how long it takes the CLI to start, and which imports that
+# time goes to (using `python -X importtime`). Exits with 1 when one of
+# the commands takes longer than its budget.
+#
+# Usage: python bench/startup.py [runs]
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GRAPE = os.path.join(ROOT, "src", "grape.py")
+SMALL = os.path.join(ROOT, "bench", "small.gr")
+
+# Budgets in milliseconds, for the median of all runs. These include
+# starting the Python interpreter itself, which is measured separately.
+COMMANDS = [
+    ("python", [sys.executable, "-c", "pass"], None),
+    ("grape --help", [sys.executable, GRAPE, "--help"], 75),
+    ("grape check small.gr", [sys.executable, GRAPE, "check", SMALL], 125),
+]
+
+# The amount of imports to show in the breakdown.
+TOP = 8
+
+def measure(command: list[str], runs: int) -> float:
+    times = []
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append((time.perf_counter() - start) * 1000)
+
+    return statistics.median(times)
+
+# Parse the output of -X importtime into (cumulative, self, module)
+# rows, which are in microseconds.
+def imports(command: list[str]) -> list[tuple[int, int, str]]:
+    process = subprocess.run([command[0], "-X", "importtime"] + command[1:], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    rows = []
+
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+
+        (own, cumulative, module) = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), int(own), module.strip()))
+
+    return sorted(rows, reverse=True)
+
+def main(argv: list[str]) -> int:
+    runs = int(argv[1]) if len(argv) > 1 else 20
+    failed = False
+
+    for (name, command, budget) in COMMANDS:
+        median = measure(command, runs)
+
+        if budget is None:
+            print(name + ": " + format(median, ".1f") + " ms")
+            continue
+
+        ok = median <= budget
+        failed = failed or not ok
+
+        print(name + ": " + format(median, ".1f") + " ms (budget " + str(budget) + " ms) " + ("OK" if ok else "OVER BUDGET"))
+
+        for (cumulative, own, module) in imports(command)[:TOP]:
+            print("  " + format(cumulative / 1000, "7.1f") + " ms  " + format(own / 1000, "7.1f") + " ms  " + module)
+
+        print("")
+
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
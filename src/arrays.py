@@ -0,0 +1,177 @@
+import importlib
+import math
+import operator
+from array import array
+from decimal import *
+from syntax.tokens import *
+
+# NumPy is optional. It is imported the first time an array is created,
+# so programs without arrays don't pay for importing it.
+numpy = None
+loaded = False
+
+def backend():
+    global numpy, loaded
+
+    if not loaded:
+        loaded = True
+
+        try:
+            numpy = importlib.import_module("numpy")
+        except ImportError:
+            numpy = None
+
+    return numpy
+
+# The operators arrays support, and the Python
+# functions that apply them to every element.
+OPERATIONS = {
+    TokenType.PLUS: operator.add,
+    TokenType.MINUS: operator.sub,
+    TokenType.STAR: operator.mul,
+    TokenType.SLASH: operator.truediv,
+    TokenType.PERCENT: operator.mod,
+    TokenType.ROOF: operator.pow,
+    TokenType.GREATER: operator.gt,
+    TokenType.GREATER_EQUAL: operator.ge,
+    TokenType.LESS: operator.lt,
+    TokenType.LESS_EQUAL: operator.le,
+    TokenType.EQUAL_EQUAL: operator.eq,
+    TokenType.BANG_EQUAL: operator.ne
+}
+
+# A flat array of floats, so a whole batch of numbers goes through a
+# model in one go instead of one number at a time. Operators work on
+# every element, and numbers are broadcast to every element. Backed by
+# NumPy when it is installed, and by the array module otherwise.
+# Comparisons give arrays of 1s and 0s.
+class NumericArray:
+    def __init__(self, values):
+        self.values = values
+
+    def of(items) -> "NumericArray":
+        floats = [float(item) for item in items]
+
+        if not all(map(math.isfinite, floats)):
+            raise ValueError("Number is too large")
+
+        if backend() is not None:
+            return NumericArray(numpy.array(floats, dtype=numpy.float64))
+        else:
+            return NumericArray(array("d", floats))
+
+    # The numbers start, start + step, ... as an array
+    # of the given length, without going through a list.
+    def arange(start: Decimal, step: Decimal, length: int) -> "NumericArray":
+        if backend() is not None:
+            return NumericArray(numpy.arange(length, dtype=numpy.float64) * float(step) + float(start))
+        else:
+            return NumericArray(array("d", (float(start + i * step) for i in range(length))))
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __iter__(self):
+        return iter(self.values)
+
+    # Raises an IndexError when the index is out of range.
+    def __getitem__(self, index: int) -> float:
+        return float(self.values[index])
+
+    def sum(self) -> float:
+        if numpy is not None:
+            with numpy.errstate(over="ignore"):
+                total = float(self.values.sum())
+        else:
+            total = float(sum(self.values))
+
+        if not math.isfinite(total):
+            raise ValueError("Number is too large")
+
+        return total
+
+    def negate(self) -> "NumericArray":
+        if numpy is not None:
+            return NumericArray(-self.values)
+        else:
+            return NumericArray(array("d", [-value for value in self.values]))
+
+    # Apply the operator to two operands of which at least one is an
+    # array. Errors are raised as a ValueError with a message, for the
+    # caller to turn into a Grape error.
+    def operate(token: Token, left, right) -> "NumericArray":
+        function = OPERATIONS.get(token.type)
+
+        if function is None:
+            raise ValueError("Operator is not supported for arrays")
+
+        a = NumericArray.unwrap(left)
+        b = NumericArray.unwrap(right)
+
+        if isinstance(left, NumericArray) and isinstance(right, NumericArray) and len(a) != len(b):
+            raise ValueError("Arrays must have the same length")
+
+        if numpy is not None:
+            return NumericArray.vectorized(function, a, b)
+        else:
+            return NumericArray.elementwise(function, a, b)
+
+    def vectorized(function, a, b) -> "NumericArray":
+        try:
+            with numpy.errstate(divide="raise", invalid="raise", over="raise"):
+                result = function(a, b)
+
+        except FloatingPointError as e:
+            raise ValueError(NumericArray.failure(function, str(e)))
+
+        if result.dtype == numpy.bool_:
+            result = result.astype(numpy.float64)
+
+        return NumericArray(result)
+
+    # Python only raises some of the errors that NumPy does, and gives
+    # complex numbers or infinity otherwise, which are errors as well.
+    def elementwise(function, a, b) -> "NumericArray":
+        if isinstance(a, array) and isinstance(b, array):
+            pairs = zip(a, b)
+        elif isinstance(a, array):
+            pairs = ((x, b) for x in a)
+        else:
+            pairs = ((a, y) for y in b)
+
+        try:
+            values = array("d", [float(function(x, y)) for (x, y) in pairs])
+
+        except ZeroDivisionError:
+            raise ValueError("Division by zero")
+
+        except OverflowError:
+            raise ValueError("Number is too large")
+
+        except (TypeError, ValueError):
+            raise ValueError("Result is not a real number")
+
+        if not all(map(math.isfinite, values)):
+            raise ValueError("Number is too large")
+
+        return NumericArray(values)
+
+    # The message of a floating point error of NumPy, the same as the one
+    # of the array module. Zero divided by zero is an invalid value to
+    # NumPy, instead of a division by zero.
+    def failure(function, problem: str) -> str:
+        if "divide" in problem or ("invalid" in problem and function in [operator.truediv, operator.mod]):
+            return "Division by zero"
+        elif "overflow" in problem:
+            return "Number is too large"
+        else:
+            return "Result is not a real number"
+
+    def unwrap(value):
+        if isinstance(value, NumericArray):
+            return value.values
+
+        elif isinstance(value, Decimal):
+            return float(value)
+
+        raise ValueError("Operands must be numbers or arrays")
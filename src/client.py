@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+
+# A thin client for `grape.py serve`. It only imports what it needs to
+# talk to the socket, so it starts a lot quicker than grape.py itself.
+import json
+import os
+import socket
+import sys
+from config import SOCKET_PATH
+
+def usage(name: str):
+    print("Usage: ")
+    print("  " + name + " run [path] [socket]")
+    print("  " + name + " check [path] [socket]")
+
+def main(argv: list[str]) -> int:
+    if len(argv) not in [3, 4] or argv[1] not in ["run", "check"]:
+        usage(argv[0])
+        return 64
+
+    path = argv[3] if len(argv) == 4 else SOCKET_PATH
+    request = {"command": argv[1], "path": os.path.abspath(argv[2])}
+
+    try:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.connect(path)
+
+    except OSError:
+        print("Could not connect to '" + path + "', is `grape.py serve` running?", file=sys.stderr)
+        return 69
+
+    with connection:
+        connection.sendall((json.dumps(request) + "\n").encode())
+
+        for line in connection.makefile("r"):
+            message = json.loads(line)
+
+            if "exit" in message:
+                return message["exit"]
+
+            stream = sys.stderr if message["stream"] == "stderr" else sys.stdout
+            stream.write(message["text"])
+            stream.flush()
+
+    return 70
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
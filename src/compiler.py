@@ -0,0 +1,885 @@
+from decimal import *
+from types import CodeType
+from syntax.tokens import *
+from syntax.ast import *
+from interpreter import *
+
+# A function that was compiled to closures. Like any other Closure it
+# holds one clause per arity, but a clause is a tuple of the parameter
+# names and the compiled body instead of a declaration. Clauses that
+# always return a tuple of the same width also have a spread body,
+# which writes the values of the tuple to the variables of a
+# destructuring instead of returning it. The declarations of the clauses
+# are kept for the sampling profiler.
+class CompiledClosure(Closure):
+    def __init__(self, name: str, closure: Environment):
+        super().__init__(name, closure)
+        self.spreads = {}
+        self.declarations = {}
+
+    def define(self, parameters: list[str], body, spread = None, declaration: Function = None):
+        self.clauses[len(parameters)] = (parameters, body)
+        self.declarations[len(parameters)] = declaration
+        self.memos.pop(len(parameters), None)
+
+        if spread is None:
+            self.spreads.pop(len(parameters), None)
+        else:
+            self.spreads[len(parameters)] = spread
+
+# Executes programs by compiling every node of the AST once into a tree
+# of specialized Python closures, which all take the environment to run
+# in. Running the program then never dispatches on the type of a node or
+# on an operator token again. It has the same interface and semantics as
+# the Interpreter, so Grape can use either one.
+class ClosureCompiler:
+    def __init__(self, grape):
+        self.errorHandler = grape.errorHandler
+
+        self.globals = Environment()
+        self.memoizer = Memoizer(Builtins.PURE, grape.memoSize)
+
+        self.execLimit = grape.execLimit
+        self.shell = None
+
+        self.scheduler = Scheduler(self, grape.settings())
+
+        # The code of the closures that call functions, for stack
+        self.calls = {ClosureCompiler.invoke.__code__} | {code
+            for method in [ClosureCompiler.call, ClosureCompiler.spreadCall]
+            for code in method.__code__.co_consts if isinstance(code, CodeType) and "scope" in code.co_varnames}
+
+        for (name, function) in Builtins.all() + Builtins.higher(self.callValue) + Builtins.processes(self.scheduler):
+            self.globals.define(name, Builtin(name, function))
+
+        self.compilers = {
+            Assignment: self.assignment,
+            Destructuring: self.destructuring,
+            Block: self.block,
+            Line: self.line,
+            Conditional: self.conditional,
+            Named: self.named,
+            Lambda: self.anonymous,
+            Unary: self.unary,
+            Exec: self.exec,
+            Binary: self.binary,
+            Pipe: self.pipe,
+            Call: self.call,
+            Index: self.index,
+            Variable: self.variable,
+            Grouping: self.grouping,
+            Literal: self.literal,
+            List: self.list,
+            Tuple: self.tuple,
+            Record: self.record,
+            Get: self.get
+        }
+
+    def interpret(self, expressions: list[Expr]):
+        self.memoizer.analyze(expressions)
+        self.scheduler.declare(expressions)
+
+        try:
+            value = self.sequence(expressions)(self.globals)
+            self.scheduler.finish()
+
+            return value
+
+        except ExecutionError as e:
+            e.report(self.errorHandler)
+
+        except RecursionError:
+            self.errorHandler.error("Runtime error", 0, 0, "", "Maximum recursion depth exceeded")
+
+    # Call a function from Python, with the same error handling
+    # as interpret.
+    def apply(self, function, arguments: list):
+        try:
+            return self.callValue(function, arguments, None)
+
+        except ExecutionError as e:
+            e.report(self.errorHandler)
+
+        except RecursionError:
+            self.errorHandler.error("Runtime error", 0, 0, "", "Maximum recursion depth exceeded")
+
+    def compile(self, expression: Expr):
+        return self.compilers[type(expression)](expression)
+
+    # The Grape functions that are being called in a Python frame and the
+    # frames below it, as (name, declaration) pairs with the outermost call
+    # first. Functions are called by invoke, and by the closures of calls
+    # and spread calls that run the body themselves. Those only count once
+    # they created the scope of the body, as they call invoke otherwise.
+    def stack(self, frame) -> list[tuple]:
+        stack = []
+
+        while frame is not None:
+            if frame.f_code in self.calls:
+                values = frame.f_locals
+
+                if "scope" in values:
+                    function = values["function"]
+                    stack.append((function.name, function.declarations.get(len(values["values"]))))
+
+            frame = frame.f_back
+
+        stack.reverse()
+        return stack
+
+    # Run the expressions one after another in the
+    # same environment and return the last value.
+    def sequence(self, expressions: list[Expr]):
+        compiled = [self.compile(expression) for expression in expressions]
+
+        if len(compiled) == 0:
+            return lambda env: None
+
+        elif len(compiled) == 1:
+            return compiled[0]
+
+        def sequence(env):
+            for expression in compiled:
+                value = expression(env)
+
+            return value
+
+        return sequence
+
+    def assignment(self, expression: Assignment):
+        name = expression.name.lexeme
+        initializer = self.compile(expression.expression)
+
+        def assignment(env):
+            value = initializer(env)
+            env.values[name] = value
+
+            return value
+
+        return assignment
+
+    # Destructuring evaluates to nil, so the values are written to the
+    # variables one by one and the tuple itself is never needed.
+    def destructuring(self, expression: Destructuring):
+        names = tuple(name.lexeme for name in expression.names)
+        token = expression.names[0]
+        spread = self.spread(expression.expression)
+
+        def destructuring(env):
+            spread(env, env.values, names, token)
+
+        return destructuring
+
+    # Compile an expression whose value is destructured. Instead of a
+    # value, the closure takes the variables to write to (dest), and
+    # the names of the values. Tuple literals, also in the tail of
+    # conditionals and blocks, write their items there directly, and so
+    # do calls to functions that have a spread body. Anything else is
+    # evaluated and unpacked.
+    def spread(self, expression: Expr):
+        if isinstance(expression, Tuple):
+            return self.spreadTuple(expression)
+
+        elif isinstance(expression, Call):
+            return self.spreadCall(expression)
+
+        elif isinstance(expression, (Grouping, Line)):
+            return self.spread(expression.expression)
+
+        elif isinstance(expression, Conditional):
+            return self.spreadConditional(expression)
+
+        elif isinstance(expression, Block) and expression.expressions:
+            body = self.spreadSequence(expression.expressions)
+            return lambda env, dest, names, token: body(Environment(env), dest, names, token)
+
+        value = self.compile(expression)
+
+        def spread(env, dest, names, token):
+            values = Builtins.unpack(token, value(env), len(names))
+
+            for (name, item) in zip(names, values):
+                dest[name] = item
+
+        return spread
+
+    def spreadTuple(self, expression: Tuple):
+        concurrent = self.concurrent(expression.items)
+
+        if concurrent is not None:
+            def spread(env, dest, names, token):
+                values = Builtins.unpack(token, concurrent(env), len(names))
+
+                for (name, item) in zip(names, values):
+                    dest[name] = item
+
+            return spread
+
+        items = [self.compile(item) for item in expression.items]
+        width = len(items)
+
+        # All items are evaluated before anything is written, as
+        # they might read the variables that are assigned to.
+        if width == 2:
+            (first, second) = items
+
+            def pair(env, dest, names, token):
+                if len(names) != 2:
+                    raise ExecutionError(token, "Expected a tuple of " + str(len(names)) + " values to destructure")
+
+                a = first(env)
+                b = second(env)
+
+                dest[names[0]] = a
+                dest[names[1]] = b
+
+            return pair
+
+        def spread(env, dest, names, token):
+            if len(names) != width:
+                raise ExecutionError(token, "Expected a tuple of " + str(len(names)) + " values to destructure")
+
+            values = [item(env) for item in items]
+
+            for (name, item) in zip(names, values):
+                dest[name] = item
+
+        return spread
+
+    def spreadCall(self, expression: Call):
+        callToken = expression.closingParenToken
+        callee = self.compile(expression.callee)
+        arguments = [self.compile(argument) for argument in expression.arguments]
+
+        def spread(env, dest, names, token):
+            function = callee(env)
+            values = [argument(env) for argument in arguments]
+
+            if type(function) is CompiledClosure:
+                body = function.spreads.get(len(values))
+
+                if body is not None and body[0] == len(names):
+                    (parameters, _) = function.clause(values, callToken)
+                    memo = function.memos.get(len(values))
+                    key = None if memo is None else Memo.key(values)
+
+                    if key is not None:
+                        cached = memo.get(key)
+
+                        # A memoized function spreads into numbered slots,
+                        # which become the tuple that is cached.
+                        if cached is Memo.MISSING:
+                            slots = [None] * len(names)
+
+                            scope = Environment(function.closure)
+                            scope.values = dict(zip(parameters, values))
+
+                            body[1](scope, slots, range(len(names)), token)
+
+                            cached = tuple(slots)
+                            memo.put(key, cached)
+
+                        for (name, item) in zip(names, cached):
+                            dest[name] = item
+
+                        return
+
+                    scope = Environment(function.closure)
+                    scope.values = dict(zip(parameters, values))
+
+                    return body[1](scope, dest, names, token)
+
+            value = self.callValue(function, values, callToken)
+            values = Builtins.unpack(token, value, len(names))
+
+            for (name, item) in zip(names, values):
+                dest[name] = item
+
+        return spread
+
+    def spreadConditional(self, expression: Conditional):
+        condition = self.compile(expression.condition)
+        ifBranch = self.spread(expression.ifBranch)
+
+        if expression.elseBranch is None:
+            def elseBranch(env, dest, names, token):
+                Builtins.unpack(token, None, len(names))
+        else:
+            elseBranch = self.spread(expression.elseBranch)
+
+        def conditional(env, dest, names, token):
+            value = condition(env)
+
+            if value is not None and value is not False:
+                ifBranch(env, dest, names, token)
+            else:
+                elseBranch(env, dest, names, token)
+
+        return conditional
+
+    # Run all expressions but the last one, and spread the last one.
+    def spreadSequence(self, expressions: list[Expr]):
+        first = self.sequence(expressions[:-1])
+        last = self.spread(expressions[-1])
+
+        def sequence(env, dest, names, token):
+            first(env)
+            last(env, dest, names, token)
+
+        return sequence
+
+    # The width of the tuple a function body always returns, if that is
+    # known from its code: every tail position is either a tuple literal
+    # of that width or a call. Calls that turn out to return something
+    # else are unpacked like any other value.
+    def width(self, body: Scoped) -> int:
+        widths = set()
+        tails = [body]
+
+        while tails:
+            expression = tails.pop()
+
+            if isinstance(expression, Block) and expression.expressions:
+                tails.append(expression.expressions[-1])
+
+            elif isinstance(expression, (Line, Grouping)):
+                tails.append(expression.expression)
+
+            elif isinstance(expression, Conditional) and expression.elseBranch is not None:
+                tails += [expression.ifBranch, expression.elseBranch]
+
+            elif isinstance(expression, Tuple):
+                widths.add(len(expression.items))
+
+            elif not isinstance(expression, Call):
+                return None
+
+        return widths.pop() if len(widths) == 1 else None
+
+    def block(self, expression: Block):
+        body = self.sequence(expression.expressions)
+        return lambda env: body(Environment(env))
+
+    def line(self, expression: Line):
+        return self.compile(expression.expression)
+
+    def conditional(self, expression: Conditional):
+        condition = self.compile(expression.condition)
+        ifBranch = self.compile(expression.ifBranch)
+
+        if expression.elseBranch is None:
+            elseBranch = lambda env: None
+        else:
+            elseBranch = self.compile(expression.elseBranch)
+
+        def conditional(env):
+            value = condition(env)
+
+            if value is not None and value is not False:
+                return ifBranch(env)
+            else:
+                return elseBranch(env)
+
+        return conditional
+
+    def named(self, expression: Named):
+        name = expression.name.lexeme
+        parameters = [parameter.lexeme for parameter in expression.parameters]
+        body = self.body(expression.body)
+        spread = self.spreadBody(expression.body)
+
+        # Memos are shared by every closure of the declaration,
+        # so this can be looked up when it's compiled.
+        memo = self.memoizer.memo(expression, name)
+
+        # Defining a function with a new arity adds a clause to the
+        # existing function instead of replacing it.
+        def named(env):
+            function = env.values.get(name)
+
+            if not isinstance(function, CompiledClosure):
+                function = CompiledClosure(name, env)
+                env.values[name] = function
+
+            function.define(parameters, body, spread, expression)
+
+            if memo is not None:
+                function.memos[len(parameters)] = memo
+
+            return function
+
+        return named
+
+    def anonymous(self, expression: Lambda):
+        parameters = [parameter.lexeme for parameter in expression.parameters]
+        body = self.body(expression.body)
+        spread = self.spreadBody(expression.body)
+        memo = self.memoizer.memo(expression, "fn")
+
+        def anonymous(env):
+            function = CompiledClosure("fn", env)
+            function.define(parameters, body, spread, expression)
+
+            if memo is not None:
+                function.memos[len(parameters)] = memo
+
+            return function
+
+        return anonymous
+
+    # The body of a function runs directly in the
+    # environment that holds its arguments.
+    def body(self, body: Scoped):
+        if isinstance(body, Block):
+            return self.sequence(body.expressions)
+        else:
+            return self.compile(body.expression)
+
+    # The width and spread version of a function body,
+    # if it always returns a tuple of the same width.
+    def spreadBody(self, body: Scoped) -> tuple:
+        width = self.width(body)
+
+        if width is None:
+            return None
+        elif isinstance(body, Block):
+            return (width, self.spreadSequence(body.expressions))
+        else:
+            return (width, self.spread(body.expression))
+
+    def unary(self, expression: Unary):
+        operator = expression.operator
+        right = self.compile(expression.right)
+
+        if operator.type == TokenType.MINUS:
+            def negate(env):
+                value = right(env)
+
+                if type(value) is Decimal:
+                    return -value
+
+                return Builtins.negate(operator, value)
+
+            return negate
+
+        def negation(env):
+            value = right(env)
+            return value is None or value is False
+
+        return negation
+
+    def exec(self, expression: Exec):
+        token = expression.operator
+        command = self.compile(expression.right)
+
+        return lambda env: Builtins.output(token, Builtins.start(self, token, command(env)))
+
+    def binary(self, expression: Binary):
+        operator = expression.operator
+        left = self.compile(expression.left)
+        right = self.compile(expression.right)
+
+        match operator.type:
+            case TokenType.AND:
+                def logicAnd(env):
+                    value = left(env)
+                    return right(env) if value is not None and value is not False else value
+
+                return logicAnd
+
+            case TokenType.OR:
+                def logicOr(env):
+                    value = left(env)
+                    return value if value is not None and value is not False else right(env)
+
+                return logicOr
+
+            case TokenType.EQUAL_EQUAL | TokenType.BANG_EQUAL | TokenType.PLUS | TokenType.MINUS | TokenType.STAR | TokenType.GREATER | TokenType.GREATER_EQUAL | TokenType.LESS | TokenType.LESS_EQUAL:
+                return self.arithmetic(operator, left, right)
+
+            case TokenType.SLASH | TokenType.PERCENT | TokenType.ROOF:
+                return self.division(operator, left, right)
+
+        def binary(env):
+            return Builtins.operate(operator, left(env), right(env))
+
+        return binary
+
+    # Numbers take the fast path straight to the Python operator,
+    # everything else goes through Builtins.operate, which knows how
+    # to add strings and lists, broadcasts arrays and reports type errors.
+    def arithmetic(self, operator: Token, left, right):
+        match operator.type:
+            case TokenType.EQUAL_EQUAL:
+                def equal(env):
+                    a = left(env)
+                    b = right(env)
+
+                    if type(a) is Decimal and type(b) is Decimal:
+                        return a == b
+
+                    return Builtins.operate(operator, a, b)
+
+                return equal
+
+            case TokenType.BANG_EQUAL:
+                def notEqual(env):
+                    a = left(env)
+                    b = right(env)
+
+                    if type(a) is Decimal and type(b) is Decimal:
+                        return a != b
+
+                    return Builtins.operate(operator, a, b)
+
+                return notEqual
+
+            case TokenType.PLUS:
+                def plus(env):
+                    a = left(env)
+                    b = right(env)
+
+                    if type(a) is Decimal and type(b) is Decimal:
+                        try:
+                            return a + b
+                        except ArithmeticError:
+                            pass
+
+                    return Builtins.operate(operator, a, b)
+
+                return plus
+
+            case TokenType.MINUS:
+                def minus(env):
+                    a = left(env)
+                    b = right(env)
+
+                    if type(a) is Decimal and type(b) is Decimal:
+                        try:
+                            return a - b
+                        except ArithmeticError:
+                            pass
+
+                    return Builtins.operate(operator, a, b)
+
+                return minus
+
+            case TokenType.STAR:
+                def star(env):
+                    a = left(env)
+                    b = right(env)
+
+                    if type(a) is Decimal and type(b) is Decimal:
+                        try:
+                            return a * b
+                        except ArithmeticError:
+                            pass
+
+                    return Builtins.operate(operator, a, b)
+
+                return star
+
+            case TokenType.GREATER:
+                def greater(env):
+                    a = left(env)
+                    b = right(env)
+
+                    if type(a) is Decimal and type(b) is Decimal:
+                        return a > b
+
+                    return Builtins.operate(operator, a, b)
+
+                return greater
+
+            case TokenType.GREATER_EQUAL:
+                def greaterEqual(env):
+                    a = left(env)
+                    b = right(env)
+
+                    if type(a) is Decimal and type(b) is Decimal:
+                        return a >= b
+
+                    return Builtins.operate(operator, a, b)
+
+                return greaterEqual
+
+            case TokenType.LESS:
+                def less(env):
+                    a = left(env)
+                    b = right(env)
+
+                    if type(a) is Decimal and type(b) is Decimal:
+                        return a < b
+
+                    return Builtins.operate(operator, a, b)
+
+                return less
+
+            case TokenType.LESS_EQUAL:
+                def lessEqual(env):
+                    a = left(env)
+                    b = right(env)
+
+                    if type(a) is Decimal and type(b) is Decimal:
+                        return a <= b
+
+                    return Builtins.operate(operator, a, b)
+
+                return lessEqual
+
+    # Division, modulo and powers can fail on numbers as well. Failed
+    # arithmetic, here and in binary, is done again by Builtins.operate,
+    # so both engines report it with the same error.
+    def division(self, operator: Token, left, right):
+        match operator.type:
+            case TokenType.SLASH:
+                def slash(env):
+                    a = left(env)
+                    b = right(env)
+
+                    if type(a) is Decimal and type(b) is Decimal:
+                        try:
+                            return a / b
+                        except ArithmeticError:
+                            pass
+
+                    return Builtins.operate(operator, a, b)
+
+                return slash
+
+            case TokenType.PERCENT:
+                def percent(env):
+                    a = left(env)
+                    b = right(env)
+
+                    if type(a) is Decimal and type(b) is Decimal:
+                        try:
+                            return a % b
+                        except ArithmeticError:
+                            pass
+
+                    return Builtins.operate(operator, a, b)
+
+                return percent
+
+            case TokenType.ROOF:
+                def roof(env):
+                    a = left(env)
+                    b = right(env)
+
+                    if type(a) is Decimal and type(b) is Decimal:
+                        try:
+                            value = a ** b
+                            if value.is_finite(): return value
+                        except ArithmeticError:
+                            pass
+
+                    return Builtins.operate(operator, a, b)
+
+                return roof
+
+    # A stage that is a call gets the value as its first argument,
+    # any other stage is called with just the value. The value is
+    # evaluated together with the other arguments, after the callee.
+    def pipe(self, expression: Pipe):
+        stage = expression.right
+
+        if isinstance(stage, Call):
+            token = stage.closingParenToken
+            callee = self.compile(stage.callee)
+            concurrent = self.concurrent([expression.left] + stage.arguments)
+
+            if concurrent is not None:
+                return lambda env: self.callValue(callee(env), concurrent(env), token)
+
+            value = self.compile(expression.left)
+            arguments = [self.compile(argument) for argument in stage.arguments]
+
+            def pipe(env):
+                function = callee(env)
+                values = [value(env)]
+                values += [argument(env) for argument in arguments]
+
+                return self.callValue(function, values, token)
+
+            return pipe
+
+        token = expression.operator
+        value = self.compile(expression.left)
+        callee = self.compile(stage)
+
+        def pipe(env):
+            values = [value(env)]
+            return self.callValue(callee(env), values, token)
+
+        return pipe
+
+    def call(self, expression: Call):
+        token = expression.closingParenToken
+        callee = self.compile(expression.callee)
+        concurrent = self.concurrent(expression.arguments)
+
+        if concurrent is not None:
+            return lambda env: self.callValue(callee(env), concurrent(env), token)
+
+        arguments = [self.compile(argument) for argument in expression.arguments]
+
+        def call(env):
+            function = callee(env)
+            values = [argument(env) for argument in arguments]
+
+            if type(function) is CompiledClosure and not function.memos:
+                (parameters, body) = function.clause(values, token)
+
+                scope = Environment(function.closure)
+                scope.values = dict(zip(parameters, values))
+
+                return body(scope)
+
+            return self.callValue(function, values, token)
+
+        return call
+
+    def callValue(self, function, values: list, token: Token):
+        if isinstance(function, CompiledClosure):
+            return self.invoke(function, values, token)
+
+        elif isinstance(function, Builtin):
+            return function.call(values, token)
+
+        raise ExecutionError(token, "Can only call functions")
+
+    # Call a compiled function, through its cache if it has one.
+    def invoke(self, function: CompiledClosure, values: list, token: Token):
+        (parameters, body) = function.clause(values, token)
+        memo = function.memos.get(len(values))
+        key = None if memo is None else Memo.key(values)
+
+        if key is not None:
+            value = memo.get(key)
+            if value is not Memo.MISSING: return value
+
+        scope = Environment(function.closure)
+        scope.values = dict(zip(parameters, values))
+
+        value = body(scope)
+
+        if key is not None:
+            memo.put(key, value)
+
+        return value
+
+    def index(self, expression: Index):
+        token = expression.closingBracketToken
+        collection = self.compile(expression.collection)
+        index = self.compile(expression.index)
+
+        return lambda env: Builtins.index(token, collection(env), index(env))
+
+    def variable(self, expression: Variable):
+        token = expression.name
+        name = token.lexeme
+
+        def variable(env):
+            while env is not None:
+                if name in env.values:
+                    return env.values[name]
+
+                env = env.enclosing
+
+            raise ExecutionError(token, "Undefined variable")
+
+        return variable
+
+    def grouping(self, expression: Grouping):
+        return self.compile(expression.expression)
+
+    def literal(self, expression: Literal):
+        value = Builtins.literal(expression.value)
+        return lambda env: value
+
+    # The items of a collection or the arguments of a call, when some of
+    # them are commands. Those are all started before the first one is
+    # waited for, so they run at the same time. Returns None when there
+    # are no commands, so the usual closures are used instead.
+    def concurrent(self, expressions: list[Expr]):
+        if not any(type(expression) is Exec for expression in expressions):
+            return None
+
+        # (is it a command, its token, the closure)
+        items = []
+
+        for expression in expressions:
+            if type(expression) is Exec:
+                items.append((True, expression.operator, self.compile(expression.right)))
+            else:
+                items.append((False, None, self.compile(expression)))
+
+        def concurrent(env):
+            values = []
+            commands = []
+
+            try:
+                for (command, token, item) in items:
+                    if command:
+                        commands.append((len(values), token, Builtins.start(self, token, item(env))))
+                        values.append(None)
+                    else:
+                        values.append(item(env))
+
+                for (i, token, command) in commands:
+                    values[i] = Builtins.output(token, command)
+
+            finally:
+                Builtins.cancel(commands)
+
+            return values
+
+        return concurrent
+
+    def list(self, expression: List):
+        concurrent = self.concurrent(expression.items)
+        if concurrent is not None: return concurrent
+
+        items = [self.compile(item) for item in expression.items]
+        return lambda env: [item(env) for item in items]
+
+    def tuple(self, expression: Tuple):
+        concurrent = self.concurrent(expression.items)
+
+        if concurrent is not None:
+            return lambda env: tuple(concurrent(env))
+
+        items = [self.compile(item) for item in expression.items]
+        return lambda env: tuple(item(env) for item in items)
+
+    # The shape of a record literal never changes,
+    # so it is looked up once, when it's compiled.
+    def record(self, expression: Record):
+        shape = Shape.of(tuple(key.lexeme for key in expression.keys))
+        concurrent = self.concurrent(expression.values)
+
+        if concurrent is not None:
+            return lambda env: Struct(shape, concurrent(env))
+
+        values = [self.compile(value) for value in expression.values]
+        return lambda env: Struct(shape, [value(env) for value in values])
+
+    # Every place that reads a field has its own inline cache.
+    def get(self, expression: Get):
+        name = expression.name
+        record = self.compile(expression.record)
+        cache = FieldCache(name.lexeme)
+
+        def get(env):
+            value = record(env)
+
+            if type(value) is Struct and value.shape is cache.shape:
+                return value.values[cache.slot]
+
+            elif type(value) is Struct and name.lexeme in value.shape.slots:
+                return cache.miss(value)
+
+            return Builtins.field(name, value)
+
+        return get
@@ -1 +1,19 @@
-MAX_DECIMALS = 3
\ No newline at end of file
+import os
+
+MAX_DECIMALS = 3
+
+# The Unix domain socket that `grape serve` listens on
+SOCKET_PATH = "/tmp/grape-" + str(os.getuid()) + ".sock"
+
+# The amount of results that are cached for every memoized function
+MEMO_SIZE = 256
+
+# The amount of commands that `$` runs at the same time
+EXEC_LIMIT = max(4, os.cpu_count() or 1)
+
+# The seconds between two samples of `--sample-profile`
+SAMPLE_INTERVAL = 0.005
+
+# Concatenating strings gives a rope instead of a
+# flat string from this amount of characters on
+ROPE_THRESHOLD = 1024
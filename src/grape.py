@@ -1,13 +1,24 @@
 #!/usr/bin/env python3
 
 import sys
+from syntax.tokens import Token
+from syntax.ast import Expr
 from runtime import ErrorHandler
 from runtime import ErrorReporter
 from runtime import Debugger
-from parser import Linter
-from parser import Lexer
-from parser import Analyzer
 from utils import *
+from config import *
+
+# Everything that is not needed to print the help or to report
+# errors is only imported when it is first used.
+parser = Lazy("parser")
+interpreter = Lazy("interpreter")
+compiler = Lazy("compiler")
+repl = Lazy("repl")
+server = Lazy("server")
+sweep = Lazy("sweep")
+memo = Lazy("memo")
+profiler = Lazy("profiler")
 
 class CLI:
     def __init__(self, argv):
@@ -15,26 +26,89 @@ class CLI:
 
         self.grape = Grape()
         self.name = binaryName
-        self.argv = argv
+        self.argv = self.options(argv)
         
-        if len(argv) >= 2:
-            self.error("Too many arguments provided")
-            self.usage()
-            exit(64)
+        match self.argv:
+            case []:
+                self.grape.startRepl()
+
+            case ["--help"]:
+                self.description()
+                self.usage()
+
+            case ["serve"]:
+                server.Server(self.grape.copy).start()
+
+            case ["serve", socketPath]:
+                server.Server(self.grape.copy, socketPath).start()
+
+            case ["sweep", filePath, *options]:
+                self.sweep(filePath, options)
+
+            case ["check", filePath]:
+                self.grape.checkFile(filePath)
+                if self.grape.errorHandler.hadError: exit(65)
+
+            case [filePath]:
+                self.grape.runFile(filePath)
+                if self.grape.errorHandler.hadError: exit(65)
+
+            case _:
+                self.error("Too many arguments provided")
+                self.usage()
+                exit(64)
+
+    # Apply the options and return the arguments that are left.
+    def options(self, argv: list[str]) -> list[str]:
+        arguments = []
+
+        for argument in argv:
+            match argument.split("=", 1):
+                case ["--debug"]:
+                    self.grape.debug = True
+
+                case ["--profile"]:
+                    self.grape.profile = True
+
+                case ["--memo-size", size] if size.isdigit():
+                    self.grape.memoSize = int(size)
+
+                case ["--exec-limit", limit] if limit.isdigit() and int(limit) > 0:
+                    self.grape.execLimit = int(limit)
 
-        elif len(argv) == 1:
-            match argv[0]:
-                case "--help":
-                    self.description()
+                case ["--sample-profile", path] if path != "":
+                    self.grape.sampleProfile = path
+
+                case ["--hash-cons"]:
+                    self.grape.hashCons = True
+
+                case ["--nodes", nodes] if nodes.isdigit():
+                    self.grape.nodes = int(nodes)
+
+                case ["--engine", engine] if engine in Grape.ENGINES:
+                    self.grape.engine = engine
+
+                case ["--engine", engine]:
+                    self.error("Unknown engine '" + engine + "'")
                     self.usage()
+                    exit(64)
 
-                case filePath:
-                    self.grape.runFile(filePath)
-                    if self.grape.errorHandler.hadError: exit(65)
+                case _:
+                    arguments.append(argument)
+
+        return arguments
+
+    def sweep(self, filePath: str, argv: list[str]):
+        try:
+            options = sweep.Sweep.options(argv)
+
+        except ValueError as e:
+            self.error(str(e))
+            self.usage()
+            exit(64)
+
+        if not sweep.Sweep(self.grape, filePath, options).start(): exit(65)
 
-        else:
-            grape.startREPL()
-        
     def description(self) -> None:
         print("A general purpose programming language made for rapid-pase prototyping.")
         print("")
@@ -42,10 +116,32 @@ class CLI:
     def usage(self) -> None:
         print("Usage: ")
         print("  " + self.name + " [options] [path]")
+        print("  " + self.name + " check [path]")
+        print("  " + self.name + " serve [socket]")
+        print("  " + self.name + " sweep [path] --grid [grid.json] [sweep options]")
         print("")
         print("OPTIONS:")
         print("  --help: print this help")
         print("  --debug: enable printing of debug info")
+        print("  --engine=[" + "|".join(Grape.ENGINES) + "]: how to execute programs (default: interpreter)")
+        print("  --profile: print how often the caches of memoized functions were hit")
+        print("  --memo-size=[n]: results to cache per pure function, 0 turns it off (default: " + str(MEMO_SIZE) + ")")
+        print("  --exec-limit=[n]: commands that $ runs at the same time (default: one per CPU, at least 4)")
+        print("  --hash-cons: share the nodes of repeated subexpressions (errors in them point at the first one)")
+        print("  --sample-profile=[path]: sample which functions run, as speedscope JSON for .json paths, collapsed stacks otherwise")
+        print("  --nodes=[n]: spread spawned processes over n worker processes (default: 0, all in this one)")
+        print("")
+        print("COMMANDS:")
+        print("  check: only lint, lex and parse the file")
+        print("  serve: keep a warm process running that runs and checks files for client.py")
+        print("  sweep: call the entry function once for every combination of values in the grid")
+        print("")
+        print("SWEEP OPTIONS:")
+        print("  --grid [path]: JSON object that maps every parameter to a list of values")
+        print("  --entry [name]: the function to call (default: main)")
+        print("  --format [json|columns]: JSON lines or float64 columns (default: json)")
+        print("  --output [path]: file to write the results to (default: stdout)")
+        print("  --workers [n]: amount of worker processes (default: one per CPU)")
         print("")
 
     def error(self, message: str) -> str:
@@ -53,47 +149,138 @@ class CLI:
         print("")
 
 class Grape:
+    # interpreter: walk the AST
+    # closures: compile the AST to Python closures first
+    ENGINES = ["interpreter", "closures"]
+
+    # The attributes that the options of the CLI set
+    SETTINGS = ["debug", "profile", "memoSize", "execLimit", "nodes", "sampleProfile", "hashCons", "engine"]
+
     def __init__(self):
         self.debug = True
+        self.profile = False
+        self.memoSize = MEMO_SIZE
+        self.execLimit = EXEC_LIMIT
+        self.nodes = 0
+        self.sampleProfile = None
+        self.hashCons = False
+        self.engine = "interpreter"
         self.errorHandler = ErrorHandler()
+        self.interpreter = None
+
+    def settings(self) -> dict:
+        return {name: getattr(self, name) for name in Grape.SETTINGS}
+
+    def configure(self, settings: dict):
+        for (name, value) in settings.items():
+            setattr(self, name, value)
+
+    # A new Grape with the same settings, but nothing
+    # defined and no errors yet.
+    def copy(self):
+        grape = Grape()
+        grape.configure(self.settings())
+
+        return grape
 
     def runFile(self, filename: str):
+        source = self.readFile(filename)
+
+        if source is None: return
+        return self.run(source)
+
+    def checkFile(self, filename: str) -> list[Expr]:
+        source = self.readFile(filename)
+
+        if source is None: return
+        return self.check(source)
+
+    def readFile(self, filename: str) -> str:
+        self.errorHandler.file = filename
+
         try:
-            source_code = open(filename, "r").read()
-            self.errorHandler.file = filename
-            self.run(source_code)
+            return open(filename, "r").read()
 
         except FileNotFoundError:
-            self.errorHandler.file = filename
             self.errorHandler.error("", 0, 0, "", "No such file or directory: '" + filename + "'")
 
     def startRepl(self):
-        repl = Repl()
+        repl.Repl(self).start()
 
-        while True:
-            line = repl.input()
-            self.run(line)
-            self.errorHandler.hadError = False
+    def run(self, source: str):
+        tokens = self.lex(source)
 
-    def run(self, source: str): 
-        Linter(self, source).lint()
+        if tokens is None: return
+        return self.execute(tokens)
 
-        if self.errorHandler.hadError: return
+    # Only lint, lex and parse the source, without running it.
+    def check(self, source: str) -> list[Expr]:
+        tokens = self.lex(source)
 
-        tokens = Lexer(self, source).lex()
+        if tokens is None: return
+        return self.analyze(tokens)
 
-        if self.errorHandler.hadError: return
-        elif self.debug: 
+    def lex(self, source: str, line: int = 1) -> list[Token]:
+        linter = parser.Linter(self, source)
+        linter.line = line
+        linter.lint()
+
+        # When parts of the source can't be lexed, the tokens are still
+        # returned, so the analyzer reports its syntax errors as well.
+        lexer = parser.Lexer(self, source)
+        lexer.line = line
+        tokens = lexer.lex()
+
+        if self.debug and not self.errorHandler.hadError:
             Debugger.printTokens(tokens)
 
-        ast = Analyzer(self, tokens).analyze()
+        return tokens
+
+    # Parse and evaluate the tokens. The interpreter keeps its global
+    # environment, so this can be called again for more code.
+    def execute(self, tokens: list[Token]):
+        ast = self.analyze(tokens)
+
+        if ast is None: return
+        return self.interpret(ast)
+
+    def analyze(self, tokens: list[Token]) -> list[Expr]:
+        ast = parser.StackAnalyzer(self, tokens).analyze()
 
         if self.errorHandler.hadError: return
         elif self.debug: 
             Debugger.printAST(ast)
+
+        return ast
+
+    def interpret(self, ast: list[Expr]):
+        if self.debug:
             Debugger.printRunning()
-        
-        # Interpreter(self, ast).interpret()
+
+        # Created on first use, and kept afterwards so the
+        # global environment survives between calls.
+        if self.interpreter is None and self.engine == "closures":
+            self.interpreter = compiler.ClosureCompiler(self)
+        elif self.interpreter is None:
+            self.interpreter = interpreter.Interpreter(self)
+
+        if self.sampleProfile is not None:
+            sampler = profiler.Sampler(self.interpreter, self.errorHandler.file)
+            sampler.start()
+
+        # Caches of earlier runs in the same process are left out of
+        # the profile, unless this run used them as well.
+        if self.profile:
+            calls = {cache: cache.hits + cache.misses for cache in memo.Memo.instances}
+
+        value = self.interpreter.interpret(ast)
+
+        if self.sampleProfile is not None:
+            sampler.stop()
+            sampler.write(self.sampleProfile)
+
+        if self.profile:
+            Debugger.printProfile([cache for cache in memo.Memo.instances if cache.hits + cache.misses != calls.get(cache, -1)])
 
         if self.debug:
             if self.errorHandler.hadError:
@@ -101,5 +288,7 @@ class Grape:
             else:
                 Debugger.printDone()
 
+        return value
+
 if __name__ == "__main__":
     CLI(sys.argv)
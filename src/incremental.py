@@ -0,0 +1,263 @@
+from bisect import bisect_right
+from syntax.tokens import *
+from syntax.ast import *
+from parser import *
+
+# A top-level statement of the source code (or a run of empty lines),
+# together with the tokens and expressions that were parsed from it.
+# The line is the one its tokens say it starts at, which is only brought
+# up to date when its expressions are used.
+class Chunk:
+    def __init__(self, text: str, line: int, tokens: list[Token], expressions: list[Expr], failed: bool):
+        self.text = text
+        self.line = line
+        self.tokens = tokens
+        self.expressions = expressions
+        self.failed = failed
+        self.lines = text.count("\n")
+
+# The expressions of every chunk, which are only joined when they are
+# iterated, so an edit doesn't have to touch the chunks it didn't change.
+# It shows the source code as it is, also after later edits.
+class Expressions:
+    def __init__(self, parser):
+        self.parser = parser
+
+    def __iter__(self):
+        for i in range(len(self.parser.chunks)):
+            yield from self.parser.relocate(i).expressions
+
+    def __len__(self) -> int:
+        return self.parser.count
+
+# Keeps the source code split up in top-level statements, so that an edit
+# only needs to re-lex and re-parse the statements that it touches. The
+# expressions of all other statements are reused as they are.
+#
+# The offset and line every chunk starts at are kept next to the chunks,
+# so the chunk of an offset is found with a binary search. An edit that
+# changes the length of the source moves everything after it, which is
+# only recorded as a shift of the chunks from `stale` on, the ones after
+# the last edit. Like the gap of a text editor, that boundary only moves
+# along with the edits, so edits close to each other, like typing, never
+# go through the whole source code.
+class IncrementalParser:
+    OPENING = [TokenType.LEFT_PAREN, TokenType.LEFT_BRACKET, TokenType.LEFT_BRACE]
+    CLOSING = [TokenType.RIGHT_PAREN, TokenType.RIGHT_BRACKET, TokenType.RIGHT_BRACE, TokenType.END]
+
+    def __init__(self, grape, source: str = ""):
+        self.grape = grape
+        self.errorHandler = grape.errorHandler
+
+        self.chunks = []
+        self.failures = 0
+
+        # The amount of expressions of all chunks
+        self.count = 0
+
+        # Where every chunk starts, without the shift from stale on
+        self.starts = []
+        self.lines = []
+
+        self.stale = 0
+        self.shift = 0
+        self.lineShift = 0
+
+        self.replace(0, 0, source, 1)
+
+    def source(self) -> str:
+        return "".join(chunk.text for chunk in self.chunks)
+
+    def expressions(self) -> list[Expr]:
+        return list(Expressions(self))
+
+    def hadError(self) -> bool:
+        return self.failures > 0
+
+    # Replace `removed` characters at `offset` by the `inserted` text and
+    # return the expressions of the updated source code, which are only
+    # joined when they are used.
+    def edit(self, offset: int, removed: int, inserted: str) -> Expressions:
+        (first, start, line) = self.locate(offset)
+        (last, _, _) = self.locate(offset + removed)
+
+        text = "".join(chunk.text for chunk in self.chunks[first:last + 1])
+        local = offset - start
+        text = text[:local] + inserted + text[local + removed:]
+
+        self.replace(first, last + 1, text, line)
+        return Expressions(self)
+
+    # Find the chunk that contains the given offset, together with the
+    # offset and the line that chunk starts at.
+    def locate(self, offset: int) -> tuple[int, int, int]:
+        if self.stale < len(self.chunks) and offset >= self.starts[self.stale] + self.shift:
+            i = bisect_right(self.starts, offset - self.shift, self.stale) - 1
+        else:
+            i = bisect_right(self.starts, offset, 0, self.stale) - 1
+
+        i = min(max(i, 0), len(self.chunks) - 1)
+        return (i,) + self.start(i)
+
+    # The offset and line that a chunk starts at
+    def start(self, i: int) -> tuple[int, int]:
+        if i >= self.stale:
+            return (self.starts[i] + self.shift, self.lines[i] + self.lineShift)
+
+        return (self.starts[i], self.lines[i])
+
+    # Move where the stale chunks begin, which takes as long as it moves,
+    # unless nothing is shifted.
+    def settle(self, stale: int):
+        if self.shift != 0 or self.lineShift != 0:
+            for i in range(self.stale, stale):
+                self.starts[i] += self.shift
+                self.lines[i] += self.lineShift
+
+            for i in range(stale, self.stale):
+                self.starts[i] -= self.shift
+                self.lines[i] -= self.lineShift
+
+        self.stale = stale
+
+    # Bring the lines of the tokens of a chunk up to date, after
+    # edits before it changed the amount of lines.
+    def relocate(self, i: int) -> Chunk:
+        chunk = self.chunks[i]
+        (_, line) = self.start(i)
+
+        if chunk.line != line:
+            for token in chunk.tokens:
+                token.line += line - chunk.line
+
+            chunk.line = line
+
+        return chunk
+
+    # Re-parse the given text and use it to replace the chunks between
+    # first and last. When the text ends inside of a block or brackets,
+    # the following chunks are pulled in until it is balanced again.
+    def replace(self, first: int, last: int, text: str, line: int):
+        chunks = []
+        extend = 1
+
+        while True:
+            final = last >= len(self.chunks)
+            (parsed, balanced) = self.parse(text, line, final)
+
+            if balanced or final:
+                chunks += parsed
+                break
+
+            # Only the unbalanced statement at the end needs to be
+            # parsed again, together with the chunks after it.
+            chunks += parsed[:-1]
+            text = parsed[-1].text + "".join(chunk.text for chunk in self.chunks[last:last + extend])
+            line = parsed[-1].line
+
+            last += extend
+            extend *= 2
+
+        last = min(last, len(self.chunks))
+        old = self.chunks[first:last]
+        (offset, _) = self.start(first) if first < len(self.chunks) else (0, 0)
+
+        self.failures += sum(chunk.failed for chunk in chunks) - sum(chunk.failed for chunk in old)
+        self.count += sum(len(chunk.expressions) for chunk in chunks) - sum(len(chunk.expressions) for chunk in old)
+        self.errorHandler.hadError = self.hadError()
+
+        # The chunks after the edit move by the difference in length, which
+        # they get as part of the shift, so the stale ones start after it.
+        delta = sum(len(chunk.text) for chunk in chunks) - sum(len(chunk.text) for chunk in old)
+        lineDelta = sum(chunk.lines for chunk in chunks) - sum(chunk.lines for chunk in old)
+
+        self.settle(last)
+
+        starts = []
+        lines = []
+
+        for chunk in chunks:
+            starts.append(offset)
+            lines.append(chunk.line)
+            offset += len(chunk.text)
+
+        self.chunks[first:last] = chunks
+        self.starts[first:last] = starts
+        self.lines[first:last] = lines
+
+        self.stale = first + len(chunks)
+        self.shift += delta
+        self.lineShift += lineDelta
+
+        if self.stale == len(self.chunks):
+            self.shift = 0
+            self.lineShift = 0
+
+    # Lex the text and split it into top-level statements. Also returns
+    # whether every block and bracket that was opened was also closed.
+    # An unbalanced statement at the end is only parsed if it is final.
+    def parse(self, text: str, line: int, final: bool = True) -> tuple[list[Chunk], bool]:
+        tokens = self.lex(text, line)
+
+        if tokens is None:
+            return ([Chunk(text, line, [], [], True)], True)
+
+        chunks = []
+        depth = 0
+        begin = 0
+        offset = 0
+
+        for (i, token) in enumerate(tokens):
+            depth += IncrementalParser.nesting(token, tokens[i + 1:i + 2])
+
+            if token.type == TokenType.NEWLINE and depth <= 0:
+                end = token.offset + 1
+                chunks.append(self.chunk(text[offset:end], line, tokens[begin:i + 1]))
+
+                line += chunks[-1].lines
+                depth = 0
+                begin = i + 1
+                offset = end
+
+        if depth > 0 and not final:
+            chunks.append(Chunk(text[offset:], line, [], [], False))
+        elif offset < len(text) or chunks == []:
+            chunks.append(self.chunk(text[offset:], line, tokens[begin:-1]))
+
+        return (chunks, depth <= 0)
+
+    # How much deeper a token nests the code: 1 if it opens a block or
+    # a bracket, -1 if it closes one. A "do" only opens a block when it
+    # is directly followed by a newline.
+    def nesting(token: Token, following: list[Token]) -> int:
+        if token.type == TokenType.DO:
+            return 1 if following and following[0].type == TokenType.NEWLINE else 0
+        elif token.type in IncrementalParser.OPENING:
+            return 1
+        elif token.type in IncrementalParser.CLOSING:
+            return -1
+        else:
+            return 0
+
+    def lex(self, text: str, line: int) -> list[Token]:
+        self.errorHandler.hadError = False
+
+        linter = Linter(self.grape, text)
+        linter.line = line
+        linter.lint()
+
+        lexer = Lexer(self.grape, text)
+        lexer.line = line
+        return lexer.lex()
+
+    def chunk(self, text: str, line: int, tokens: list[Token]) -> Chunk:
+        self.errorHandler.hadError = False
+
+        end = line + text.count("\n")
+        eof = Token(TokenType.EOF, "", None, end, 0, len(text))
+        expressions = StackAnalyzer(self.grape, tokens + [eof]).analyze()
+
+        # The errors of lexing were reported before the chunks were split
+        failed = self.errorHandler.hadError or any(token.type == TokenType.ERROR for token in tokens)
+
+        return Chunk(text, line, tokens, expressions or [], failed)
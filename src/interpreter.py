@@ -0,0 +1,768 @@
+import threading
+from decimal import *
+from syntax.tokens import *
+from syntax.ast import *
+from arrays import NumericArray
+from memo import *
+from records import *
+from streams import Stream
+from ranges import Range
+from processes import Scheduler, Pid
+from ropes import Rope
+from utils import Lazy
+
+# Only imported once a program runs a command,
+# as asyncio takes a while to import.
+shell = Lazy("shell")
+
+# RuntimeError is already used by Python itself
+class ExecutionError(Exception):
+    def __init__(self, token: Token, message: str):
+        self.token = token
+        self.message = message
+        super().__init__(message)
+
+    def report(self, errorHandler):
+        if self.token is None:
+            errorHandler.error("Runtime error", 0, 0, "", self.message)
+        else:
+            errorHandler.error("Runtime error", self.token.line, self.token.col, self.token.lexeme, self.message)
+
+class Environment:
+    def __init__(self, enclosing = None):
+        self.values = {}
+        self.enclosing = enclosing
+
+    def define(self, name: str, value):
+        self.values[name] = value
+
+    def get(self, name: Token):
+        environment = self
+
+        while environment is not None:
+            if name.lexeme in environment.values:
+                return environment.values[name.lexeme]
+
+            environment = environment.enclosing
+
+        raise ExecutionError(name, "Undefined variable")
+
+    def contains(self, name: str) -> bool:
+        return name in self.values
+
+# A function value. Named functions can be defined multiple times
+# with a different amount of parameters, so a function holds one
+# clause (parameters and body) per arity. Clauses that are memoized
+# also have a cache.
+class Closure:
+    def __init__(self, name: str, closure: Environment):
+        self.name = name
+        self.closure = closure
+        self.clauses = {}
+        self.memos = {}
+
+    def define(self, declaration: Function):
+        self.clauses[len(declaration.parameters)] = declaration
+        self.memos.pop(len(declaration.parameters), None)
+
+    # Cache the results of every clause that is defined so far.
+    def memoize(self, size: int):
+        for arity in self.clauses:
+            self.memos[arity] = Memo(self.name, size)
+
+    def clause(self, arguments: list, token: Token) -> Function:
+        if len(arguments) not in self.clauses:
+            raise ExecutionError(token, "No clause of '" + self.name + "' takes " + str(len(arguments)) + " arguments")
+
+        return self.clauses[len(arguments)]
+
+# A function that is implemented in Python. It raises a ValueError
+# with a message when it is called with the wrong arguments.
+class Builtin:
+    def __init__(self, name: str, function):
+        self.name = name
+        self.function = function
+
+    def call(self, arguments: list, token: Token):
+        try:
+            return self.function(*arguments)
+
+        except ValueError as e:
+            raise ExecutionError(token, str(e))
+
+        except ArithmeticError as e:
+            raise ExecutionError(token, Builtins.failure(None, e))
+
+        # Only a TypeError of the call itself means the number of
+        # arguments is wrong, not one from inside the function.
+        except TypeError as e:
+            if e.__traceback__.tb_next is not None:
+                raise
+
+            raise ExecutionError(token, "'" + self.name + "' doesn't take " + str(len(arguments)) + " arguments")
+
+class Interpreter:
+    def __init__(self, grape):
+        self.errorHandler = grape.errorHandler
+
+        self.globals = Environment()
+        self.environment = self.globals
+        self.memoizer = Memoizer(Builtins.PURE, grape.memoSize)
+
+        self.execLimit = grape.execLimit
+        self.shell = None
+
+        self.scheduler = Scheduler(self, grape.settings())
+
+        for (name, function) in Builtins.all() + Builtins.higher(self.invoke) + Builtins.processes(self.scheduler):
+            self.globals.define(name, Builtin(name, function))
+
+        self.globals.define("receive", Builtin("receive", self.receive))
+
+        self.visitors = {
+            Assignment: self.assignment,
+            Destructuring: self.destructuring,
+            Block: self.block,
+            Line: self.line,
+            Conditional: self.conditional,
+            Named: self.named,
+            Lambda: self.anonymous,
+            Unary: self.unary,
+            Exec: self.exec,
+            Binary: self.binary,
+            Pipe: self.pipe,
+            Call: self.call,
+            Index: self.index,
+            Variable: self.variable,
+            Grouping: self.grouping,
+            Literal: self.literal,
+            List: self.list,
+            Tuple: self.tuple,
+            Record: self.record,
+            Get: self.get
+        }
+
+    # Evaluate the expressions in the global environment, which is kept
+    # between calls. Returns the value of the last expression.
+    def interpret(self, expressions: list[Expr]):
+        value = None
+
+        self.memoizer.analyze(expressions)
+        self.scheduler.declare(expressions)
+
+        try:
+            for expression in expressions:
+                value = self.evaluate(expression)
+
+            self.scheduler.finish()
+            self.environment = self.globals
+
+            return value
+
+        except ExecutionError as e:
+            self.environment = self.globals
+            e.report(self.errorHandler)
+
+        except RecursionError:
+            self.environment = self.globals
+            self.errorHandler.error("Runtime error", 0, 0, "", "Maximum recursion depth exceeded")
+
+    # Call a function from Python, with the same error handling
+    # as interpret.
+    def apply(self, function, arguments: list):
+        try:
+            return self.invoke(function, arguments, None)
+
+        except ExecutionError as e:
+            self.environment = self.globals
+            e.report(self.errorHandler)
+
+        except RecursionError:
+            self.environment = self.globals
+            self.errorHandler.error("Runtime error", 0, 0, "", "Maximum recursion depth exceeded")
+
+    def evaluate(self, expression: Expr):
+        return self.visitors[type(expression)](expression)
+
+    # The Grape functions that are being called in a Python frame of this
+    # interpreter and the frames below it, as (name, declaration) pairs
+    # with the outermost call first. Used by the sampling profiler.
+    def stack(self, frame) -> list[tuple]:
+        stack = []
+
+        while frame is not None:
+            if frame.f_code is Interpreter.invoke.__code__:
+                values = frame.f_locals
+
+                if "declaration" in values:
+                    stack.append((values["callee"].name, values["declaration"]))
+
+            frame = frame.f_back
+
+        stack.reverse()
+        return stack
+
+    # Other processes run while this one waits for a message, and
+    # they change the current environment, so it's restored afterwards.
+    def receive(self):
+        environment = self.environment
+
+        try:
+            return self.scheduler.receive()
+
+        finally:
+            self.environment = environment
+
+    def assignment(self, expression: Assignment):
+        value = self.evaluate(expression.expression)
+        self.environment.define(expression.name.lexeme, value)
+
+        return value
+
+    # Like Python's assignment statement, destructuring evaluates to nil,
+    # so the closure engine never needs to create the tuple.
+    def destructuring(self, expression: Destructuring):
+        value = Builtins.unpack(expression.names[0], self.evaluate(expression.expression), len(expression.names))
+
+        for (name, item) in zip(expression.names, value):
+            self.environment.define(name.lexeme, item)
+
+    def block(self, expression: Block):
+        return self.scope(expression.expressions, Environment(self.environment))
+
+    def scope(self, expressions: list[Expr], environment: Environment):
+        previous = self.environment
+        value = None
+
+        try:
+            self.environment = environment
+
+            for expression in expressions:
+                value = self.evaluate(expression)
+
+        finally:
+            self.environment = previous
+
+        return value
+
+    def line(self, expression: Line):
+        return self.evaluate(expression.expression)
+
+    def conditional(self, expression: Conditional):
+        if Builtins.isTruthy(self.evaluate(expression.condition)):
+            return self.evaluate(expression.ifBranch)
+
+        elif expression.elseBranch is not None:
+            return self.evaluate(expression.elseBranch)
+
+    def named(self, expression: Named):
+        name = expression.name.lexeme
+
+        # Defining a function with a new arity adds a clause to the
+        # existing function instead of replacing it.
+        if self.environment.contains(name) and isinstance(self.environment.values[name], Closure):
+            function = self.environment.values[name]
+        else:
+            function = Closure(name, self.environment)
+            self.environment.define(name, function)
+
+        function.define(expression)
+        self.memoize(function, expression)
+
+        return function
+
+    def anonymous(self, expression: Lambda):
+        function = Closure("fn", self.environment)
+        function.define(expression)
+        self.memoize(function, expression)
+
+        return function
+
+    def memoize(self, function: Closure, declaration: Function):
+        memo = self.memoizer.memo(declaration, function.name)
+
+        if memo is not None:
+            function.memos[len(declaration.parameters)] = memo
+
+    def unary(self, expression: Unary):
+        right = self.evaluate(expression.right)
+
+        if expression.operator.type == TokenType.MINUS:
+            return Builtins.negate(expression.operator, right)
+
+        return not Builtins.isTruthy(right)
+
+    def exec(self, expression: Exec):
+        command = Builtins.start(self, expression.operator, self.evaluate(expression.right))
+        return Builtins.output(expression.operator, command)
+
+    def binary(self, expression: Binary):
+        operator = expression.operator
+
+        # Logical operators short-circuit
+        if operator.type == TokenType.AND:
+            left = self.evaluate(expression.left)
+            return self.evaluate(expression.right) if Builtins.isTruthy(left) else left
+
+        elif operator.type == TokenType.OR:
+            left = self.evaluate(expression.left)
+            return left if Builtins.isTruthy(left) else self.evaluate(expression.right)
+
+        left = self.evaluate(expression.left)
+        right = self.evaluate(expression.right)
+
+        return Builtins.operate(operator, left, right)
+
+    def call(self, expression: Call):
+        callee = self.evaluate(expression.callee)
+        arguments = self.items(expression.arguments)
+
+        return self.invoke(callee, arguments, expression.closingParenToken)
+
+    # The value is the first argument of a stage that is a call, so
+    # it is evaluated together with the other arguments, after the callee.
+    def pipe(self, expression: Pipe):
+        stage = expression.right
+
+        if isinstance(stage, Call):
+            callee = self.evaluate(stage.callee)
+            arguments = self.items([expression.left] + stage.arguments)
+
+            return self.invoke(callee, arguments, stage.closingParenToken)
+
+        value = self.evaluate(expression.left)
+        return self.invoke(self.evaluate(stage), [value], expression.operator)
+
+    def invoke(self, callee, arguments: list, token: Token):
+        if isinstance(callee, Builtin):
+            return callee.call(arguments, token)
+
+        elif not isinstance(callee, Closure):
+            raise ExecutionError(token, "Can only call functions")
+
+        declaration = callee.clause(arguments, token)
+        memo = callee.memos.get(len(arguments))
+        key = None if memo is None else Memo.key(arguments)
+
+        if key is not None:
+            value = memo.get(key)
+            if value is not Memo.MISSING: return value
+
+        environment = Environment(callee.closure)
+
+        for (parameter, argument) in zip(declaration.parameters, arguments):
+            environment.define(parameter.lexeme, argument)
+
+        body = declaration.body
+
+        if isinstance(body, Block):
+            value = self.scope(body.expressions, environment)
+        else:
+            value = self.scope([body.expression], environment)
+
+        if key is not None:
+            memo.put(key, value)
+
+        return value
+
+    def index(self, expression: Index):
+        collection = self.evaluate(expression.collection)
+        index = self.evaluate(expression.index)
+
+        return Builtins.index(expression.closingBracketToken, collection, index)
+
+    def variable(self, expression: Variable):
+        return self.environment.get(expression.name)
+
+    def grouping(self, expression: Grouping):
+        return self.evaluate(expression.expression)
+
+    def literal(self, expression: Literal):
+        return Builtins.literal(expression.value)
+
+    # Evaluate the items of a collection or the arguments of a call. The
+    # commands among them are all started before the first one is waited
+    # for, so they run at the same time.
+    def items(self, expressions: list[Expr]) -> list:
+        values = []
+        commands = []
+
+        try:
+            for expression in expressions:
+                if type(expression) is Exec:
+                    command = Builtins.start(self, expression.operator, self.evaluate(expression.right))
+                    commands.append((len(values), expression.operator, command))
+
+                    values.append(None)
+                else:
+                    values.append(self.evaluate(expression))
+
+            for (i, token, command) in commands:
+                values[i] = Builtins.output(token, command)
+
+        finally:
+            Builtins.cancel(commands)
+
+        return values
+
+    def list(self, expression: List):
+        return self.items(expression.items)
+
+    def tuple(self, expression: Tuple):
+        return tuple(self.items(expression.items))
+
+    def record(self, expression: Record):
+        shape = Shape.of(tuple(key.lexeme for key in expression.keys))
+        return Struct(shape, self.items(expression.values))
+
+    def get(self, expression: Get):
+        return Builtins.field(expression.name, self.evaluate(expression.record))
+
+# The semantics of Grape values, shared by everything that
+# executes Grape code.
+class Builtins:
+    def all() -> list[tuple]:
+        return [
+            ("print", Builtins.print),
+            ("array", Builtins.array),
+            ("memoize", Builtins.memoize),
+            ("range", Builtins.range),
+            ("len", Builtins.len),
+            ("sum", Builtins.sum),
+        ]
+
+    # The builtins that call Grape functions, which they do through
+    # the call function of the engine: call(function, arguments, token).
+    def higher(call) -> list[tuple]:
+        return [
+            ("map", lambda items, function: Builtins.map(call, items, function)),
+            ("filter", lambda items, function: Builtins.filter(call, items, function)),
+            ("take", Builtins.take),
+            ("collect", Builtins.collect),
+        ]
+
+    # The builtins that run processes, and send messages between them.
+    def processes(scheduler) -> list[tuple]:
+        return [
+            ("spawn", lambda function, *arguments: Builtins.spawn(scheduler, function, list(arguments))),
+            ("send", scheduler.send),
+            ("receive", scheduler.receive),
+            ("self", scheduler.pid),
+        ]
+
+    # The builtins that always give the same result for the
+    # same arguments, and don't do anything else.
+    PURE = ["array", "range", "len", "sum"]
+
+    def print(*values):
+        print(*[Builtins.stringify(value) for value in values])
+
+    def array(items) -> NumericArray:
+        if isinstance(items, Range):
+            return NumericArray.arange(items.start, items.step, items.length)
+
+        if not isinstance(items, (list, tuple, NumericArray)):
+            raise ValueError("Can only create an array from a list")
+
+        for item in items:
+            if not isinstance(item, (Decimal, float)):
+                raise ValueError("Arrays can only contain numbers")
+
+        return NumericArray.of(items)
+
+    def map(call, items, function) -> Stream:
+        return Stream.of(items).then(Stream.MAP, Builtins.callback(call, function))
+
+    def filter(call, items, function) -> Stream:
+        return Stream.of(items).then(Stream.FILTER, Builtins.callback(call, function))
+
+    def take(items, amount):
+        if not isinstance(amount, Decimal) or amount != amount.to_integral() or amount < 0:
+            raise ValueError("Can only take a whole number of items")
+
+        if isinstance(items, Range):
+            return items.take(int(amount))
+
+        return Stream.of(items).then(Stream.TAKE, int(amount))
+
+    def collect(items) -> list:
+        return list(Stream.of(items))
+
+    # range(stop), range(start, stop) or range(start, stop, step)
+    def range(*bounds) -> Range:
+        match bounds:
+            case (stop,):
+                return Range.of(Decimal(0), stop, Decimal(1))
+            case (start, stop):
+                return Range.of(start, stop, Decimal(1))
+            case (start, stop, step):
+                return Range.of(start, stop, step)
+
+        raise ValueError("A range takes 1 to 3 arguments")
+
+    def len(items) -> Decimal:
+        if isinstance(items, Struct):
+            return Decimal(len(items.values))
+
+        # Python can't give lengths that don't fit in 64 bits
+        elif isinstance(items, Range):
+            return Decimal(items.length)
+
+        elif not isinstance(items, (list, tuple, str, Rope, NumericArray, Range)):
+            raise ValueError("Can only get the length of collections")
+
+        return Decimal(len(items))
+
+    def sum(items) -> Decimal:
+        if isinstance(items, Range):
+            return items.sum()
+
+        elif isinstance(items, NumericArray):
+            return Decimal(repr(items.sum()))
+
+        total = Decimal(0)
+
+        for item in Stream.of(items):
+            if not isinstance(item, Decimal):
+                raise ValueError("Can only sum numbers")
+
+            total += item
+
+        return total
+
+    # Negative indices count from the end.
+    def index(token: Token, collection, index):
+        if not isinstance(index, Decimal) or index != index.to_integral():
+            raise ExecutionError(token, "Indices must be whole numbers")
+
+        if not isinstance(collection, (list, tuple, str, Rope, NumericArray, Range)):
+            raise ExecutionError(token, "Can only index collections")
+
+        try:
+            item = collection[int(index)]
+
+        except IndexError:
+            raise ExecutionError(token, "Index out of range")
+
+        if isinstance(collection, NumericArray):
+            return Decimal(repr(float(item)))
+
+        return item
+
+    def contains(operator: Token, item, collection) -> bool:
+        if isinstance(collection, (str, Rope)) and isinstance(item, (str, Rope)):
+            return str(item) in str(collection)
+
+        elif isinstance(collection, NumericArray) and isinstance(item, Decimal):
+            return float(item) in collection
+
+        elif isinstance(collection, (list, tuple, Range, Stream)):
+            return item in collection
+
+        raise ExecutionError(operator, "Can only look for items in collections")
+
+    # Guards creating the shell of an engine
+    SHELL = threading.Lock()
+
+    # Start running a command in the shell of an engine, which is
+    # created when the first command runs. Returns a future of its output.
+    # Processes of the same engine run in threads of their own, and they
+    # all share the shell, so its limit holds for the whole program.
+    def start(engine, token: Token, command):
+        if not isinstance(command, (str, Rope)):
+            raise ExecutionError(token, "Can only run strings as commands")
+
+        if engine.shell is None:
+            with Builtins.SHELL:
+                if engine.shell is None:
+                    engine.shell = shell.Shell(engine.execLimit)
+
+        return engine.shell.start(str(command))
+
+    # Wait for a command to finish.
+    def output(token: Token, command) -> str:
+        try:
+            return command.result()
+
+        except ValueError as e:
+            raise ExecutionError(token, str(e))
+
+    # Stop the commands that nothing waits for anymore, because
+    # evaluating the expression they are part of failed.
+    def cancel(commands: list[tuple]):
+        for (_, _, command) in commands:
+            command.cancel()
+
+    def spawn(scheduler, function, arguments: list) -> Pid:
+        if not isinstance(function, (Closure, Builtin)):
+            raise ValueError("Can only spawn functions")
+
+        return scheduler.spawn(function, arguments)
+
+    # A Python function of one item, that calls the Grape function.
+    def callback(call, function):
+        if not isinstance(function, (Closure, Builtin)):
+            raise ValueError("Expected a function")
+
+        return lambda item: call(function, [item], None)
+
+    def memoize(function, size = None):
+        if not isinstance(function, Closure):
+            raise ValueError("Can only memoize functions")
+
+        if size is None:
+            size = MEMO_SIZE
+        elif not isinstance(size, Decimal) or size != size.to_integral() or size < 1:
+            raise ValueError("The size of a cache must be a positive whole number")
+
+        function.memoize(int(size))
+        return function
+
+    def literal(token: Token):
+        if token.type == TokenType.TRUE:
+            return True
+        elif token.type == TokenType.FALSE:
+            return False
+        elif token.type == TokenType.ATOM:
+            return token.lexeme
+        else:
+            return token.literal
+
+    def field(name: Token, record):
+        if not isinstance(record, Struct):
+            raise ExecutionError(name, "Only records have fields")
+
+        try:
+            return record.get(name.lexeme)
+
+        except KeyError:
+            raise ExecutionError(name, "Undefined field")
+
+    # Check that a destructured value has as many values as names.
+    def unpack(token: Token, value, width: int):
+        if not isinstance(value, (tuple, list)) or len(value) != width:
+            raise ExecutionError(token, "Expected a tuple of " + str(width) + " values to destructure")
+
+        return value
+
+    def isTruthy(value) -> bool:
+        return value is not None and value is not False
+
+    def checkNumbers(operator: Token, *operands):
+        for operand in operands:
+            if not isinstance(operand, Decimal):
+                raise ExecutionError(operator, "Operands must be numbers")
+
+    def negate(operator: Token, value):
+        if isinstance(value, NumericArray):
+            return value.negate()
+
+        Builtins.checkNumbers(operator, value)
+        return -value
+
+    def operate(operator: Token, left, right):
+        if operator.type == TokenType.IN:
+            return Builtins.contains(operator, left, right)
+
+        if isinstance(left, NumericArray) or isinstance(right, NumericArray):
+            try:
+                return NumericArray.operate(operator, left, right)
+
+            except ValueError as e:
+                raise ExecutionError(operator, str(e))
+
+        match operator.type:
+            case TokenType.EQUAL_EQUAL:
+                return left == right
+            case TokenType.BANG_EQUAL:
+                return left != right
+
+            case TokenType.PLUS:
+                if isinstance(left, (str, Rope)) and isinstance(right, (str, Rope)):
+                    return Rope.concat(left, right)
+                elif isinstance(left, list) and isinstance(right, list):
+                    return left + right
+
+        Builtins.checkNumbers(operator, left, right)
+
+        try:
+            match operator.type:
+                case TokenType.PLUS:
+                    return left + right
+                case TokenType.MINUS:
+                    return left - right
+                case TokenType.STAR:
+                    return left * right
+                case TokenType.SLASH:
+                    return left / right
+                case TokenType.PERCENT:
+                    return left % right
+                case TokenType.ROOF:
+                    value = left ** right
+
+                    # Zero to a negative power is infinity, not an error.
+                    if not value.is_finite():
+                        raise DivisionByZero()
+
+                    return value
+                case TokenType.GREATER:
+                    return left > right
+                case TokenType.GREATER_EQUAL:
+                    return left >= right
+                case TokenType.LESS:
+                    return left < right
+                case TokenType.LESS_EQUAL:
+                    return left <= right
+
+        except ArithmeticError as e:
+            raise ExecutionError(operator, Builtins.failure(operator, e))
+
+        raise ExecutionError(operator, "Unknown operator")
+
+    # The message of an error of the arithmetic of numbers. An invalid
+    # operation is a division of zero by zero, or a power that has no
+    # real result, like the square root of -1.
+    def failure(operator: Token, error: ArithmeticError) -> str:
+        if isinstance(error, Overflow):
+            return "Number is too large"
+        elif isinstance(error, DivisionByZero):
+            return "Division by zero"
+        elif operator is not None and operator.type in [TokenType.SLASH, TokenType.PERCENT]:
+            return "Division by zero"
+        elif operator is not None and operator.type == TokenType.ROOF:
+            return "Result is not a real number"
+        else:
+            return "Result is not a number"
+
+    def stringify(value) -> str:
+        if value is None:
+            return "nil"
+        elif value is True:
+            return "true"
+        elif value is False:
+            return "false"
+        elif isinstance(value, Decimal):
+            if value != value.to_integral():
+                return str(value.normalize())
+
+            # Formatting doesn't go through int, which refuses to
+            # turn numbers of more than 4300 digits into strings.
+            return format(value.to_integral() + 0, "f")
+        elif isinstance(value, list):
+            return "[" + ", ".join(Builtins.stringify(item) for item in value) + "]"
+        elif isinstance(value, tuple):
+            return "(" + ", ".join(Builtins.stringify(item) for item in value) + ")"
+        elif isinstance(value, Struct):
+            return "{" + ", ".join(field + ": " + Builtins.stringify(item) for (field, item) in value.items()) + "}"
+        elif isinstance(value, NumericArray):
+            return "array([" + ", ".join(Builtins.stringify(Decimal(repr(float(item)))) for item in value) + "])"
+        elif isinstance(value, Range):
+            return "range(" + ", ".join(Builtins.stringify(bound) for bound in [value.start, value.stop(), value.step]) + ")"
+        elif isinstance(value, Stream):
+            return "<stream>"
+        elif isinstance(value, Pid):
+            return "<" + ".".join(str(part) for part in [value.node, value.origin, value.number]) + ">"
+        elif isinstance(value, (Closure, Builtin)):
+            return "<fn " + value.name + ">"
+        else:
+            return str(value)
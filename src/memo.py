@@ -0,0 +1,329 @@
+import weakref
+from collections import OrderedDict
+from decimal import *
+from syntax.ast import *
+from ropes import Rope
+from config import *
+
+# A cache of the results of a function, keyed by its arguments. When it
+# is full, the entry that was used the longest time ago is evicted.
+class Memo:
+    # Every cache that is still in use, for the profile
+    instances = weakref.WeakSet()
+
+    # Returned by get when the arguments are not cached
+    MISSING = object()
+
+    # The types of arguments that can be cached. Lists and arrays
+    # are left out, as they can't be hashed.
+    KEYS = (Decimal, str, bool, type(None))
+
+    def __init__(self, name: str, size: int = MEMO_SIZE):
+        self.name = name
+        self.size = size
+        self.values = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+        Memo.instances.add(self)
+
+    # The key to cache the arguments under, or None if they can't be
+    # cached. The types are part of the key, as `true == 1` in Python.
+    def key(arguments) -> tuple:
+        key = []
+
+        for argument in arguments:
+            kind = type(argument)
+
+            if kind is tuple:
+                argument = Memo.key(argument)
+                if argument is None: return None
+
+            # Ropes are equal to the strings they hold
+            elif kind is Rope:
+                kind = str
+                argument = str(argument)
+
+            elif kind not in Memo.KEYS:
+                return None
+
+            key.append((kind, argument))
+
+        return tuple(key)
+
+    def get(self, key: tuple):
+        value = self.values.get(key, Memo.MISSING)
+
+        if value is Memo.MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.values.move_to_end(key)
+
+        return value
+
+    def put(self, key: tuple, value):
+        self.values[key] = value
+
+        if len(self.values) > self.size:
+            self.values.popitem(last=False)
+
+# Finds the functions whose result only depends on their arguments. The
+# body of a pure function only reads its parameters and local variables,
+# and only calls pure builtins and named functions that are pure as well.
+# Anything else, like calling a parameter, reading a global variable or
+# defining a function, makes it impure. Named functions can call each
+# other recursively, so they all start out as pure and the ones that
+# turn out not to be are removed until nothing changes anymore.
+#
+# It is kept between programs, so a session that defines its functions
+# one entry at a time ends up with the same result.
+class Purity:
+    def __init__(self, builtins: list[str]):
+        self.builtins = set(builtins)
+
+        # name -> the top-level declarations of that name
+        self.declarations = {}
+
+        # Top-level names that are assigned to, and are
+        # therefore variables instead of functions.
+        self.assigned = set()
+
+        # Functions that are not declared at the top level
+        self.nested = []
+
+        # Every expression that was analyzed, so running
+        # the same program again doesn't declare anything twice.
+        self.seen = weakref.WeakSet()
+
+        self.names = set()
+        self.pure = set()
+
+        self.checks = {
+            Assignment: self.assignment,
+            Destructuring: self.destructuring,
+            Block: self.block,
+            Line: self.line,
+            Conditional: self.conditional,
+            Unary: self.unary,
+            Binary: self.binary,
+            Pipe: self.pipe,
+            Call: self.call,
+            Index: self.index,
+            Variable: self.variable,
+            Grouping: self.grouping,
+            Literal: self.literal,
+            List: self.collection,
+            Tuple: self.collection,
+            Record: self.record,
+            Get: self.get
+        }
+
+    def analyze(self, expressions: list[Expr]):
+        expressions = [expression for expression in expressions if expression not in self.seen]
+        self.seen.update(expressions)
+
+        for expression in expressions:
+            if isinstance(expression, Named):
+                self.declarations.setdefault(expression.name.lexeme, []).append(expression)
+
+        self.assigned.update(Purity.bindings(expressions))
+
+        declared = {id(expression) for expression in expressions}
+        self.nested += [function for function in Purity.functions(expressions) if id(function) not in declared]
+
+        # A function that is declared again with the same amount of
+        # parameters replaces a clause while the program runs, so it
+        # can't be relied on by other functions.
+        names = {name for (name, declarations) in self.declarations.items()
+            if name not in self.assigned and len({len(declaration.parameters) for declaration in declarations}) == len(declarations)}
+        changed = True
+
+        while changed:
+            self.names = set(names)
+            changed = False
+
+            for name in self.names:
+                if not all(self.function(declaration) for declaration in self.declarations[name]):
+                    names.discard(name)
+                    changed = True
+
+        self.pure = {declaration for name in self.names for declaration in self.declarations[name]}
+        self.pure.update(function for function in self.nested if self.function(function))
+
+    # The names that the expressions bind outside of function bodies,
+    # other than the functions declared at the top level. A function
+    # that is declared in a conditional or assigned to a name can
+    # replace a global one while the program runs. This doesn't
+    # recurse either.
+    def bindings(expressions: list[Expr]) -> set[str]:
+        names = set()
+        stack = [expression for expression in expressions if not isinstance(expression, Named)]
+
+        while stack:
+            expression = stack.pop()
+
+            if isinstance(expression, Named):
+                names.add(expression.name.lexeme)
+                continue
+
+            elif isinstance(expression, Function):
+                continue
+
+            elif isinstance(expression, Assignment):
+                names.add(expression.name.lexeme)
+
+            elif isinstance(expression, Destructuring):
+                names.update(name.lexeme for name in expression.names)
+
+            for value in vars(expression).values():
+                if isinstance(value, Expr):
+                    stack.append(value)
+                elif isinstance(value, list):
+                    stack += [item for item in value if isinstance(item, Expr)]
+
+        return names
+
+    # All functions that are declared in the expressions. This doesn't
+    # recurse, as deeply nested code would exceed the recursion limit.
+    def functions(expressions: list[Expr]) -> list[Function]:
+        functions = []
+        stack = list(expressions)
+
+        while stack:
+            expression = stack.pop()
+
+            if isinstance(expression, Function):
+                functions.append(expression)
+
+            for value in vars(expression).values():
+                if isinstance(value, Expr):
+                    stack.append(value)
+                elif isinstance(value, list):
+                    stack += [item for item in value if isinstance(item, Expr)]
+
+        return functions
+
+    def function(self, declaration: Function) -> bool:
+        scope = {parameter.lexeme for parameter in declaration.parameters}
+
+        try:
+            if isinstance(declaration.body, Block):
+                return self.sequence(declaration.body.expressions, scope)
+            else:
+                return self.check(declaration.body.expression, scope)
+
+        except RecursionError:
+            return False
+
+    def check(self, expression: Expr, scope: set) -> bool:
+        check = self.checks.get(type(expression))
+        return check is not None and check(expression, scope)
+
+    def sequence(self, expressions: list[Expr], scope: set) -> bool:
+        return all(self.check(expression, scope) for expression in expressions)
+
+    def assignment(self, expression: Assignment, scope: set) -> bool:
+        pure = self.check(expression.expression, scope)
+        scope.add(expression.name.lexeme)
+
+        return pure
+
+    def destructuring(self, expression: Destructuring, scope: set) -> bool:
+        pure = self.check(expression.expression, scope)
+        scope.update(name.lexeme for name in expression.names)
+
+        return pure
+
+    def block(self, expression: Block, scope: set) -> bool:
+        return self.sequence(expression.expressions, set(scope))
+
+    def line(self, expression: Line, scope: set) -> bool:
+        return self.check(expression.expression, scope)
+
+    def conditional(self, expression: Conditional, scope: set) -> bool:
+        return (self.check(expression.condition, scope)
+            and self.check(expression.ifBranch, scope)
+            and (expression.elseBranch is None or self.check(expression.elseBranch, scope)))
+
+    def unary(self, expression: Unary, scope: set) -> bool:
+        return self.check(expression.right, scope)
+
+    def binary(self, expression: Binary, scope: set) -> bool:
+        return self.check(expression.left, scope) and self.check(expression.right, scope)
+
+    # The stage of a pipe is called like the callee of a call.
+    def pipe(self, expression: Pipe, scope: set) -> bool:
+        stage = expression.right
+
+        if isinstance(stage, Call):
+            return self.check(expression.left, scope) and self.call(stage, scope)
+
+        if not isinstance(stage, Variable) or stage.name.lexeme in scope:
+            return False
+
+        return self.check(expression.left, scope) and self.variable(stage, scope)
+
+    def call(self, expression: Call, scope: set) -> bool:
+        callee = expression.callee
+
+        if not isinstance(callee, Variable) or callee.name.lexeme in scope:
+            return False
+
+        return self.variable(callee, scope) and self.sequence(expression.arguments, scope)
+
+    def index(self, expression: Index, scope: set) -> bool:
+        return self.check(expression.collection, scope) and self.check(expression.index, scope)
+
+    def variable(self, expression: Variable, scope: set) -> bool:
+        name = expression.name.lexeme
+        return name in scope or name in self.names or name in self.builtins
+
+    def grouping(self, expression: Grouping, scope: set) -> bool:
+        return self.check(expression.expression, scope)
+
+    def literal(self, expression: Literal, scope: set) -> bool:
+        return True
+
+    def collection(self, expression: Collection, scope: set) -> bool:
+        return self.sequence(expression.items, scope)
+
+    def record(self, expression: Record, scope: set) -> bool:
+        return self.sequence(expression.values, scope)
+
+    def get(self, expression: Get, scope: set) -> bool:
+        return self.check(expression.record, scope)
+
+# Decides which functions an engine memoizes, and gives all closures of
+# the same pure declaration the same cache. A size of 0 turns automatic
+# memoization off.
+class Memoizer:
+    def __init__(self, builtins: list[str], size: int = MEMO_SIZE):
+        self.purity = Purity(builtins)
+        self.size = size
+
+        # declaration -> Memo
+        self.memos = {}
+
+    def analyze(self, expressions: list[Expr]):
+        if self.size == 0: return
+
+        self.purity.analyze(expressions)
+
+        # A function can become impure when a function it calls is
+        # redefined. Closures that were already created keep their
+        # cache, so it is emptied and stops storing anything.
+        for declaration in [declaration for declaration in self.memos if declaration not in self.purity.pure]:
+            memo = self.memos.pop(declaration)
+            memo.values.clear()
+            memo.size = 0
+
+    def memo(self, declaration: Function, name: str) -> Memo:
+        if declaration not in self.purity.pure:
+            return None
+
+        if declaration not in self.memos:
+            self.memos[declaration] = Memo(name, self.size)
+
+        return self.memos[declaration]
@@ -7,9 +7,6 @@ from config import *
 class ParseError(Exception):
     pass
 
-class LintError(Exception):
-    pass
-
 class Parser:
     def __init__(self, source: str):
         self.source = source
@@ -62,7 +59,7 @@ class Parser:
 
                 # If the full string matches
                 # (because it didn't return in the for loop)
-                return ([], input)
+                return (input[len(input):], input)
 
         return parse
 
@@ -174,33 +171,53 @@ class Lexer(Parser):
         self.errorHandler = grape.errorHandler
         super().__init__(source)
 
-        self.parser = self.many0(self.alt([
-            self.operator,
-            self.brackets,
-            self.keyword,
-            self.number,
-            self.string,    
-            self.boolean,
-            self.identifier,
-            self.punctuation,
-            self.whitespace,
-            self.newline
+        # The grammar is built once, up front. Every rule method returns
+        # a parser instead of parsing, so lexing a token doesn't build
+        # the combinators for the whole grammar all over again.
+        self.parser = self.grammar()
+
+    def grammar(self):
+        return self.many0(self.alt([
+            self.operator(),
+            self.brackets(),
+            self.keyword(),
+            self.number(),
+            self.string(),
+            self.boolean(),
+            self.identifier(),
+            self.punctuation(),
+            self.whitespace(),
+            self.newline()
         ]))
 
+    # Lexing doesn't stop at an unexpected character: it's reported, the
+    # rest of its line becomes an ERROR token and lexing goes on from the
+    # newline. The analyzer still gets the tokens, so one pass reports the
+    # errors of every line, both from lexing and from parsing.
     def lex(self):
-        try:
-            output = self.parser(self.source)
-            
-            if output[0] != "":
-                nextToken = output[0].split()[0]
-                raise ParseError("Unexpected '" + nextToken + "'")
+        input = self.source
+        tokens = []
 
-            tokens = [token for token in output[1] if token is not None]
-            tokens.append(Token(TokenType.EOF, "", None, self.line, self.col))
-            return tokens
+        while True:
+            (input, output) = self.parser(input)
+            tokens += [token for token in output if token is not None]
 
-        except ParseError as e:
-            self.errorHandler.error("Syntax error", self.line, self.col, "", str(e))
+            if input == "": break
+
+            nextToken = input.split()[0]
+            self.errorHandler.error("Syntax error", self.line, self.col, "", "Unexpected '" + nextToken + "'")
+
+            end = input.find("\n")
+            if end == -1: end = len(input)
+
+            offset = len(self.source) - len(input)
+            tokens.append(Token(TokenType.ERROR, input[:end], None, self.line, self.col, offset))
+
+            self.col += end
+            input = input[end:]
+
+        tokens.append(Token(TokenType.EOF, "", None, self.line, self.col, len(self.source)))
+        return tokens
 
     # Map the output of a parser to a token.
     # Accepts an optional argument for converting the 
@@ -210,13 +227,14 @@ class Lexer(Parser):
             output = parser(input)
             lexeme = output[1]
 
-            token = Token(token_type, lexeme, literal(lexeme), self.line, self.col)
+            offset = len(self.source) - len(input)
+            token = Token(token_type, lexeme, literal(lexeme), self.line, self.col, offset)
 
             return (output[0], token)
 
         return parse
 
-    def operator(self, input):
+    def operator(self):
         return self.alt([
             self.token(self.tag("+"), TokenType.PLUS),
             self.token(self.tag("-"), TokenType.MINUS),
@@ -230,25 +248,25 @@ class Lexer(Parser):
             self.token(self.tag(">="), TokenType.GREATER_EQUAL),
             self.token(self.tag(">"), TokenType.GREATER),
             self.token(self.tag("<="), TokenType.LESS_EQUAL),
-            self.token(self.tag("<"), TokenType.LESS_EQUAL),
-            self.token(self.tag("in"), TokenType.IN),
-            self.token(self.tag("and"), TokenType.AND),
-            self.token(self.tag("not"), TokenType.NOT),
-            self.token(self.tag("or"), TokenType.OR),
-            self.token(self.tag("nor"), TokenType.NOR),
-        ])(input)
+            self.token(self.tag("<"), TokenType.LESS),
+            self.token(self.word("in"), TokenType.IN),
+            self.token(self.word("and"), TokenType.AND),
+            self.token(self.word("not"), TokenType.NOT),
+            self.token(self.word("or"), TokenType.OR),
+            self.token(self.word("nor"), TokenType.NOR),
+        ])
 
-    def punctuation(self, input):
+    def punctuation(self):
         return self.alt([
             self.token(self.tag("\\"), TokenType.BACKSLASH),
             self.token(self.tag("|>"), TokenType.PIPE_ARROW),
             self.token(self.tag("|"), TokenType.PIPE),
             self.token(self.tag("."), TokenType.DOT),
-            self.token(self.tag(":"), TokenType.DOT),
+            self.token(self.tag(":"), TokenType.COLON),
             self.token(self.tag(","), TokenType.COMMA)
-        ])(input)
+        ])
 
-    def brackets(self, input):
+    def brackets(self):
         return self.alt([
             self.token(self.tag("("), TokenType.LEFT_PAREN),
             self.token(self.tag(")"), TokenType.RIGHT_PAREN),
@@ -256,75 +274,117 @@ class Lexer(Parser):
             self.token(self.tag("}"), TokenType.RIGHT_BRACE),
             self.token(self.tag("["), TokenType.LEFT_BRACKET),
             self.token(self.tag("]"), TokenType.RIGHT_BRACKET)
-        ])(input)
+        ])
 
-    def keyword(self, input):
+    def keyword(self):
         return self.alt([
-            self.token(self.tag("fn"), TokenType.FN),
-            self.token(self.tag("if"), TokenType.IF),
-            self.token(self.tag("else"), TokenType.ELSE),
-            self.token(self.tag("do"), TokenType.DO),
-            self.token(self.tag("end"), TokenType.END),
+            self.token(self.word("fn"), TokenType.FN),
+            self.token(self.word("if"), TokenType.IF),
+            self.token(self.word("else"), TokenType.ELSE),
+            self.token(self.word("do"), TokenType.DO),
+            self.token(self.word("end"), TokenType.END),
 
             # Namespaces
-            self.token(self.tag("namespace"), TokenType.NAMESPACE),
-            self.token(self.tag("use"), TokenType.USE),
-            self.token(self.tag("import"), TokenType.IMPORT),
-            self.token(self.tag("pub"), TokenType.PUB),
+            self.token(self.word("namespace"), TokenType.NAMESPACE),
+            self.token(self.word("use"), TokenType.USE),
+            self.token(self.word("import"), TokenType.IMPORT),
+            self.token(self.word("pub"), TokenType.PUB),
             self.token(self.tag("@"), TokenType.AT),
             self.token(self.tag("$"), TokenType.EXEC)
-        ])(input)    
+        ])
+
+    # Match a keyword, but not when it is only the start of
+    # an identifier, like the "in" of "interest".
+    def word(self, word: str):
+        tag = self.tag(word)
+
+        def parse(input):
+            following = input[len(word):len(word) + 1]
 
-    def number(self, input):
+            if following != "" and (isAlphaNumeric(following) or following == "_"):
+                raise ParseError
+
+            return tag(input)
+
+        return parse
+
+    def number(self):
         global MAX_DECIMALS
         decimal = lambda d: round(Decimal(d), MAX_DECIMALS)
 
         # Parse a whole bunch of formats
         return self.token(self.alt([
-            self.tag(isDigit),                                 # 0 
-            self.sequence([self.tag(isDigit), self.decimals]), # 0.1
-            self.decimals                                      # .1
-        ]), TokenType.NUMBER, decimal)(input)
-
-    def decimals(self, input):
-        return self.sequence([self.tag("."), self.tag(isDigit)])(input)
-
-    def string(self, input):
-        return self.token(self.sequence([
+            self.sequence([self.tag(isDigit), self.decimals()]), # 0.1
+            self.tag(isDigit),                                   # 0 
+            self.decimals()                                      # .1
+        ]), TokenType.NUMBER, decimal)
+
+    def decimals(self):
+        return self.sequence([self.tag("."), self.tag(isDigit)])
+
+    # A string that is never closed ends at the end of its line, as an
+    # ERROR token, so the rest of the source is still lexed and parsed.
+    # The linter reports it.
+    def string(self):
+        terminated = self.token(self.sequence([
             self.tag('"'), 
             self.tag_until('"'), 
             self.tag('"')
-        ]), TokenType.STRING, str)(input)
+        ]), TokenType.STRING, lambda s: s[1:-1])
 
-    def boolean(self, input):
+        unterminated = self.token(self.sequence([
+            self.tag('"'),
+            self.alt([self.tag_until("\n"), self.tag("")])
+        ]), TokenType.ERROR)
+
+        def parse(input):
+            col = self.col
+
+            try:
+                return terminated(input)
+
+            except ParseError:
+                self.col = col
+
+                if '"' in input[1:]:
+                    raise
+
+                return unterminated(input)
+
+        return parse
+
+    def boolean(self):
         return self.alt([
-            self.token(self.tag("true"), TokenType.TRUE, bool),
-            self.token(self.tag("false"), TokenType.FALSE, bool)
-        ])(input)
+            self.token(self.word("true"), TokenType.TRUE, bool),
+            self.token(self.word("false"), TokenType.FALSE, bool)
+        ])
 
-    def identifier(self, input):
-        return self.token(self.tag(lambda c: isAlphaNumeric(c) or c in ["_"]), TokenType.IDENTIFIER)(input)
+    def identifier(self):
+        return self.token(self.tag(lambda c: isAlphaNumeric(c) or c in ["_"]), TokenType.IDENTIFIER)
 
-    def whitespace(self, input):
+    def whitespace(self):
         return self.alt([
             self.ignore(self.tag(" ")),
             self.ignore(self.tag("\r")),
             self.ignore(self.tag("\t"))
-        ])(input)
+        ])
 
-    def newline(self, input):
-        out = self.token(self.tag("\n"), TokenType.NEWLINE)(input)
-        self.nextLine()
+    def newline(self):
+        newline = self.token(self.tag("\n"), TokenType.NEWLINE)
 
-        return out
+        def parse(input):
+            out = newline(input)
+            self.nextLine()
 
-class Linter(Lexer):
-    def __init__(self, grape, source: str):
-        super().__init__(grape, source)
+            return out
+
+        return parse
 
-        self.parser = self.anywhere([
-            self.unterminatedString,
-            self.maxDecimals
+class Linter(Lexer):
+    def grammar(self):
+        return self.anywhere([
+            self.unterminatedString(),
+            self.maxDecimals()
         ])
 
     def anywhere(self, parsers):
@@ -332,30 +392,36 @@ class Linter(Lexer):
         return self.many0(self.alt(parsers))
 
     def lint(self):
-        try:
-            self.parser(self.source)
+        self.parser(self.source)
 
-        except LintError as e:
-            self.errorHandler.error("Syntax error", self.line, self.col, "", str(e))            
+    # The string is reported, and like the lexer does, the
+    # linter goes on after it from the end of its line.
+    def unterminatedString(self):
+        string = self.string()
 
-    def unterminatedString(self, input):
-        out = self.tag('"')(input)
-    
-        if '"' not in out[0]:
-            raise LintError("Unterminated string")
-        else: 
-            return self.string(input)
+        def parse(input):
+            if input[0:1] == '"' and '"' not in input[1:]:
+                self.errorHandler.error("Syntax error", self.line, self.col, "", "Unterminated string")
+
+            return string(input)
 
-    def maxDecimals(self, input):
+        return parse
+
+    def maxDecimals(self):
         global MAX_DECIMALS
-        out = self.decimals(input)
+        decimals = self.decimals()
+
+        def parse(input):
+            out = decimals(input)
 
-        # The +1 is because out[1] also
-        # includes the leading .
-        if len(out[1]) > MAX_DECIMALS + 1:
-            self.errorHandler.warn(self.line, self.col, "The maximum amount of decimals is set to " + str(MAX_DECIMALS) + ", your value will be rounded")  
+            # The +1 is because out[1] also
+            # includes the leading .
+            if len(out[1]) > MAX_DECIMALS + 1:
+                self.errorHandler.warn(self.line, self.col, "The maximum amount of decimals is set to " + str(MAX_DECIMALS) + ", your value will be rounded")  
 
-        return out
+            return out
+
+        return parse
 
 class Analyzer(Parser):
     def __init__(self, grape, tokens: list[Token]) -> list[Expr]:
@@ -692,4 +758,598 @@ class Analyzer(Parser):
                 self.ignore(self.type(TokenType.COMMA)),
                 parser
             ]))
-        ])
\ No newline at end of file
+        ])
+
+# A frame on the explicit stack of the StackAnalyzer. Every construct
+# that can contain other expressions (a block, a list, a call, ...)
+# gets its own frame, so nesting never turns into Python recursion.
+class Frame:
+    def __init__(self, kind: str, token: Token = None):
+        self.kind = kind
+        self.token = token
+
+        # The expression that is currently being parsed inside
+        # of this frame, as a shift-reduce stack of operators
+        # and operands.
+        self.operators = []
+        self.operands = []
+
+        # Finished statements or collection items.
+        self.items = []
+
+        # Only used by some kinds of frames.
+        self.callee = None
+        self.keys = None
+        self.name = None
+        self.parameters = None
+        self.condition = None
+        self.thenBranch = None
+
+# Parses the same grammar as the Analyzer, but using an explicit stack
+# instead of the Python call stack. This means that deeply nested
+# blocks, long binary chains or huge lists don't hit a RecursionError.
+class StackAnalyzer(Parser):
+    # Frame kinds
+    PROGRAM = "program"
+    BLOCK = "block"
+    LINE = "line"
+    CONDITIONAL = "conditional"
+    FUNCTION = "function"
+    GROUPING = "grouping"
+    LIST = "list"
+    CALL = "call"
+    RECORD = "record"
+    INDEX = "index"
+
+    BRACKETS = [GROUPING, LIST, CALL, RECORD, INDEX]
+
+    OPENING = [TokenType.LEFT_PAREN, TokenType.LEFT_BRACKET, TokenType.LEFT_BRACE]
+    CLOSING = [TokenType.RIGHT_PAREN, TokenType.RIGHT_BRACKET, TokenType.RIGHT_BRACE]
+
+    # Parser states
+    STATEMENT = 0
+    OPERAND = 1
+    OPERATOR = 2
+
+    # Operator kinds
+    ASSIGN = 0
+    UNARY = 1
+    BINARY = 2
+    DESTRUCTURE = 3
+
+    LOWEST = -1
+    UNARY_PRECEDENCE = 8
+
+    PRECEDENCE = {
+        TokenType.PIPE_ARROW: 1,
+        TokenType.OR: 2,
+        TokenType.AND: 3,
+        TokenType.EQUAL_EQUAL: 4,
+        TokenType.BANG_EQUAL: 4,
+        TokenType.GREATER: 5,
+        TokenType.GREATER_EQUAL: 5,
+        TokenType.LESS: 5,
+        TokenType.LESS_EQUAL: 5,
+        TokenType.IN: 5,
+        TokenType.PLUS: 6,
+        TokenType.MINUS: 6,
+        TokenType.SLASH: 7,
+        TokenType.STAR: 7,
+        TokenType.PERCENT: 7,
+        TokenType.ROOF: 9
+    }
+
+    RIGHT_ASSOCIATIVE = [TokenType.ROOF]
+
+    LITERALS = [
+        TokenType.NUMBER,
+        TokenType.STRING,
+        TokenType.ATOM,
+        TokenType.TRUE,
+        TokenType.FALSE
+    ]
+
+    def __init__(self, grape, tokens: list[Token]) -> list[Expr]:
+        self.errorHandler = grape.errorHandler
+        super().__init__(tokens)
+
+        self.current = 0
+        self.nodes = HashConsing() if grape.hashCons else NodeFactory()
+
+    # Parsing doesn't stop at the first error either. After reporting it,
+    # the parser recovers and goes on with the next statement, so one pass
+    # reports every error. Returns None if any error was reported.
+    def analyze(self):
+        frames = [Frame(self.PROGRAM)]
+        state = self.STATEMENT
+        failed = False
+
+        while state is not None:
+            try:
+                expressions = self.program(frames, state)
+                return None if failed else expressions
+
+            except ParseError as e:
+                # The lexer already reported the parts it couldn't lex
+                if self.source[self.current - 1].type != TokenType.ERROR:
+                    self.errorHandler.error("Syntax error", self.line, self.col, "", str(e))
+
+                failed = True
+                state = self.recover(frames)
+
+    # The main shift-reduce loop. Each state handler returns the
+    # next state, the frames stack holds everything else.
+    def program(self, frames, state):
+        while True:
+            if state == self.STATEMENT:
+                state = self.statement(frames)
+
+                if state is None:
+                    return frames[0].items
+
+            elif state == self.OPERAND:
+                state = self.operand(frames)
+
+            else:
+                state = self.operator(frames)
+
+    def statement(self, frames):
+        frame = frames[-1]
+        self.skipNewlines()
+
+        if frame.kind == self.PROGRAM and self.check(TokenType.EOF):
+            return None
+
+        if frame.kind == self.BLOCK and self.check(TokenType.END):
+            self.nextToken()
+            frames.pop()
+
+            if frame.thenBranch is None:
+                return self.deliver(frames, self.nodes.make(Block, frame.items))
+            else:
+                return self.deliver(frames, frame.thenBranch, self.nodes.make(Block, frame.items))
+
+        if frame.kind == self.BLOCK and self.check(TokenType.ELSE):
+            parent = frames[-2]
+
+            if parent.kind != self.CONDITIONAL or frame.thenBranch is not None:
+                raise self.unexpected(self.nextToken())
+
+            self.nextToken()
+            frame.thenBranch = self.nodes.make(Block, frame.items)
+            frame.items = []
+
+            return self.STATEMENT
+
+        return self.OPERAND
+
+    def operand(self, frames):
+        frame = frames[-1]
+
+        if frame.kind in self.BRACKETS:
+            self.skipNewlines()
+
+        # Every value of a record starts with its key.
+        if frame.kind == self.RECORD and len(frame.keys) == len(frame.items) and not frame.operators:
+            self.key(frame)
+
+        token = self.nextToken()
+
+        if token.type in self.LITERALS:
+            frame.operands.append(self.nodes.make(Literal, token))
+            return self.OPERATOR
+
+        elif token.type == TokenType.IDENTIFIER:
+            if self.check(TokenType.EQUAL):
+                self.nextToken()
+                frame.operators.append((self.ASSIGN, token, 0))
+                return self.OPERAND
+
+            frame.operands.append(self.nodes.make(Variable, token))
+            return self.OPERATOR
+
+        elif token.type in [TokenType.MINUS, TokenType.NOT, TokenType.EXEC]:
+            frame.operators.append((self.UNARY, token, self.UNARY_PRECEDENCE))
+            return self.OPERAND
+
+        elif token.type == TokenType.LEFT_PAREN:
+            frames.append(Frame(self.GROUPING, token))
+            return self.collection(frames)
+
+        elif token.type == TokenType.LEFT_BRACKET:
+            frames.append(Frame(self.LIST, token))
+            return self.collection(frames)
+
+        elif token.type == TokenType.LEFT_BRACE:
+            record = Frame(self.RECORD, token)
+            record.keys = []
+
+            frames.append(record)
+            return self.collection(frames)
+
+        elif token.type == TokenType.IF:
+            frames.append(Frame(self.CONDITIONAL, token))
+            return self.OPERAND
+
+        elif token.type == TokenType.FN:
+            return self.function(frames, token)
+
+        elif token.type == TokenType.DO:
+            return self.scoped(frames)
+
+        raise self.unexpected(token)
+
+    def operator(self, frames):
+        frame = frames[-1]
+
+        if frame.kind in self.BRACKETS:
+            self.skipNewlines()
+
+        token = self.peek()
+
+        if token.type in self.PRECEDENCE:
+            self.nextToken()
+            precedence = self.PRECEDENCE[token.type]
+
+            self.reduce(frame, precedence)
+            frame.operators.append((self.BINARY, token, precedence))
+
+            return self.OPERAND
+
+        # Calls bind tighter than any operator, so they
+        # apply to the last operand directly.
+        elif token.type == TokenType.LEFT_PAREN:
+            self.nextToken()
+
+            call = Frame(self.CALL, token)
+            call.callee = frame.operands.pop()
+            frames.append(call)
+
+            return self.collection(frames)
+
+        # So does reading a field.
+        elif token.type == TokenType.DOT:
+            self.nextToken()
+
+            name = self.expect(TokenType.IDENTIFIER)
+            frame.operands.append(self.nodes.make(Get, frame.operands.pop(), name))
+
+            return self.OPERATOR
+
+        # And so does indexing.
+        elif token.type == TokenType.LEFT_BRACKET:
+            self.nextToken()
+
+            index = Frame(self.INDEX, token)
+            index.callee = frame.operands.pop()
+            frames.append(index)
+
+            return self.collection(frames)
+
+        # A tuple of names that is assigned to is a destructuring.
+        elif token.type == TokenType.EQUAL and self.pattern(frame):
+            self.nextToken()
+
+            names = [item.name for item in frame.operands.pop().items]
+            frame.operators.append((self.DESTRUCTURE, names, 0))
+
+            return self.OPERAND
+
+        # Any other token ends the expression in this frame.
+        self.reduce(frame, self.LOWEST)
+        return self.complete(frames, frame.operands.pop(), token)
+
+    # Pop operators with a higher precedence than the given one
+    # and replace their operands by the resulting expression.
+    def reduce(self, frame: Frame, precedence: int):
+        while frame.operators:
+            (kind, token, current) = frame.operators[-1]
+
+            if current < precedence:
+                break
+
+            if current == precedence and token.type in self.RIGHT_ASSOCIATIVE:
+                break
+
+            frame.operators.pop()
+            right = frame.operands.pop()
+
+            if kind == self.BINARY and token.type == TokenType.PIPE_ARROW:
+                left = frame.operands.pop()
+                frame.operands.append(self.nodes.make(Pipe, left, token, right))
+
+            elif kind == self.BINARY:
+                left = frame.operands.pop()
+                frame.operands.append(self.nodes.make(Binary, left, token, right))
+
+            elif kind == self.UNARY and token.type == TokenType.EXEC:
+                frame.operands.append(self.nodes.make(Exec, token, right))
+
+            elif kind == self.UNARY:
+                frame.operands.append(self.nodes.make(Unary, token, right))
+
+            elif kind == self.DESTRUCTURE:
+                frame.operands.append(self.nodes.make(Destructuring, token, right))
+
+            else:
+                frame.operands.append(self.nodes.make(Assignment, token, right))
+
+    # Whether the last operand can be assigned to: a tuple of different
+    # names, which is not the operand of anything but another assignment.
+    def pattern(self, frame: Frame) -> bool:
+        if not frame.operands or not isinstance(frame.operands[-1], Tuple):
+            return False
+
+        if any(kind not in [self.ASSIGN, self.DESTRUCTURE] for (kind, _, _) in frame.operators):
+            return False
+
+        items = frame.operands[-1].items
+
+        if not all(isinstance(item, Variable) for item in items):
+            return False
+
+        names = [item.name.lexeme for item in items]
+
+        for (i, name) in enumerate(names):
+            if name in names[:i]:
+                raise ParseError("Can't assign to '" + name + "' twice")
+
+        return True
+
+    # Hand a finished expression to the frame it belongs to.
+    def complete(self, frames, expression: Expr, token: Token):
+        frame = frames[-1]
+
+        if frame.kind in [self.PROGRAM, self.BLOCK]:
+            frame.items.append(expression)
+
+            if token.type == TokenType.NEWLINE:
+                self.nextToken()
+                return self.STATEMENT
+
+            elif frame.kind == self.PROGRAM and token.type == TokenType.EOF:
+                return self.STATEMENT
+
+            elif frame.kind == self.BLOCK and token.type in [TokenType.END, TokenType.ELSE]:
+                return self.STATEMENT
+
+        # A line ends with the expression, the token that
+        # ended it belongs to the surrounding expression.
+        elif frame.kind == self.LINE:
+            frames.pop()
+            return self.deliver(frames, self.nodes.make(Line, expression))
+
+        elif frame.kind == self.CONDITIONAL:
+            if token.type == TokenType.DO:
+                self.nextToken()
+                frame.condition = expression
+                return self.scoped(frames)
+
+        elif frame.kind in self.BRACKETS:
+            frame.items.append(expression)
+
+            if token.type == TokenType.COMMA:
+                self.nextToken()
+                return self.OPERAND
+
+            elif token.type == self.closing(frame):
+                self.nextToken()
+                return self.close(frames, token)
+
+        raise self.unexpected(self.nextToken())
+
+    # Hand a finished scoped to the function or condition it
+    # belongs to, or use it as an operand.
+    def deliver(self, frames, scoped: Scoped, elseBranch: Scoped = None):
+        parent = frames[-1]
+
+        if parent.kind == self.FUNCTION:
+            frames.pop()
+
+            if parent.name is None:
+                expression = self.nodes.make(Lambda, parent.parameters, scoped)
+            else:
+                expression = self.nodes.make(Named, parent.name, parent.parameters, scoped)
+
+        elif parent.kind == self.CONDITIONAL and parent.condition is not None:
+            frames.pop()
+            expression = self.nodes.make(Conditional, parent.condition, scoped, elseBranch)
+
+        else:
+            expression = scoped
+
+        frames[-1].operands.append(expression)
+        return self.OPERATOR
+
+    # Start parsing the items of a list, tuple, grouping or
+    # call, and handle empty ones right away.
+    def collection(self, frames):
+        frame = frames[-1]
+        self.skipNewlines()
+
+        if self.check(self.closing(frame)):
+            return self.close(frames, self.nextToken())
+
+        return self.OPERAND
+
+    def close(self, frames, token: Token):
+        frame = frames.pop()
+
+        if frame.kind == self.CALL:
+            expression = self.nodes.make(Call, frame.callee, frame.items, token)
+        elif frame.kind == self.LIST:
+            expression = self.nodes.make(List, frame.items)
+        elif frame.kind == self.RECORD:
+            expression = self.nodes.make(Record, frame.keys, frame.items)
+        elif frame.kind == self.INDEX and len(frame.items) == 1:
+            expression = self.nodes.make(Index, frame.callee, frame.items[0], token)
+        elif frame.kind == self.INDEX:
+            raise ParseError("Expected one index")
+        # A tuple can't have just one value, otherwise it is considered a grouping
+        elif len(frame.items) == 1:
+            expression = self.nodes.make(Grouping, frame.items[0])
+        else:
+            expression = self.nodes.make(Tuple, frame.items)
+
+        frames[-1].operands.append(expression)
+        return self.OPERATOR
+
+    def closing(self, frame: Frame) -> TokenType:
+        if frame.kind in [self.LIST, self.INDEX]:
+            return TokenType.RIGHT_BRACKET
+        elif frame.kind == self.RECORD:
+            return TokenType.RIGHT_BRACE
+        else:
+            return TokenType.RIGHT_PAREN
+
+    # The key of a record field and the colon after it.
+    def key(self, frame: Frame):
+        key = self.expect(TokenType.IDENTIFIER)
+
+        if key.lexeme in [other.lexeme for other in frame.keys]:
+            raise ParseError("Duplicate field '" + key.lexeme + "'")
+
+        self.expect(TokenType.COLON)
+        frame.keys.append(key)
+
+    # The name and parameters of a function are flat, so they are
+    # parsed right away. Only the body needs a frame.
+    def function(self, frames, token: Token):
+        frame = Frame(self.FUNCTION, token)
+
+        if self.check(TokenType.IDENTIFIER):
+            frame.name = self.nextToken()
+
+        self.expect(TokenType.LEFT_PAREN)
+        frame.parameters = []
+
+        if not self.check(TokenType.RIGHT_PAREN):
+            frame.parameters.append(self.expect(TokenType.IDENTIFIER))
+
+            while self.check(TokenType.COMMA):
+                self.nextToken()
+                frame.parameters.append(self.expect(TokenType.IDENTIFIER))
+
+        self.expect(TokenType.RIGHT_PAREN)
+        self.expect(TokenType.DO)
+
+        frames.append(frame)
+        return self.scoped(frames)
+
+    # A "do" that is directly followed by a newline starts a block,
+    # otherwise the rest of the line is the body.
+    def scoped(self, frames):
+        if self.check(TokenType.NEWLINE):
+            frames.append(Frame(self.BLOCK))
+            return self.STATEMENT
+        else:
+            frames.append(Frame(self.LINE))
+            return self.OPERAND
+
+    # Panic mode: drop the expression that failed, skip to the end of its
+    # line and return the state to go on in, or None when the file ended.
+    # Parsing goes on with the next statement of the innermost block, or
+    # at the end that closes it. Brackets that are still open and blocks
+    # that start in the skipped tokens are skipped up to where they close.
+    def recover(self, frames):
+        if self.check(TokenType.EOF): return None
+
+        # The token that caused the error, and whether it starts a line
+        token = self.source[self.current - 1]
+        starts = self.current < 2 or self.source[self.current - 2].type == TokenType.NEWLINE
+
+        innermost = frames[-1]
+        depth = 0
+        blocks = 0
+
+        while frames[-1].kind not in [self.PROGRAM, self.BLOCK]:
+            if frames[-1].kind in self.BRACKETS:
+                depth += 1
+
+            frames.pop()
+
+        frame = frames[-1]
+        frame.operators = []
+        frame.operands = []
+
+        # A line that can't go on with the brackets of an earlier line was
+        # most likely meant to be a statement, and they were never closed.
+        if starts and depth > 0:
+            self.current -= 1
+            return self.STATEMENT
+
+        # A closing bracket most likely belonged to the innermost one,
+        # and a newline or end is where the line ends anyway.
+        if token.type in self.CLOSING and innermost.kind in self.BRACKETS:
+            depth -= 1
+        elif token.type in [TokenType.NEWLINE, TokenType.END]:
+            self.current -= 1
+        elif token.type == TokenType.DO and self.check(TokenType.NEWLINE):
+            blocks += 1
+
+        # The lexer skipped the rest of the line, which might
+        # have closed the brackets, like an unterminated string.
+        if token.type == TokenType.ERROR:
+            depth = 0
+
+        while True:
+            token = self.peek()
+
+            if token.type == TokenType.EOF:
+                return None
+
+            elif token.type == TokenType.END and blocks == 0:
+                if frame.kind == self.BLOCK:
+                    return self.STATEMENT
+
+            elif token.type == TokenType.NEWLINE and blocks == 0 and depth <= 0:
+                self.nextToken()
+                return self.STATEMENT
+
+            elif token.type == TokenType.DO and self.source[self.current + 1].type == TokenType.NEWLINE:
+                blocks += 1
+            elif token.type == TokenType.END:
+                blocks -= 1
+            elif token.type in self.OPENING:
+                depth += 1
+            elif token.type in self.CLOSING:
+                depth -= 1
+
+            self.nextToken()
+
+    def peek(self) -> Token:
+        return self.source[self.current]
+
+    def check(self, token_type: TokenType) -> bool:
+        return self.peek().type == token_type
+
+    def nextToken(self) -> Token:
+        token = self.peek()
+
+        if token.type != TokenType.EOF:
+            self.current += 1
+
+        self.line = token.line
+        self.col = token.col
+
+        return token
+
+    def expect(self, token_type: TokenType) -> Token:
+        token = self.nextToken()
+
+        if token.type != token_type:
+            raise self.unexpected(token)
+
+        return token
+
+    def skipNewlines(self):
+        while self.check(TokenType.NEWLINE):
+            self.nextToken()
+
+    def unexpected(self, token: Token) -> ParseError:
+        if token.type == TokenType.EOF:
+            return ParseError("Unexpected end of file")
+        elif token.type == TokenType.NEWLINE:
+            return ParseError("Unexpected end of line")
+        else:
+            return ParseError("Unexpected '" + token.lexeme + "'")
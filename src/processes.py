@@ -0,0 +1,363 @@
+import contextvars
+import sys
+import threading
+from collections import deque
+from decimal import *
+from syntax.ast import *
+from records import Struct
+from ropes import Rope
+from utils import Lazy
+
+# Only imported once processes are sent to other nodes
+multiprocessing = Lazy("multiprocessing")
+
+# The identifier of a process: the node it runs on, the node
+# that spawned it and the number that node gave it.
+class Pid:
+    __slots__ = ("node", "origin", "number")
+
+    def __init__(self, node: int, origin: int, number: int):
+        self.node = node
+        self.origin = origin
+        self.number = number
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Pid) and (self.node, self.origin, self.number) == (other.node, other.origin, other.number)
+
+    def __hash__(self) -> int:
+        return hash((self.node, self.origin, self.number))
+
+class Process:
+    def __init__(self, pid: Pid, function, arguments: list):
+        self.pid = pid
+        self.function = function
+        self.arguments = arguments
+        self.mailbox = deque()
+
+        # Set while it waits for a message
+        self.waiting = False
+
+        # A process gets a thread when it first runs. When it's paused,
+        # the scheduler sets wake to give it the turn again.
+        self.started = False
+        self.ident = None
+        self.wake = threading.Event()
+
+# Runs lightweight processes, which only share data by sending each other
+# messages, like pid = spawn(simulate, 100) and send(pid, (Done, value)).
+# Scheduling is cooperative: one process runs at a time, and it keeps
+# running until it waits for a message or ends, so Grape code never needs
+# a lock. Python can't switch between stacks on its own, so a process runs
+# on a thread of its own, but there is only one turn, which the scheduler
+# hands from one thread to the next, and every other thread is paused.
+#
+# The program itself is the main process. When it ends, the processes
+# that can still run get their turn before the engine returns.
+#
+# With nodes, processes that the main process spawns are spread over that
+# many worker processes of the OS, so they run on all cores. Every node is
+# a Grape of its own with its own scheduler, which knows the named
+# functions of the program. Only named functions whose arguments can be
+# sent to another node are spawned there, anything else runs locally.
+class Scheduler:
+    MAIN = 0
+
+    def __init__(self, engine, settings: dict):
+        self.engine = engine
+        self.node = Scheduler.MAIN
+        self.count = 0
+
+        self.main = Process(Pid(self.node, self.node, 0), None, [])
+        self.main.started = True
+        self.main.ident = threading.get_ident()
+        self.current = self.main
+
+        # pid -> process, for every process of this node that hasn't ended
+        self.processes = {self.main.pid: self.main}
+        self.ready = deque()
+
+        # Set when the main process got the turn because
+        # no other process could run.
+        self.idle = False
+        self.finishing = False
+
+        self.nodes = Nodes(settings) if settings["nodes"] > 0 else None
+
+        # The queues of all nodes, when this node is connected to others
+        self.inboxes = None
+
+        # The amount of processes that run on other nodes. Worker nodes
+        # tell the main node when one starts or ends, so the main node
+        # knows when no message can come anymore.
+        self.remote = 0
+
+        # The top-level named functions, which the nodes define
+        self.declarations = []
+
+    def declare(self, expressions: list[Expr]):
+        if self.nodes is not None:
+            self.declarations += [expression for expression in expressions if isinstance(expression, Named)]
+
+    def spawn(self, function, arguments: list) -> Pid:
+        if self.nodes is not None and self.portable(function, arguments):
+            if self.inboxes is None:
+                self.inboxes = self.nodes.start(self.declarations, self.engine.errorHandler.file)
+
+            pid = self.newPid(self.nodes.next())
+            self.inboxes[pid.node].put(("spawn", pid, function.name, arguments))
+            self.remote += 1
+
+            return pid
+
+        process = Process(self.newPid(self.node), function, arguments)
+        self.start(process)
+
+        return process.pid
+
+    def start(self, process: Process):
+        self.processes[process.pid] = process
+        self.ready.append(process)
+
+        if self.node != Scheduler.MAIN and self.inboxes is not None:
+            self.inboxes[Scheduler.MAIN].put(("started",))
+
+    def newPid(self, node: int) -> Pid:
+        self.count += 1
+        return Pid(node, self.node, self.count)
+
+    # The pid of the process that is running
+    def pid(self) -> Pid:
+        return self.current.pid
+
+    # Whether a process can run on another node: its function
+    # is defined globally, and its arguments can be sent.
+    def portable(self, function, arguments: list) -> bool:
+        if self.engine.globals.values.get(function.name) is not function:
+            return False
+
+        return all(Nodes.portable(argument) for argument in arguments)
+
+    def send(self, pid, message):
+        if not isinstance(pid, Pid):
+            raise ValueError("Can only send messages to processes")
+
+        if pid.node == self.node:
+            self.deliver(pid, message)
+
+        elif not Nodes.portable(message):
+            raise ValueError("Can only send plain values to processes on other nodes")
+
+        elif self.inboxes is not None:
+            self.inboxes[pid.node].put(("send", pid, message))
+
+        return message
+
+    # Messages to processes that have ended are dropped.
+    def deliver(self, pid: Pid, message):
+        process = self.processes.get(pid)
+        if process is None: return
+
+        process.mailbox.append(message)
+
+        if process.waiting:
+            process.waiting = False
+            self.ready.append(process)
+
+    # Wait for the next message of the running process,
+    # and let the other processes run in the meantime.
+    def receive(self):
+        process = self.current
+
+        while not process.mailbox:
+            process.waiting = True
+            self.switch(self.next())
+
+            if not process.mailbox and process is self.main and self.idle:
+                process.waiting = False
+                raise ValueError("Every process is waiting for a message")
+
+        return process.mailbox.popleft()
+
+    # The next process that can run. A node that is connected to
+    # others waits for their messages until one can, unless the
+    # main process has ended or nothing runs on the others.
+    def next(self) -> Process:
+        while not self.ready:
+            if self.inboxes is None or self.finishing:
+                return None
+
+            if self.node == Scheduler.MAIN and self.remote == 0:
+                return None
+
+            self.receiveNode(self.inboxes[self.node].get())
+
+        return self.ready.popleft()
+
+    # Give the turn to another process (or to the main process when
+    # none can run), and wait until this one gets it back.
+    def switch(self, following: Process):
+        process = self.current
+
+        self.hand(following)
+
+        process.wake.wait()
+        process.wake.clear()
+
+    def hand(self, following: Process):
+        self.idle = following is None
+
+        if following is None:
+            following = self.main
+
+        self.current = following
+
+        if following.started:
+            following.wake.set()
+        else:
+            following.started = True
+            # With the context of the process that spawned it, so the
+            # server sends what it prints to the same client.
+            context = contextvars.copy_context()
+            threading.Thread(target=context.run, args=(self.run, following), daemon=True).start()
+
+    # The thread of a process. The engine reports the errors
+    # of a process, which only end that process.
+    def run(self, process: Process):
+        process.ident = threading.get_ident()
+
+        try:
+            self.engine.apply(process.function, process.arguments)
+
+        finally:
+            del self.processes[process.pid]
+
+            if self.node != Scheduler.MAIN:
+                self.inboxes[Scheduler.MAIN].put(("ended",))
+
+            self.hand(self.next())
+
+    # Let the processes that can still run have their turn, after the
+    # main process has ended. The nodes are only stopped once every
+    # process on them has ended too, as their messages can still make
+    # processes of this node ready.
+    def finish(self):
+        self.finishing = True
+
+        try:
+            while True:
+                while self.ready:
+                    self.switch(self.ready.popleft())
+
+                if self.inboxes is None or self.remote == 0:
+                    break
+
+                self.receiveNode(self.inboxes[self.node].get())
+
+        finally:
+            self.finishing = False
+
+        if self.inboxes is not None:
+            self.nodes.stop(self.inboxes)
+            self.inboxes = None
+            self.remote = 0
+
+    # Handle a message from another node.
+    def receiveNode(self, message: tuple):
+        match message:
+            case ("spawn", pid, name, arguments):
+                process = Process(pid, self.engine.globals.values.get(name), arguments)
+
+                self.processes[pid] = process
+                self.ready.append(process)
+
+            case ("send", pid, value):
+                self.deliver(pid, value)
+
+            case ("started",):
+                self.remote += 1
+
+            case ("ended",):
+                self.remote -= 1
+
+    # Run the processes that other nodes send to this one,
+    # which is all a worker node does until it's stopped.
+    def serve(self, node: int, inboxes: list):
+        self.node = node
+        self.inboxes = inboxes
+
+        while True:
+            self.receiveNode(inboxes[node].get())
+
+            while self.ready:
+                self.switch(self.ready.popleft())
+
+# The worker processes of the OS that the main node spawns processes on.
+# The nodes are numbered from 1, as node 0 is the main node.
+class Nodes:
+    # The values that can be sent to other nodes, next to
+    # lists, tuples and records of them.
+    PLAIN = (Decimal, str, Rope, bool, type(None), Pid)
+
+    def __init__(self, settings: dict):
+        self.count = settings["nodes"]
+        self.workers = []
+        self.last = 0
+
+        # The workers run with the settings of the main node, but
+        # don't report or profile anything, and have no nodes.
+        self.settings = dict(settings, debug=False, profile=False, sampleProfile=None, nodes=0)
+
+    # Start the workers, and return the queues of all nodes.
+    def start(self, declarations: list[Named], file: str) -> list:
+        inboxes = [multiprocessing.Queue() for _ in range(self.count + 1)]
+
+        # Otherwise the workers would print it again
+        sys.stdout.flush()
+
+        self.workers = [multiprocessing.Process(target=Nodes.serve, args=(node, inboxes, declarations, self.settings, file), daemon=True)
+            for node in range(1, self.count + 1)]
+
+        for worker in self.workers:
+            worker.start()
+
+        return inboxes
+
+    # Stop the workers, once no process runs on them anymore.
+    def stop(self, inboxes: list):
+        for worker in self.workers:
+            worker.terminate()
+            worker.join()
+
+        for inbox in inboxes:
+            inbox.cancel_join_thread()
+
+        self.workers = []
+
+    # The worker nodes take turns.
+    def next(self) -> int:
+        self.last = self.last % self.count + 1
+        return self.last
+
+    def portable(value) -> bool:
+        if isinstance(value, (list, tuple)):
+            return all(Nodes.portable(item) for item in value)
+
+        elif isinstance(value, Struct):
+            return all(Nodes.portable(item) for item in value.values)
+
+        return isinstance(value, Nodes.PLAIN)
+
+    # The main function of a worker node
+    def serve(node: int, inboxes: list, declarations: list[Named], settings: dict, file: str):
+        from grape import Grape
+
+        # Workers can be stopped at any time,
+        # so nothing they print may be buffered.
+        sys.stdout.reconfigure(line_buffering=True)
+
+        grape = Grape()
+        grape.configure(settings)
+        grape.errorHandler.file = file
+
+        grape.interpret(declarations)
+        grape.interpreter.scheduler.serve(node, inboxes)
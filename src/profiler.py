@@ -0,0 +1,130 @@
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from syntax.ast import *
+from config import *
+
+# A statistical profiler for Grape code. A background thread looks at the
+# Python stack of the running Grape process every interval, and asks the
+# engine which Grape functions are being called on it. Nothing is added to
+# the calls themselves, so the program runs at almost the same speed, and
+# the profile shows Grape functions instead of the internals of the engine.
+class Sampler:
+    # The frame of samples that are not inside of any function
+    PROGRAM = "<program>"
+
+    def __init__(self, engine, file: str, interval: float = SAMPLE_INTERVAL):
+        self.engine = engine
+        self.file = os.path.basename(file)
+        self.interval = interval
+
+        # (name, line, col) -> index, and the other way around
+        self.indices = {}
+        self.frames = []
+
+        # (stack of frame indices, seconds since the sample before)
+        self.samples = []
+
+        self.stopped = threading.Event()
+        self.thread = None
+        self.last = None
+
+    def start(self):
+        self.last = time.perf_counter()
+        context = contextvars.copy_context()
+        self.thread = threading.Thread(target=context.run, args=(self.run,), name="grape-sampler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        frame = sys._current_frames().get(self.engine.scheduler.current.ident)
+        if frame is None: return
+
+        stack = tuple(self.index(name, declaration) for (name, declaration) in self.engine.stack(frame))
+
+        if stack == ():
+            stack = (self.index(Sampler.PROGRAM, None),)
+
+        now = time.perf_counter()
+        self.samples.append((stack, now - self.last))
+        self.last = now
+
+    def index(self, name: str, declaration: Function) -> int:
+        token = Sampler.position(declaration)
+        key = (name, 0, 0) if token is None else (name, token.line, token.col)
+
+        if key not in self.indices:
+            self.indices[key] = len(self.frames)
+            self.frames.append(key)
+
+        return self.indices[key]
+
+    # The token a function is found at: the name of a named function,
+    # or the first parameter of a lambda.
+    def position(declaration: Function) -> Token:
+        if isinstance(declaration, Named):
+            return declaration.name
+        elif isinstance(declaration, Function) and declaration.parameters:
+            return declaration.parameters[0]
+
+        return None
+
+    # Write the profile as speedscope JSON when the path ends with
+    # .json, and as collapsed stacks (for flamegraph.pl) otherwise.
+    def write(self, path: str):
+        with open(path, "w") as file:
+            if path.endswith(".json"):
+                json.dump(self.speedscope(), file)
+            else:
+                file.write(self.collapsed())
+
+    # One line per stack, with the functions separated by
+    # semicolons and followed by how often it was sampled.
+    def collapsed(self) -> str:
+        counts = {}
+
+        for (stack, _) in self.samples:
+            counts[stack] = counts.get(stack, 0) + 1
+
+        return "".join(";".join(self.label(index) for index in stack) + " " + str(count) + "\n"
+            for (stack, count) in counts.items())
+
+    def label(self, index: int) -> str:
+        (name, line, col) = self.frames[index]
+
+        if line == 0:
+            return name
+
+        return name + " (" + self.file + ":" + str(line) + ":" + str(col) + ")"
+
+    # https://www.speedscope.app/file-format-schema.json
+    def speedscope(self) -> dict:
+        frames = [{"name": name} if line == 0 else {"name": name, "file": self.file, "line": line, "col": col}
+            for (name, line, col) in self.frames]
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "exporter": "grape",
+            "name": self.file,
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": self.file,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weight for (_, weight) in self.samples),
+                "samples": [list(stack) for (stack, _) in self.samples],
+                "weights": [weight for (_, weight) in self.samples]
+            }]
+        }
@@ -0,0 +1,104 @@
+from decimal import *
+
+# An arithmetic sequence of numbers, like range(0, 100, 0.5). It only
+# stores where it starts, its step and its length, so its length, an item
+# at any index and whether it contains a number are all calculated
+# instead of looked up, and it is never turned into a list.
+#
+# Decimals only keep 28 digits, so ranges of whole numbers calculate
+# with ints instead, which are exact however long the range is.
+class Range:
+    __slots__ = ("start", "step", "length", "integral")
+
+    def __init__(self, start: Decimal, step: Decimal, length: int):
+        self.start = start
+        self.step = step
+        self.length = length
+        self.integral = start == start.to_integral_value() and step == step.to_integral_value()
+
+    # The numbers from start up to (but not including) stop. Raises
+    # a ValueError when the arguments don't describe a range.
+    def of(start, stop, step) -> "Range":
+        for value in [start, stop, step]:
+            if not isinstance(value, Decimal):
+                raise ValueError("The bounds and step of a range must be numbers")
+
+        if step == 0:
+            raise ValueError("The step of a range can't be 0")
+
+        if start == start.to_integral_value() and stop == stop.to_integral_value() and step == step.to_integral_value():
+            length = -((int(start) - int(stop)) // int(step))
+        else:
+            length = int(((stop - start) / step).to_integral_value(rounding=ROUND_CEILING))
+
+        return Range(start, step, max(0, length))
+
+    def __len__(self) -> int:
+        return self.length
+
+    # Negative indices count from the end. Raises an
+    # IndexError when the index is out of range.
+    def __getitem__(self, index: int) -> Decimal:
+        if index < 0:
+            index += self.length
+
+        if index < 0 or index >= self.length:
+            raise IndexError
+
+        if self.integral:
+            return Decimal(int(self.start) + index * int(self.step))
+
+        return self.start + index * self.step
+
+    def __contains__(self, value) -> bool:
+        if type(value) is not Decimal or self.length == 0:
+            return False
+
+        if self.integral:
+            if value != value.to_integral_value():
+                return False
+
+            (index, remainder) = divmod(int(value) - int(self.start), int(self.step))
+            return remainder == 0 and 0 <= index < self.length
+
+        index = (value - self.start) / self.step
+        return index == index.to_integral_value() and 0 <= index < self.length
+
+    def __iter__(self):
+        if self.integral:
+            step = int(self.step)
+            start = int(self.start)
+
+            yield from map(Decimal, range(start, start + self.length * step, step))
+            return
+
+        value = self.start
+
+        for _ in range(self.length):
+            yield value
+            value += self.step
+
+    # The first items of the range, as another range.
+    def take(self, amount: int) -> "Range":
+        return Range(self.start, self.step, min(self.length, amount))
+
+    def sum(self) -> Decimal:
+        if self.integral:
+            return Decimal(self.length * int(self.start) + int(self.step) * (self.length * (self.length - 1) // 2))
+
+        return self.length * self.start + self.step * (self.length * (self.length - 1) // 2)
+
+    def stop(self) -> Decimal:
+        if self.integral:
+            return Decimal(int(self.start) + self.length * int(self.step))
+
+        return self.start + self.length * self.step
+
+    # Ranges with the same items are equal.
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Range) or self.length != other.length:
+            return False
+
+        return self.length == 0 or (self.start == other.start and (self.length == 1 or self.step == other.step))
+
+    __hash__ = None
@@ -0,0 +1,76 @@
+# The hidden class of a record: its field names in order, and the slot
+# every field is stored in. Shapes are interned, so all records with the
+# same fields in the same order share one shape, and two records have the
+# same layout exactly when their shapes are the same object.
+class Shape:
+    shapes = {}
+
+    def __init__(self, fields: tuple[str]):
+        self.fields = fields
+        self.slots = {field: slot for (slot, field) in enumerate(fields)}
+
+    def of(fields: tuple[str]) -> "Shape":
+        shape = Shape.shapes.get(fields)
+
+        if shape is None:
+            shape = Shape(fields)
+            Shape.shapes[fields] = shape
+
+        return shape
+
+    # Records that are sent to another process get the shape
+    # that is interned there, instead of a copy of this one.
+    def __reduce__(self):
+        return (Shape.of, (self.fields,))
+
+# The value of a record, like {start_value: 100, dt: 1}. The fields
+# are stored in a flat list of slots, and the shape says which slot
+# holds which field. Records can't be changed after they are created.
+class Struct:
+    __slots__ = ("shape", "values")
+
+    def __init__(self, shape: Shape, values: list):
+        self.shape = shape
+        self.values = values
+
+    # Raises a KeyError when the record doesn't have the field.
+    def get(self, field: str):
+        return self.values[self.shape.slots[field]]
+
+    def items(self):
+        return zip(self.shape.fields, self.values)
+
+    # Records with the same fields are equal,
+    # no matter in which order the fields are.
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Struct):
+            return False
+
+        if self.shape is other.shape:
+            return self.values == other.values
+
+        return dict(self.items()) == dict(other.items())
+
+    __hash__ = None
+
+# The inline cache of a single place in the code that reads a field. It
+# remembers the shape of the last record it saw and the slot of the field
+# in it, so as long as the records that pass by have the same shape (as
+# they almost always do), reading the field is a comparison and an index.
+class FieldCache:
+    __slots__ = ("field", "shape", "slot")
+
+    def __init__(self, field: str):
+        self.field = field
+        self.shape = None
+        self.slot = 0
+
+    # Look the field up in a record of another shape than the last one,
+    # and remember where it is. Raises a KeyError when it doesn't exist.
+    def miss(self, record: Struct):
+        slot = record.shape.slots[self.field]
+
+        self.shape = record.shape
+        self.slot = slot
+
+        return record.values[slot]
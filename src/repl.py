@@ -0,0 +1,75 @@
+from syntax.tokens import *
+from incremental import IncrementalParser
+from interpreter import Builtins
+
+# An interactive session. The interpreter of the session keeps its global
+# environment and functions between entries, so every entry is only lexed,
+# parsed and evaluated on its own, against everything that came before.
+class Repl:
+    PROMPT = "grape> "
+    CONTINUATION = "...    "
+
+    def __init__(self, grape):
+        self.grape = grape
+        self.line = 1
+
+        self.grape.errorHandler.file = "repl"
+
+    def start(self):
+        while True:
+            try:
+                tokens = self.read()
+
+            except KeyboardInterrupt:
+                print("")
+                continue
+
+            if tokens is None:
+                print("")
+                break
+
+            value = self.grape.execute(tokens)
+
+            if not self.grape.errorHandler.hadError and value is not None:
+                print(Builtins.stringify(value))
+
+            self.grape.errorHandler.hadError = False
+
+    # Read lines until every block and bracket of the entry is
+    # closed again, and return the tokens of the whole entry.
+    def read(self) -> list[Token]:
+        entry = ""
+        prompt = self.PROMPT
+
+        while True:
+            try:
+                entry += input(prompt) + "\n"
+
+            except EOFError:
+                return None
+
+            tokens = self.grape.lex(entry, self.line)
+
+            # An entry with an error that is still open would be lexed and
+            # reported again with every line, so it's dropped instead.
+            if tokens is None or (self.grape.errorHandler.hadError and self.depth(tokens) > 0):
+                self.grape.errorHandler.hadError = False
+                self.line += entry.count("\n")
+
+                entry = ""
+                prompt = self.PROMPT
+
+            elif self.depth(tokens) <= 0:
+                self.line += entry.count("\n")
+                return tokens
+
+            else:
+                prompt = self.CONTINUATION
+
+    def depth(self, tokens: list[Token]) -> int:
+        depth = 0
+
+        for (i, token) in enumerate(tokens):
+            depth += IncrementalParser.nesting(token, tokens[i + 1:i + 2])
+
+        return depth
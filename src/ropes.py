@@ -0,0 +1,83 @@
+from config import *
+
+# A string that was concatenated out of other strings, like the output of
+# a report that is built up in a loop. Adding to a Python string copies
+# the whole string every time, so building a long one piece by piece
+# takes quadratic time. A rope only points at its two halves instead, and
+# the string itself is only put together once it's needed: when it's
+# printed, indexed or compared. Ropes can't be changed, like any string,
+# and after they are put together they keep the flat string.
+class Rope:
+    __slots__ = ("left", "right", "length", "flat")
+
+    def __init__(self, left, right, length: int):
+        self.left = left
+        self.right = right
+        self.length = length
+        self.flat = None
+
+    # Concatenate two strings or ropes. Short strings stay strings, and
+    # short pieces that are added to either end of a rope are merged with
+    # the piece at that end, so ropes don't end up with a node per piece.
+    def concat(left, right):
+        length = len(left) + len(right)
+
+        if type(left) is str and type(right) is str and length < ROPE_THRESHOLD:
+            return left + right
+
+        if type(left) is Rope and left.flat is None and type(right) is str and type(left.right) is str:
+            if len(left.right) + len(right) < ROPE_THRESHOLD:
+                return Rope(left.left, left.right + right, length)
+
+        if type(right) is Rope and right.flat is None and type(left) is str and type(right.left) is str:
+            if len(left) + len(right.left) < ROPE_THRESHOLD:
+                return Rope(left + right.left, right.right, length)
+
+        return Rope(left, right, length)
+
+    # Put the string together. This doesn't recurse, as
+    # ropes that are built in a loop are very deep.
+    def __str__(self) -> str:
+        if self.flat is None:
+            parts = []
+            stack = [self]
+
+            while stack:
+                node = stack.pop()
+
+                if type(node) is str:
+                    parts.append(node)
+                elif node.flat is not None:
+                    parts.append(node.flat)
+                else:
+                    stack.append(node.right)
+                    stack.append(node.left)
+
+            self.flat = "".join(parts)
+            self.left = None
+            self.right = None
+
+        return self.flat
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, index: int) -> str:
+        return str(self)[index]
+
+    def __contains__(self, item) -> bool:
+        return str(item) in str(self)
+
+    # Ropes are equal to strings with the same characters.
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, (str, Rope)):
+            return False
+
+        return self.length == len(other) and str(self) == str(other)
+
+    def __hash__(self) -> int:
+        return hash(str(self))
+
+    # Other processes get the flat string.
+    def __reduce__(self):
+        return (str, (str(self),))
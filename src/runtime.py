@@ -1,3 +1,4 @@
+import sys
 from syntax.tokens import *
 from syntax.ast import *
 from utils import *
@@ -53,11 +54,11 @@ class ErrorHandler:
 
 class ErrorReporter: 
     def error(message: str, header: str = "Error") -> str:
-        print(ANSI.FAIL + ANSI.BOLD + header + ": " + ANSI.NORMAL + message + ".")
+        print(ANSI.FAIL + ANSI.BOLD + header + ": " + ANSI.NORMAL + message + ".", file=sys.stderr)
         return message
 
     def warn(message: str, header: str = "Warning") -> str:
-        print(ANSI.WARN + ANSI.BOLD + header + ": " + ANSI.NORMAL + message + ".")
+        print(ANSI.WARN + ANSI.BOLD + header + ": " + ANSI.NORMAL + message + ".", file=sys.stderr)
         return message
 
 class Debugger:
@@ -82,6 +83,18 @@ class Debugger:
 
         print("")
 
+    def printProfile(memos) -> None:
+        memos = sorted(memos, key=lambda memo: memo.name)
+
+        print(Formatter.formatSuccess("Memoized functions (" + str(len(memos)) + "):"))
+        print(Formatter.formatTable(["Function", "Cached", "Hits", "Misses"]))
+        print(Formatter.formatTableSeperator())
+
+        for memo in memos:
+            print(Formatter.formatTable([memo.name, str(len(memo.values)) + "/" + str(memo.size), str(memo.hits), str(memo.misses)]))
+
+        print("")
+
     def printRunning() -> None:
         print(Formatter.formatSuccess("Running program"))
 
@@ -105,8 +118,8 @@ class Formatter:
     def formatTable(cols: list[str]) -> str:
         output = ""
 
-        for col in cols:
-            if col != cols[-1]:
+        for (index, col) in enumerate(cols):
+            if index != len(cols) - 1:
                 colLength = 3
                 wordTabLength = int((len(str(col)) + 1)/8)
                 
@@ -0,0 +1,162 @@
+import asyncio
+import contextvars
+import json
+import os
+import sys
+import threading
+import traceback
+from config import *
+
+# The client of the request that the current thread is working on.
+client = contextvars.ContextVar("client", default=None)
+
+# Stands in for sys.stdout and sys.stderr. Everything that is written
+# while handling a request is streamed to the client of that request.
+class Dispatcher:
+    def __init__(self, name: str, stream):
+        self.name = name
+        self.stream = stream
+
+    def write(self, text: str) -> int:
+        connection = client.get()
+
+        if connection is None:
+            return self.stream.write(text)
+
+        connection.send({"stream": self.name, "text": text})
+        return len(text)
+
+    def flush(self):
+        self.stream.flush()
+
+class Connection:
+    def __init__(self, loop, writer):
+        self.loop = loop
+        self.writer = writer
+
+    # Requests are handled in worker threads, so writing to the
+    # socket has to be handed back to the event loop.
+    def send(self, message: dict):
+        data = (json.dumps(message) + "\n").encode()
+        self.loop.call_soon_threadsafe(self.writer.write, data)
+
+# A long-running process that runs and checks Grape files for client.py.
+# Parsed files are cached until they change on disk, so warm requests
+# skip Python startup, imports and parsing altogether.
+#
+# Every line sent to the socket is a JSON request like
+# {"command": "run", "path": "/abs/path.gr"}, and every line sent back
+# is either {"stream": "stdout" | "stderr", "text": "..."} or, at the
+# end of the request, {"exit": code}.
+class Server:
+    COMMANDS = ["run", "check"]
+
+    def __init__(self, createGrape, path: str = SOCKET_PATH):
+        self.createGrape = createGrape
+        self.path = path
+
+        # path -> ((mtime, size), ast)
+        self.modules = {}
+        self.lock = threading.Lock()
+
+    def start(self):
+        sys.stdout = Dispatcher("stdout", sys.stdout)
+        sys.stderr = Dispatcher("stderr", sys.stderr)
+
+        try:
+            asyncio.run(self.serve())
+
+        except KeyboardInterrupt:
+            pass
+
+        finally:
+            sys.stdout = sys.stdout.stream
+            sys.stderr = sys.stderr.stream
+
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    async def serve(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+        server = await asyncio.start_unix_server(self.handle, path=self.path)
+        print("Listening on " + self.path)
+
+        async with server:
+            await server.serve_forever()
+
+    async def handle(self, reader, writer):
+        connection = Connection(asyncio.get_running_loop(), writer)
+
+        try:
+            while line := await reader.readline():
+                # to_thread copies the context, so everything the request
+                # prints in its thread is sent to this connection.
+                client.set(connection)
+                status = await asyncio.to_thread(self.request, line)
+                client.set(None)
+
+                connection.send({"exit": status})
+                await writer.drain()
+
+        except ConnectionError:
+            pass
+
+        finally:
+            writer.close()
+
+    def request(self, line: bytes) -> int:
+        try:
+            return self.dispatch(line)
+
+        except Exception:
+            traceback.print_exc()
+            return 70
+
+    def dispatch(self, line: bytes) -> int:
+        try:
+            request = json.loads(line)
+            command = request["command"]
+            path = request["path"]
+
+        except (ValueError, KeyError, TypeError):
+            print("Invalid request", file=sys.stderr)
+            return 64
+
+        if command not in self.COMMANDS:
+            print("Unknown command '" + str(command) + "'", file=sys.stderr)
+            return 64
+
+        grape = self.createGrape()
+        grape.debug = False
+
+        ast = self.parse(grape, path)
+
+        if ast is not None and command == "run":
+            grape.interpret(ast)
+
+        return 65 if grape.errorHandler.hadError else 0
+
+    def parse(self, grape, path: str):
+        try:
+            stat = os.stat(path)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+
+        except OSError:
+            stamp = None
+
+        with self.lock:
+            cached = self.modules.get(path)
+
+        if cached is not None and cached[0] == stamp:
+            grape.errorHandler.file = path
+            return cached[1]
+
+        ast = grape.checkFile(path)
+
+        if ast is not None and stamp is not None:
+            with self.lock:
+                self.modules[path] = (stamp, ast)
+
+        return ast
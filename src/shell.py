@@ -0,0 +1,53 @@
+import asyncio
+import threading
+from config import *
+
+# Runs the commands of `$` expressions. Commands run as asyncio
+# subprocesses on an event loop in a background thread, so starting one
+# returns right away and the engine only blocks once it needs the output.
+# At most `limit` commands run at the same time, the others wait for a
+# free slot. Both stdout and stderr are read while the command runs, so
+# a command that writes a lot never blocks on a full pipe.
+class Shell:
+    def __init__(self, limit: int = EXEC_LIMIT):
+        self.limit = limit
+        self.loop = None
+        self.slots = None
+        self.lock = threading.Lock()
+
+    # Start running a command, and return a concurrent.futures.Future
+    # of its output. The future raises a ValueError with a message
+    # when the command fails. Can be called from any thread.
+    def start(self, command: str):
+        with self.lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                self.slots = asyncio.Semaphore(self.limit)
+
+                threading.Thread(target=self.loop.run_forever, name="grape-shell", daemon=True).start()
+
+        return asyncio.run_coroutine_threadsafe(self.run(command), self.loop)
+
+    async def run(self, command: str) -> str:
+        async with self.slots:
+            process = await asyncio.create_subprocess_shell(command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+
+            try:
+                (stdout, stderr) = await process.communicate()
+
+            # The engine stopped waiting for it, because
+            # another part of the expression failed.
+            except asyncio.CancelledError:
+                process.kill()
+                await process.wait()
+                raise
+
+        if process.returncode != 0:
+            message = "Command exited with status " + str(process.returncode)
+            lines = stderr.decode(errors="replace").strip().splitlines()
+
+            raise ValueError(message + ": " + lines[-1] if lines else message)
+
+        # Like command substitution in a shell, the
+        # newlines at the end of the output are dropped.
+        return stdout.decode(errors="replace").rstrip("\n")
@@ -0,0 +1,73 @@
+from decimal import *
+from arrays import NumericArray
+from ranges import Range
+
+# A lazy sequence: a source and the stages (map, filter and take) that
+# its items go through. Adding a stage doesn't nest another generator,
+# it returns a stream with one more stage, so a whole pipeline like
+# xs |> map(f) |> filter(g) |> take(10) runs as a single loop. Items go
+# through every stage one at a time, nothing is collected in between,
+# and the loop stops as soon as the last take is satisfied. Iterating a
+# stream again runs the pipeline again from the start.
+class Stream:
+    MAP = 0
+    FILTER = 1
+    TAKE = 2
+
+    SOURCES = (list, tuple, NumericArray, Range)
+
+    def __init__(self, source, stages: tuple = ()):
+        self.source = source
+        self.stages = stages
+
+    # Raises a ValueError when the value can't be streamed.
+    def of(value) -> "Stream":
+        if isinstance(value, Stream):
+            return value
+
+        elif isinstance(value, Stream.SOURCES):
+            return Stream(value)
+
+        raise ValueError("Can only stream lists, tuples, arrays, ranges and streams")
+
+    # Map and filter take a Python function of one item.
+    def then(self, kind: int, argument) -> "Stream":
+        return Stream(self.source, self.stages + ((kind, argument),))
+
+    def __iter__(self):
+        stages = self.stages
+        counts = [0] * len(stages)
+
+        if any(kind == Stream.TAKE and argument <= 0 for (kind, argument) in stages):
+            return
+
+        for item in self.items():
+            last = False
+
+            for (i, (kind, argument)) in enumerate(stages):
+                if kind == Stream.MAP:
+                    item = argument(item)
+
+                elif kind == Stream.FILTER:
+                    value = argument(item)
+
+                    if value is None or value is False:
+                        break
+
+                else:
+                    counts[i] += 1
+                    last = last or counts[i] == argument
+
+            else:
+                yield item
+
+            # Nothing gets past a take that is full anymore
+            if last:
+                return
+
+    # Arrays hold floats, which are turned back into Grape numbers.
+    def items(self):
+        if isinstance(self.source, NumericArray):
+            return (Decimal(repr(float(item))) for item in self.source)
+
+        return self.source
@@ -0,0 +1,313 @@
+import itertools
+import json
+import math
+import os
+import struct
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from decimal import *
+from syntax.ast import *
+from runtime import ErrorHandler
+from interpreter import Builtins
+from arrays import NumericArray
+from records import Struct
+from streams import Stream
+from ranges import Range
+from ropes import Rope
+
+# Records the message of the last error instead of printing it, so a
+# failing combination ends up in the results next to the others.
+class ErrorCollector(ErrorHandler):
+    def __init__(self, file: str = "unknown"):
+        super().__init__(file)
+        self.last = None
+
+    def error(self, kind: str, line: int, col: int, location: str = "", content: str = "") -> str:
+        self.hadError = True
+        self.last = self.message(kind, location, content)
+
+        return self.last
+
+# The state of a worker process: the program it was given, already
+# interpreted once, and the function every combination is passed to.
+class Worker:
+    grape = None
+    function = None
+
+    def start(ast: list[Expr], settings: dict, entry: str):
+        from grape import Grape
+
+        # Whatever the program prints must not end up between the results.
+        sys.stdout = sys.stderr
+
+        grape = Grape()
+        grape.configure(settings)
+        grape.errorHandler = ErrorCollector()
+
+        # Every worker would print its profile, and write it to the same file.
+        grape.debug = False
+        grape.profile = False
+        grape.sampleProfile = None
+
+        grape.interpret(ast)
+
+        Worker.grape = grape
+        Worker.function = None if grape.errorHandler.hadError else grape.interpreter.globals.values.get(entry)
+
+    # Evaluate a batch of combinations, and return a result
+    # or an error message for each of them.
+    def evaluate(batch: list[tuple]) -> list[tuple]:
+        results = []
+
+        for combination in batch:
+            if Worker.function is None:
+                results.append((combination, None, Worker.grape.errorHandler.last or "Entry function is not defined"))
+                continue
+
+            errorHandler = Worker.grape.errorHandler
+            errorHandler.hadError = False
+
+            value = Worker.grape.interpreter.apply(Worker.function, list(combination))
+
+            if errorHandler.hadError:
+                results.append((combination, None, errorHandler.last))
+            else:
+                results.append((combination, Sweep.plain(value), None))
+
+        return results
+
+# Writes every result as one JSON object per line.
+class JsonLines:
+    def __init__(self, stream, names: list[str]):
+        self.stream = stream
+        self.names = names
+
+    def write(self, results: list[tuple]):
+        for (combination, value, error) in results:
+            row = dict(zip(self.names, combination))
+
+            if error is None:
+                row["result"] = value
+            else:
+                row["error"] = error
+
+            self.stream.write(json.dumps(row, default=Sweep.plain) + "\n")
+
+        self.stream.flush()
+
+    def close(self):
+        if self.stream is not sys.stdout:
+            self.stream.close()
+
+# Writes the results as columns of float64s. The file starts with the
+# line "GRAPE-COLUMNS 1" and a line with a JSON list of the column
+# names, followed by blocks of one uint32 with the amount of rows and
+# then that many little-endian float64s for every column. Values that
+# are not numbers, and failed combinations, are stored as NaN.
+class Columns:
+    MAGIC = b"GRAPE-COLUMNS 1\n"
+
+    def __init__(self, stream, names: list[str]):
+        self.stream = stream
+        self.names = names
+
+        stream.write(Columns.MAGIC)
+        stream.write((json.dumps(names + ["result"]) + "\n").encode())
+
+    def write(self, results: list[tuple]):
+        columns = [array("d") for _ in range(len(self.names) + 1)]
+
+        for (combination, value, error) in results:
+            for (column, item) in zip(columns, combination + (value,)):
+                column.append(Columns.number(item))
+
+        self.stream.write(struct.pack("<I", len(results)))
+
+        for column in columns:
+            if sys.byteorder == "big":
+                column.byteswap()
+
+            self.stream.write(column.tobytes())
+
+        self.stream.flush()
+
+    def close(self):
+        self.stream.close()
+
+    def number(value) -> float:
+        if isinstance(value, bool) or not isinstance(value, (int, float, Decimal)):
+            return math.nan
+
+        return float(value)
+
+# Runs the entry function of a program once for every combination of the
+# values in a grid, spread over a pool of worker processes. The program
+# is parsed once and the AST is sent to every worker, which interprets it
+# once and then evaluates batches of combinations. Only a bounded amount
+# of batches is in flight at a time, and results are written as soon as
+# a batch finishes, so memory stays flat no matter how large the grid is.
+class Sweep:
+    BATCH = 64
+    FORMATS = ["json", "columns"]
+    OPTIONS = ["--grid", "--entry", "--format", "--output", "--workers"]
+
+    def __init__(self, grape, filePath: str, options: dict):
+        self.grape = grape
+        self.grape.debug = False
+        self.filePath = filePath
+
+        self.grid = options["grid"]
+        self.entry = options.get("entry", "main")
+        self.format = options.get("format", "json")
+        self.output = options.get("output")
+        self.workers = options.get("workers", os.cpu_count() or 1)
+
+    # Turn the arguments after the file path into options. Raises a
+    # ValueError with a message when they are not valid.
+    def options(argv: list[str]) -> dict:
+        options = {}
+        arguments = iter(argv)
+
+        for argument in arguments:
+            match argument.split("=", 1):
+                case [name] if name in Sweep.OPTIONS:
+                    value = next(arguments, None)
+
+                    if value is None:
+                        raise ValueError("Missing value for '" + name + "'")
+
+                case [name, value] if name in Sweep.OPTIONS:
+                    pass
+
+                case _:
+                    raise ValueError("Unknown argument '" + argument + "'")
+
+            match name:
+                case "--grid" | "--entry" | "--output":
+                    options[name[2:]] = value
+
+                case "--format" if value in Sweep.FORMATS:
+                    options["format"] = value
+
+                case "--workers" if value.isdigit() and int(value) > 0:
+                    options["workers"] = int(value)
+
+                case _:
+                    raise ValueError("Invalid value for '" + name + "'")
+
+        if "grid" not in options:
+            raise ValueError("Missing '--grid'")
+
+        if options.get("format") == "columns" and "output" not in options:
+            raise ValueError("The columns format needs '--output'")
+
+        return options
+
+    def start(self) -> bool:
+        grid = self.load()
+        if grid is None: return False
+
+        ast = self.grape.checkFile(self.filePath)
+        if ast is None: return False
+
+        names = self.parameters(ast, grid)
+        if names is None: return False
+
+        combinations = itertools.product(*[grid[name] for name in names])
+
+        writer = self.writer(names)
+        if writer is None: return False
+
+        try:
+            return self.run(ast, combinations, writer)
+
+        finally:
+            writer.close()
+
+    def run(self, ast: list[Expr], combinations, writer) -> bool:
+        failed = False
+        pending = set()
+
+        with ProcessPoolExecutor(self.workers, initializer=Worker.start, initargs=(ast, self.grape.settings(), self.entry)) as pool:
+            while True:
+                while len(pending) < self.workers * 2:
+                    batch = list(itertools.islice(combinations, Sweep.BATCH))
+                    if batch == []: break
+
+                    pending.add(pool.submit(Worker.evaluate, batch))
+
+                if len(pending) == 0: break
+
+                (done, pending) = wait(pending, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    results = future.result()
+                    failed = failed or any(error is not None for (_, _, error) in results)
+
+                    writer.write(results)
+
+        return not failed
+
+    # Open the output the results are written to.
+    def writer(self, names: list[str]):
+        try:
+            if self.format == "columns":
+                return Columns(open(self.output, "wb"), names)
+            elif self.output is not None:
+                return JsonLines(open(self.output, "w"), names)
+            else:
+                return JsonLines(sys.stdout, names)
+
+        except OSError as e:
+            self.grape.errorHandler.error("", 0, 0, "", e.strerror + ": '" + self.output + "'")
+            return None
+
+    # Read the grid, which maps every parameter to a list of values.
+    def load(self) -> dict:
+        self.grape.errorHandler.file = self.grid
+
+        try:
+            grid = json.load(open(self.grid, "r"), parse_float=Decimal, parse_int=Decimal)
+
+        except OSError:
+            self.grape.errorHandler.error("", 0, 0, "", "No such file or directory: '" + self.grid + "'")
+            return None
+
+        except ValueError as e:
+            self.grape.errorHandler.error("Invalid grid", 0, 0, "", str(e))
+            return None
+
+        if not isinstance(grid, dict) or len(grid) == 0:
+            self.grape.errorHandler.error("Invalid grid", 0, 0, "", "Expected an object of parameters")
+            return None
+
+        return {name: values if isinstance(values, list) else [values] for (name, values) in grid.items()}
+
+    # The parameters of the clause of the entry function that takes one
+    # argument per parameter in the grid, in the order it takes them.
+    def parameters(self, ast: list[Expr], grid: dict) -> list[str]:
+        for expression in ast:
+            if isinstance(expression, Named) and expression.name.lexeme == self.entry and len(expression.parameters) == len(grid):
+                names = [parameter.lexeme for parameter in expression.parameters]
+
+                if sorted(names) == sorted(grid):
+                    return names
+
+        self.grape.errorHandler.error("Invalid grid", 0, 0, "", "No function '" + self.entry + "(" + ", ".join(grid) + ")' is defined")
+        return None
+
+    # The result of a combination as a JSON value.
+    def plain(value):
+        if isinstance(value, Decimal):
+            return int(value) if value == value.to_integral() else float(value)
+        elif isinstance(value, Struct):
+            return {field: Sweep.plain(item) for (field, item) in value.items()}
+        elif isinstance(value, (list, tuple, NumericArray, Stream, Range)):
+            return [Sweep.plain(item) for item in value]
+        elif isinstance(value, Rope):
+            return str(value)
+        elif value is None or isinstance(value, (bool, str, float)):
+            return value
+        else:
+            return Builtins.stringify(value)
@@ -13,6 +13,13 @@ class Assignment(Expr):
         self.name = name
         self.expression = initializer
 
+# Assigning the values of a tuple to
+# multiple names, like (value, points) = ...
+class Destructuring(Expr):
+    def __init__(self, names: list[Token], initializer: Expr):
+        self.names = names
+        self.expression = initializer
+
 class Scoped(Expr):
     pass
 
@@ -53,11 +60,21 @@ class Operator(Expr):
 class Unary(Operator):
     pass
 
+# Running a shell command, like $"ls". Its
+# value is what the command wrote to stdout.
+class Exec(Unary):
+    pass
+
 class Binary(Operator):
     def __init__(self, left: Expr, operator: Token, right: Expr):
         self.left = left
         super().__init__(operator, right)
 
+# Passing a value as the first argument of a call, like
+# xs |> map(f), or as the only argument, like xs |> collect.
+class Pipe(Binary):
+    pass
+
 # Literals
 
 class Call(Expr):
@@ -69,6 +86,12 @@ class Call(Expr):
         # when raising type errors later
         self.closingParenToken = closingParenToken
 
+class Index(Expr):
+    def __init__(self, collection: Expr, index: Expr, closingBracketToken: Token):
+        self.collection = collection
+        self.index = index
+        self.closingBracketToken = closingBracketToken
+
 class Variable(Expr):
     def __init__(self, name: Token):
         self.name = name
@@ -90,3 +113,60 @@ class List(Collection):
 
 class Tuple(Collection):
     pass
+
+# A record literal, like {start_value: 100, dt: 1}
+class Record(Expr):
+    def __init__(self, keys: list[Token], values: list[Expr]):
+        self.keys = keys
+        self.values = values
+
+# Reading a field of a record, like opts.dt
+class Get(Expr):
+    def __init__(self, record: Expr, name: Token):
+        self.record = record
+        self.name = name
+
+# Creates the nodes of the AST.
+class NodeFactory:
+    def make(self, kind: type, *arguments) -> Expr:
+        return kind(*arguments)
+
+# Creates the nodes of the AST, but gives expressions that are built the
+# same way out of the same parts the same node, so a repeated subtree is
+# only stored once, and two subtrees are equal exactly when they are the
+# same object. Children are created before their parents, so the parts
+# of a node can be compared by identity. Tokens are compared by what they
+# say and not by where they are, which means an error in a shared subtree
+# is reported at the place it first occurs.
+#
+# Only expressions that can't be changed and don't declare anything are
+# shared. Statements, functions and commands always get a node of their own.
+class HashConsing(NodeFactory):
+    SHARED = {Literal, Variable, Unary, Binary, Pipe, Call, Index, Grouping, List, Tuple, Record, Get}
+
+    def __init__(self):
+        # key -> node
+        self.nodes = {}
+
+    def make(self, kind: type, *arguments) -> Expr:
+        if kind not in HashConsing.SHARED:
+            return kind(*arguments)
+
+        key = (kind,) + tuple(HashConsing.key(argument) for argument in arguments)
+        node = self.nodes.get(key)
+
+        if node is None:
+            node = kind(*arguments)
+            self.nodes[key] = node
+
+        return node
+
+    # The nodes that are kept in the table are never freed
+    # before it is, so their ids can't be reused.
+    def key(part):
+        if isinstance(part, Token):
+            return (part.type, part.lexeme, part.literal)
+        elif isinstance(part, list):
+            return tuple(HashConsing.key(item) for item in part)
+        else:
+            return id(part)
@@ -10,6 +10,7 @@ class TokenType(Enum):
     RIGHT_BRACKET = "]"
     COMMA = ","
     DOT = "."
+    COLON = ":"
     MINUS = "-"
     PLUS = "+"
     STAR = "*"
@@ -61,12 +62,19 @@ class TokenType(Enum):
     NEWLINE = 5
     EOF = 6
 
+    # A part of the source that couldn't be lexed
+    ERROR = 7
+
 class Token:
-    def __init__(self, token_type: TokenType, lexeme: str, literal: any, line: int, col: int):
+    def __init__(self, token_type: TokenType, lexeme: str, literal: any, line: int, col: int, offset: int = None):
         self.type = token_type
         self.line = line
         self.col = col
 
+        # The index of the first character of the lexeme
+        # in the source code that was lexed.
+        self.offset = offset
+
         # The actual string representation of the code, 
         # forexample "if" or "3", or for strings: "\"some text\""
         self.lexeme = lexeme 
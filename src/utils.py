@@ -1,3 +1,5 @@
+import importlib
+
 def popFirst(list: list) -> tuple[any, list]:
     return (list[0], list[1:])
 
@@ -18,4 +20,18 @@ def isAlphaNumeric(char):
     return isAlpha(char) or isDigit(char)
 
 def isCapital(char):
-    return isAlpha(char) and char in charRange("A", "Z")
\ No newline at end of file
+    return isAlpha(char) and char in charRange("A", "Z")
+
+
+# A module that is only imported once one of its attributes is used,
+# so the CLI doesn't pay for subsystems it doesn't need to run.
+class Lazy:
+    def __init__(self, name: str):
+        self.name = name
+        self.module = None
+
+    def __getattr__(self, attribute: str):
+        if self.module is None:
+            self.module = importlib.import_module(self.name)
+
+        return getattr(self.module, attribute)
@@ -0,0 +1,32 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+import pytest
+from grape import Grape
+
+# Tests that take an engine run once for every execution engine.
+@pytest.fixture(params=Grape.ENGINES)
+def engine(request) -> str:
+    return request.param
+
+@pytest.fixture
+def grape(engine: str) -> Grape:
+    grape = Grape()
+    grape.debug = False
+    grape.engine = engine
+
+    return grape
+
+# Runs Grape code, and returns what it printed and what it reported.
+@pytest.fixture
+def run(grape: Grape, capsys):
+    def run(source: str) -> tuple[str, str]:
+        grape.run(source)
+        captured = capsys.readouterr()
+
+        return (captured.out, captured.err)
+
+    return run
@@ -0,0 +1,50 @@
+import pytest
+import arrays
+
+# Every test runs with NumPy and with the array module.
+@pytest.fixture(autouse=True, params=["numpy", "array"])
+def backend(request, monkeypatch):
+    if request.param == "array":
+        monkeypatch.setattr(arrays, "numpy", None)
+        monkeypatch.setattr(arrays, "loaded", True)
+    else:
+        pytest.importorskip("numpy")
+        monkeypatch.setattr(arrays, "loaded", False)
+
+    return request.param
+
+def test_arithmetic_is_elementwise(run):
+    assert run("xs = array([1, 2, 4])\nprint(xs + 1, 2 * xs, xs / xs, xs ^ 2, -xs)\n") == \
+        ("array([2, 3, 5]) array([2, 4, 8]) array([1, 1, 1]) array([1, 4, 16]) array([-1, -2, -4])\n", "")
+
+def test_comparisons_give_ones_and_zeros(run):
+    assert run("print(array([1, 2, 3]) > 1, array([1, 2]) == array([1, 3]))\n") == ("array([0, 1, 1]) array([1, 0])\n", "")
+
+def test_collection_builtins(run):
+    assert run("xs = array(range(1, 4))\nprint(len(xs), sum(xs), xs[-1], 2 in xs)\n") == ("3 6 3 true\n", "")
+
+def test_a_model_runs_for_a_whole_batch(run):
+    source = "fn step(v, t) do\n  if t == 0 do\n    v\n  else\n    step(v * 1.5 - 1, t - 1)\n  end\nend\n" \
+        "print(step(array([2, 4]), 2), step(2, 2), step(4, 2))\n"
+
+    assert run(source) == ("array([2, 6.5]) 2 6.5\n", "")
+
+@pytest.mark.parametrize(("source", "message"), [
+    ("array([1, 2]) / 0", "Division by zero"),
+    ("array([0, 1]) / array([0, 1])", "Division by zero"),
+    ("array([5]) % 0", "Division by zero"),
+    ("array([0]) ^ -1", "Division by zero"),
+    ("array([-8]) ^ 0.5", "Result is not a real number"),
+    ("array([10]) ^ 1000", "Number is too large"),
+    ("array([10 ^ 300]) * 10 ^ 300", "Number is too large"),
+    ("array([10 ^ 400])", "Number is too large"),
+    ("sum(array([10 ^ 308, 10 ^ 308]))", "Number is too large"),
+    ("array([1, 2]) + array([1])", "Arrays must have the same length"),
+    ("array([1]) + \"a\"", "Operands must be numbers or arrays"),
+])
+def test_errors_are_the_same_for_both_backends(run, grape, source, message):
+    (out, err) = run("print(" + source + ")\n")
+
+    assert out == ""
+    assert grape.errorHandler.hadError
+    assert "Runtime error" in err and message in err
@@ -0,0 +1,68 @@
+from decimal import Decimal
+from grape import Grape
+from memo import Memo
+
+def test_tuples_are_destructured(run):
+    source = "(a, b) = (1, 2)\nprint(a + b)\nt = (7, 8)\n(c, d) = t\nprint(c, d)\n"
+
+    assert run(source) == ("3\n7 8\n", "")
+
+def test_results_of_functions_are_destructured(run):
+    source = "fn pair(x) do (x, x * 2)\n" \
+        "fn pick(x) do\n  if x do\n    (1, 2)\n  else\n    pair(5)\n  end\nend\n" \
+        "(a, b) = pair(3)\nprint(a, b)\n" \
+        "(c, d) = pick(true)\nprint(c, d)\n" \
+        "(e, f) = pick(false)\nprint(e, f)\n"
+
+    assert run(source) == ("3 6\n1 2\n5 10\n", "")
+
+def test_destructuring_evaluates_to_nil(run):
+    assert run("print((a, b) = (1, 2))\n") == ("nil\n", "")
+
+def test_width_must_match(run):
+    (out, err) = run("(a, b) = (1, 2, 3)\n")
+
+    assert "Runtime error at 'a': Expected a tuple of 2 values to destructure." in err
+
+def test_lists_are_destructured_as_well(run):
+    assert run("(a, b) = [1, 2]\nprint(a, b)\n") == ("1 2\n", "")
+
+def test_other_values_are_not_destructured(run):
+    (out, err) = run("(a, b) = 1\n")
+
+    assert "Expected a tuple of 2 values to destructure." in err
+
+# Functions that always return a tuple of the same width get a body
+# that writes the items straight into the variables of the caller.
+def test_functions_returning_tuples_have_a_spread_body():
+    grape = Grape()
+    grape.debug = False
+    grape.engine = "closures"
+
+    grape.run("fn pair(x) do (x, x * 2)\n"
+        "fn either(x) do\n  if x do\n    (1, 2)\n  else\n    pair(x)\n  end\nend\n"
+        "fn list(x) do [x, x]\n"
+        "fn mixed(x) do\n  if x do\n    (1, 2)\n  else\n    (1, 2, 3)\n  end\nend\n")
+
+    functions = grape.interpreter.globals.values
+
+    assert 1 in functions["pair"].spreads
+    assert 1 in functions["either"].spreads
+    assert functions["list"].spreads == {}
+    assert functions["mixed"].spreads == {}
+
+# Memoized functions still spread, and cache the tuple they spread.
+def test_memoized_functions_spread_and_cache_their_tuples():
+    grape = Grape()
+    grape.debug = False
+    grape.engine = "closures"
+
+    grape.run("fn pair(x) do (x, x * 2)\n"
+        "fn twice(x) do pair(x + 1)\n"
+        "(a, b) = twice(2)\n(c, d) = twice(2)\n")
+
+    values = grape.interpreter.globals.values
+    memo = values["twice"].memos[1]
+
+    assert (values["a"], values["b"], values["c"], values["d"]) == (3, 6, 3, 6)
+    assert memo.get(Memo.key([Decimal(2)])) == (Decimal(3), Decimal(6))
@@ -0,0 +1,89 @@
+import pytest
+from grape import Grape
+
+PROGRAMS = [
+    ("print(1 + 2 * 3 - 4 / 2, 2 ^ 3 ^ 2, 7 % 3)\n", "5 512 1\n"),
+    ("print(\"grape\" + \"s\", [1, 2] + [3], (1, \"a\"))\n", "grapes [1, 2, 3] (1, a)\n"),
+    ("print(1 < 2, 2 <= 1, 1 == 1, 1 != 1, not false)\n", "true false true false true\n"),
+    ("print(false or 3, false and undefined, 2 and 4)\n", "3 false 4\n"),
+    ("print([10, 20, 30][1], [10, 20, 30][-1], \"abc\"[0])\n", "20 30 a\n"),
+    ("x = 1\ndo\n  x = 2\n  print(x)\nend\nprint(x)\n", "2\n1\n"),
+    ("fn fib(n) do\n  if n < 2 do\n    n\n  else\n    fib(n - 1) + fib(n - 2)\n  end\nend\nprint(fib(15))\n", "610\n"),
+    ("fn f(a) do a\nfn f(a, b) do a + b\nprint(f(1), f(1, 2))\n", "1 3\n"),
+    ("fn adder(n) do fn(x) do x + n\nadd = adder(10)\nprint(add(5), adder(1)(1))\n", "15 2\n"),
+    ("if 1 > 2 do\n  print(1)\nelse\n  print(2)\nend\n", "2\n"),
+    ("print(if false do 1)\n", "nil\n"),
+    ("r = {a: 1, b: \"x\"}\nprint(r, r.a, len(r))\n", "{a: 1, b: x} 1 2\n"),
+    ("(a, b) = (1, 2)\nprint(b, a)\n", "2 1\n"),
+    ("print(range(5) |> map(fn(x) do x * x) |> filter(fn(x) do x % 2 == 0) |> collect)\n", "[0, 4, 16]\n"),
+    ("print(3 in [1, 2, 3], \"b\" in \"abc\", 5 in range(3))\n", "true true false\n"),
+    ("print(len(\"abcd\"), sum([1, 2, 3]), print)\n", "4 6 <fn print>\n"),
+]
+
+ERRORS = [
+    ("print(1 / 0)\n", "Division by zero"),
+    ("x = 10 ^ 999999 * 10\n", "Number is too large"),
+    ("print(y)\n", "Undefined variable"),
+    ("x = 1\nx(2)\n", "Can only call functions"),
+    ("fn f(a) do a\nf(1, 2)\n", "No clause of 'f' takes 2 arguments"),
+    ("print([1][3])\n", "Index out of range"),
+    ("print(1 + \"a\")\n", "Operands must be numbers"),
+    ("print({a: 1}.b)\n", "Undefined field"),
+    ("(a, b) = (1, 2, 3)\n", "Expected a tuple of 2 values to destructure"),
+    ("print(len(1, 2))\n", "'len' doesn't take 2 arguments"),
+]
+
+# Every engine prints the same for the same program.
+@pytest.mark.parametrize(("source", "output"), PROGRAMS)
+def test_programs(run, source, output):
+    assert run(source) == (output, "")
+
+@pytest.mark.parametrize(("source", "message"), ERRORS)
+def test_errors(run, grape, source, message):
+    (_, err) = run(source)
+
+    assert grape.errorHandler.hadError
+    assert "Runtime error" in err and message in err
+
+ARITHMETIC = [
+    ("x = 10 ^ 999999 * 10\n", "Runtime error at '*': Number is too large."),
+    ("print((-1) ^ 0.5)\n", "Runtime error at '^': Result is not a real number."),
+    ("print(0 / 0)\n", "Runtime error at '/': Division by zero."),
+    ("print(0 ^ -1)\n", "Runtime error at '^': Division by zero."),
+    ("print(sum([10 ^ 999999, 9 * 10 ^ 999999]))\n", "Runtime error at ')': Number is too large."),
+]
+
+@pytest.mark.parametrize(("source", "message"), ARITHMETIC)
+def test_arithmetic_errors(run, source, message):
+    (_, err) = run(source)
+
+    assert message in err
+
+def test_large_numbers_are_printed_in_full(run):
+    assert run("print(10 ^ 5000, -0)\n") == ("1" + "0" * 5000 + " 0\n", "")
+
+def test_globals_are_kept_between_runs(run):
+    run("fn twice(a) do a * 2\nx = 4\n")
+
+    assert run("print(twice(x))\n") == ("8\n", "")
+
+def test_deep_recursion_is_reported(run):
+    (_, err) = run("fn down(n) do\n  if n > 0 do down(n - 1)\nend\ndown(100000)\n")
+
+    assert "Maximum recursion depth exceeded" in err
+
+# The closure compiler does arithmetic on numbers itself, but
+# reports a failure with the same error as the interpreter.
+def test_overflows_are_reported_the_same_by_both_engines(capsys):
+    errors = []
+
+    for engine in Grape.ENGINES:
+        grape = Grape()
+        grape.debug = False
+        grape.engine = engine
+
+        grape.run("x = 10 ^ 999999\ny = x * 10\n")
+        errors.append(capsys.readouterr().err)
+
+    assert "Runtime error at '*': Number is too large." in errors[0]
+    assert errors[0] == errors[1]
@@ -0,0 +1,56 @@
+from grape import Grape
+from syntax.ast import *
+
+def check(source: str, hashCons: bool = True) -> list[Expr]:
+    grape = Grape()
+    grape.debug = False
+    grape.hashCons = hashCons
+
+    return grape.check(source)
+
+def test_repeated_expressions_are_one_node():
+    ast = check("x = a * 2 + 1\ny = a * 2 + 1\nz = a * 2 + 2\n")
+
+    assert ast[0].expression is ast[1].expression
+    assert ast[2].expression is not ast[0].expression
+    assert ast[2].expression.left is ast[0].expression.left
+
+def test_nodes_are_not_shared_without_the_flag():
+    ast = check("x = a * 2\ny = a * 2\n", hashCons=False)
+
+    assert ast[0].expression is not ast[1].expression
+
+def test_statements_functions_and_commands_get_their_own_node():
+    ast = check("x = 1\nx = 1\nfn f(a) do a\nfn f(a) do a\n$\"ls\"\n$\"ls\"\n")
+
+    assert ast[0] is not ast[1]
+    assert ast[2] is not ast[3]
+    assert ast[4] is not ast[5]
+
+    # The parts of them that don't declare anything are still shared
+    assert ast[0].expression is ast[1].expression
+    assert ast[4].right is ast[5].right
+
+def test_literals_of_different_types_are_different_nodes():
+    ast = check("[1, \"1\", true]\n[1, \"1\", true]\n")
+
+    assert ast[0] is ast[1]
+    assert len({id(item) for item in ast[0].items}) == 3
+
+def test_programs_give_the_same_results(run, grape):
+    grape.hashCons = True
+
+    source = "x = 2\n" \
+        "fn f(x) do x * 2 + 1\n" \
+        "fn g(y) do\n  x = y * 2 + 1\n  x * 2 + 1\nend\n" \
+        "print(f(1), f(x), x * 2 + 1, g(1))\n" \
+        "print([x * 2 + 1, {a: x * 2 + 1}.a, (fn(x) do x * 2 + 1)(5)])\n"
+
+    assert run(source) == ("3 5 5 7\n[5, 5, 11]\n", "")
+
+def test_errors_in_shared_nodes_are_reported_at_the_first_one(run, grape):
+    grape.hashCons = True
+
+    (_, err) = run("x = 1\nfn f() do x / 0\nprint(1)\nx / 0\n")
+
+    assert "[unknown:2:" in err
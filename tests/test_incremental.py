@@ -0,0 +1,122 @@
+import random
+import pytest
+from grape import Grape
+from incremental import IncrementalParser
+from syntax.ast import *
+
+@pytest.fixture
+def grape() -> Grape:
+    grape = Grape()
+    grape.debug = False
+
+    return grape
+
+# Everything an expression was parsed from, including the
+# positions of its tokens.
+def dump(node):
+    if isinstance(node, Token):
+        return (node.type, node.lexeme, node.line, node.col)
+    elif isinstance(node, list):
+        return [dump(item) for item in node]
+    elif isinstance(node, Expr):
+        return (type(node).__name__, {name: dump(value) for (name, value) in vars(node).items()})
+
+    return node
+
+def statements(count: int) -> str:
+    return "".join("x" + str(i) + " = " + str(i) + " + 1\n" if i % 3 else "fn f(a) do\n  a * " + str(i) + "\nend\n"
+        for i in range(count))
+
+def test_edits_parse_like_the_whole_source(grape):
+    source = statements(30)
+    parser = IncrementalParser(grape, source)
+    pieces = ["y = 2\n", "\n", "do\n", "end\n", "+ 3", "[1,\n", "]", "z"]
+    rng = random.Random(4)
+
+    for _ in range(200):
+        offset = rng.randrange(len(source) + 1)
+        removed = rng.randrange(min(8, len(source) - offset) + 1)
+        inserted = rng.choice(pieces)
+
+        expressions = parser.edit(offset, removed, inserted)
+        source = source[:offset] + inserted + source[offset + removed:]
+
+        assert parser.source() == source
+
+        fresh = Grape()
+        fresh.debug = False
+        expected = fresh.check(source)
+
+        assert parser.hadError() == fresh.errorHandler.hadError
+
+        if not parser.hadError():
+            assert dump(list(expressions)) == dump(expected)
+            assert len(expressions) == len(expected)
+
+def test_unchanged_statements_are_reused(grape):
+    parser = IncrementalParser(grape, statements(10))
+    before = parser.expressions()
+
+    # The first statement is parsed again, together with the new one.
+    after = list(parser.edit(0, 0, "y = 1\n\n"))
+
+    assert after[1] is not before[0]
+    assert all(new is old for (new, old) in zip(after[2:], before[1:]))
+
+def test_lines_after_an_edit_are_moved(grape):
+    parser = IncrementalParser(grape, statements(10))
+    last = parser.expressions()[-1]
+    line = last.name.line
+
+    expressions = parser.edit(0, 0, "y = 1\n\n")
+
+    # The statements after the edit are only moved when they are used.
+    assert last.name.line == line
+    assert list(expressions)[-1].name.line == line + 2
+
+def test_unbalanced_edit_pulls_in_the_following_statements(grape):
+    parser = IncrementalParser(grape, "a = 1\nb = 2\nc = 3\n")
+
+    expressions = list(parser.edit(0, 0, "do\n"))
+
+    assert parser.hadError()
+
+    expressions = list(parser.edit(len("do\na = 1\nb = 2\nc = 3\n"), 0, "end\n"))
+
+    assert not parser.hadError()
+    assert len(expressions) == 1
+    assert isinstance(expressions[0], Block)
+    assert len(expressions[0].expressions) == 3
+
+def test_edits_only_touch_the_statements_around_them(grape):
+    source = statements(3000)
+    parser = IncrementalParser(grape, source)
+    offset = source.index("x1501")
+
+    for _ in range(10):
+        parser.edit(offset, 0, "y = 1\n")
+        offset += len("y = 1\n")
+
+    # The statements after the edits are shifted all at once, so none of
+    # them were changed one by one. The last edit parsed the statement it
+    # was inserted in front of again as well.
+    assert parser.stale == parser.locate(offset)[0] + 1
+    assert parser.starts[-1] + parser.shift == len(parser.source()) - len(parser.chunks[-1].text)
+
+def test_parts_that_cant_be_lexed_are_errors(grape):
+    parser = IncrementalParser(grape, "a = 1\nb = 2\n")
+
+    parser.edit(len("a = 1"), 0, " # one")
+    assert parser.hadError()
+
+    parser.edit(len("a = 1"), len(" # one"), "")
+    assert not parser.hadError()
+
+def test_unterminated_strings_are_errors(grape):
+    parser = IncrementalParser(grape, "a = 1\nb = 2\n")
+
+    parser.edit(len("a = "), 1, "\"one")
+    assert parser.hadError()
+
+    parser.edit(len("a = "), len("\"one"), "1")
+    assert not parser.hadError()
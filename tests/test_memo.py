@@ -0,0 +1,95 @@
+from decimal import Decimal
+from grape import Grape
+from memo import Memo, Purity
+from ropes import Rope
+
+def test_least_recently_used_entry_is_evicted():
+    memo = Memo("f", 2)
+
+    memo.put(("a",), 1)
+    memo.put(("b",), 2)
+    memo.get(("a",))
+    memo.put(("c",), 3)
+
+    assert memo.get(("b",)) is Memo.MISSING
+    assert (memo.get(("a",)), memo.get(("c",))) == (1, 3)
+    assert (memo.hits, memo.misses) == (3, 1)
+
+def test_keys():
+    assert Memo.key([Decimal(1)]) != Memo.key([True])
+    assert Memo.key([Rope("a" * 600, "b" * 600, 1200)]) == Memo.key(["a" * 600 + "b" * 600])
+    assert Memo.key([(Decimal(1), "a")]) == Memo.key([(Decimal(1), "a")])
+    assert Memo.key([[Decimal(1)]]) is None
+    assert Memo.key([(Decimal(1), [])]) is None
+
+def pure(source: str) -> set[str]:
+    grape = Grape()
+    grape.debug = False
+
+    purity = Purity(["len", "sum"])
+    purity.analyze(grape.check(source))
+
+    return {declaration.name.lexeme for declaration in purity.pure if hasattr(declaration, "name")}
+
+def test_purity():
+    source = "\n".join([
+        "fn square(x) do x * x",
+        "fn fib(n) do\n  if n < 2 do\n    n\n  else\n    fib(n - 1) + fib(n - 2)\n  end\nend",
+        "fn even(n) do\n  if n == 0 do\n    true\n  else\n    odd(n - 1)\n  end\nend",
+        "fn odd(n) do\n  if n == 0 do\n    false\n  else\n    even(n - 1)\n  end\nend",
+        "fn total(xs) do sum(xs) + len(xs)",
+        "fn local(x) do\n  y = x + 1\n  y * y\nend",
+        "fn loud(x) do print(x)",
+        "fn shell(x) do $x",
+        "fn apply(f, x) do f(x)",
+        "g = 1",
+        "fn global(x) do x + g",
+        "fn indirect(x) do loud(x)",
+        ""
+    ])
+
+    assert pure(source) == {"square", "fib", "even", "odd", "total", "local"}
+
+def test_functions_that_are_redefined_are_impure():
+    assert pure("fn f(x) do x\nfn f(x) do x + 1\nfn g(x) do f(x)\n") == set()
+
+def test_pure_functions_are_memoized(run, grape):
+    source = "fn fib(n) do\n  if n < 2 do\n    n\n  else\n    fib(n - 1) + fib(n - 2)\n  end\nend\nprint(fib(80))\n"
+
+    # Without a cache, this would take longer than the universe has existed.
+    assert run(source) == ("23416728348467685\n", "")
+
+    memo = list(grape.interpreter.memoizer.memos.values())[0]
+    assert memo.hits > 0
+
+def test_functions_can_be_memoized_explicitly(run):
+    source = "fn noisy(x) do\n  print(x)\n  x\nend\nmemoize(noisy, 1)\nnoisy(1)\nnoisy(1)\nnoisy(2)\nnoisy(1)\n"
+
+    assert run(source) == ("1\n2\n1\n", "")
+
+def test_size_zero_turns_automatic_memoization_off(run, grape):
+    grape.memoSize = 0
+    run("fn square(x) do x * x\nsquare(2)\n")
+
+    assert grape.interpreter.memoizer.memos == {}
+
+def test_profile_shows_hits_and_misses(run, grape):
+    grape.profile = True
+    (out, _) = run("fn square(x) do x * x\nsquare(2)\nsquare(2)\n")
+
+    assert "Memoized functions" in out
+    assert [line.replace("|", "").split() for line in out.splitlines() if line.startswith("square")] == [["square", "1/" + str(grape.memoSize), "1", "1"]]
+
+HELPER = "fn helper(a) do a + 1\nfn f(a) do helper(a)\nprint(f(1))\n"
+
+def test_functions_declared_in_conditionals_replace_global_ones(run):
+    assert run(HELPER + "if true do fn helper(a) do a + 100\nprint(f(1))\n") == ("2\n101\n", "")
+
+def test_functions_declared_in_assignments_replace_global_ones(run):
+    assert run(HELPER + "x = fn helper(a) do a + 100\nprint(f(1))\n") == ("2\n101\n", "")
+
+def test_bindings_in_function_bodies_are_local():
+    assert pure("fn helper(a) do a + 1\nfn g(a) do\n  helper = a\n  helper\nend\nfn f(a) do helper(a)\n") == {"helper", "g", "f"}
+
+def test_functions_destructured_into_replace_global_ones(run):
+    assert run(HELPER + "(helper, q) = (fn(a) do a + 100, 0)\nprint(f(1))\n") == ("2\n101\n", "")
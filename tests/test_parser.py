@@ -0,0 +1,165 @@
+import pytest
+from grape import Grape
+from syntax.ast import *
+
+@pytest.fixture
+def grape() -> Grape:
+    grape = Grape()
+    grape.debug = False
+
+    return grape
+
+# The expression as an s-expression, so the shape of a tree
+# can be compared with a string.
+def sexp(node) -> str:
+    match node:
+        case Literal():
+            return str(node.value.lexeme)
+        case Variable():
+            return node.name.lexeme
+        case Assignment():
+            return "(= " + node.name.lexeme + " " + sexp(node.expression) + ")"
+        case Binary():
+            return "(" + node.operator.lexeme + " " + sexp(node.left) + " " + sexp(node.right) + ")"
+        case Unary():
+            return "(" + node.operator.lexeme + " " + sexp(node.right) + ")"
+        case Grouping():
+            return sexp(node.expression)
+        case Call():
+            return "(call " + " ".join(sexp(item) for item in [node.callee] + node.arguments) + ")"
+        case List():
+            return "[" + " ".join(sexp(item) for item in node.items) + "]"
+        case Tuple():
+            return "(tuple " + " ".join(sexp(item) for item in node.items) + ")"
+        case Block():
+            return "(do " + " ".join(sexp(item) for item in node.expressions) + ")"
+        case Line():
+            return sexp(node.expression)
+        case Conditional():
+            branches = [node.condition, node.ifBranch] + ([node.elseBranch] if node.elseBranch else [])
+            return "(if " + " ".join(sexp(item) for item in branches) + ")"
+        case Named():
+            return "(fn " + node.name.lexeme + " " + sexp(node.body) + ")"
+        case Lambda():
+            return "(fn " + sexp(node.body) + ")"
+
+    raise AssertionError("Unexpected node " + type(node).__name__)
+
+def parse(grape: Grape, source: str) -> list[str]:
+    return [sexp(expression) for expression in grape.check(source)]
+
+def test_precedence(grape):
+    assert parse(grape, "x = a + b * c - -d\n") == ["(= x (- (+ a (* b c)) (- d)))"]
+
+def test_roof_is_right_associative(grape):
+    assert parse(grape, "a ^ b ^ c\n") == ["(^ a (^ b c))"]
+
+def test_logic_binds_loosest(grape):
+    assert parse(grape, "a == 1 or b and not c\n") == ["(or (== a 1) (and b (not c)))"]
+
+def test_calls_and_collections(grape):
+    assert parse(grape, "f(1)(2, [3, (4, 5)])\n") == ["(call (call f 1) 2 [3 (tuple 4 5)])"]
+
+def test_functions_and_conditionals(grape):
+    source = "fn f(a) do\n  if a > 1 do a\n  g(a)\nend\nh = fn(b) do b\n"
+
+    assert parse(grape, source) == ["(fn f (do (if (> a 1) a) (call g a)))", "(= h (fn b))"]
+
+def test_block_with_else(grape):
+    source = "if x do\n  1\nelse\n  2\nend\n"
+
+    assert parse(grape, source) == ["(if x (do 1) (do 2))"]
+
+# Lexing a huge source takes a while, so the tokens of the deeply nested
+# tests are put together out of the tokens of the repeated parts.
+def tokens(grape: Grape, *parts: tuple[str, int]) -> list[Token]:
+    tokens = []
+
+    for (source, count) in parts:
+        tokens += grape.lex(source)[:-1] * count
+
+    return tokens + [Token(TokenType.EOF, "", None, 0, 0, 0)]
+
+def test_deeply_nested_blocks(grape):
+    depth = 100000
+    ast = grape.analyze(tokens(grape, ("do\n", depth), ("1\n", 1), ("end\n", depth)))
+
+    node = ast[0]
+
+    for _ in range(depth - 1):
+        node = node.expressions[0]
+
+    assert sexp(node) == "(do 1)"
+
+def test_deeply_nested_groupings(grape):
+    depth = 100000
+    ast = grape.analyze(tokens(grape, ("(", depth), ("1", 1), (")", depth), ("\n", 1)))
+
+    node = ast[0]
+
+    for _ in range(depth):
+        node = node.expression
+
+    assert sexp(node) == "1"
+
+def test_long_binary_chain(grape):
+    length = 100000
+    ast = grape.analyze(tokens(grape, ("1 +", length - 1), ("1\n", 1)))
+
+    node = ast[0]
+    count = 1
+
+    while isinstance(node, Binary):
+        node = node.left
+        count += 1
+
+    assert count == length
+
+def test_large_list(grape):
+    ast = grape.analyze(tokens(grape, ("[", 1), ("1,", 99999), ("1]\n", 1)))
+
+    assert len(ast[0].items) == 100000
+
+# The errors that were reported, as (line, message) pairs.
+def errors(capsys) -> list[tuple[int, str]]:
+    reported = []
+
+    for line in capsys.readouterr().err.splitlines():
+        (position, message) = line.split("]: ")
+        reported.append((int(position.split(":")[1]), message.split("Syntax error: ")[1]))
+
+    return reported
+
+def test_every_error_is_reported_in_one_pass(grape, capsys):
+    source = "x = 1 +\nfn f(a) do\n  a *\n  a ]\nend\nprint(x))\ny = 2\n"
+
+    assert grape.check(source) is None
+    assert errors(capsys) == [(1, "Unexpected end of line."), (3, "Unexpected end of line."), (4, "Unexpected ']'."), (6, "Unexpected ')'.")]
+
+def test_lex_and_parse_errors_are_reported_together(grape, capsys):
+    source = "x = 1 # a comment\ny = 2 +\nz = 3 ~ 4\nw = x\n"
+
+    assert grape.check(source) is None
+    assert errors(capsys) == [(1, "Unexpected '#'."), (3, "Unexpected '~'."), (2, "Unexpected end of line.")]
+
+def test_parts_that_cant_be_lexed_become_error_tokens(grape, capsys):
+    tokens = grape.lex("a # b\nc\n")
+
+    assert [(token.type, token.lexeme) for token in tokens] == [
+        (TokenType.IDENTIFIER, "a"), (TokenType.ERROR, "# b"), (TokenType.NEWLINE, "\n"),
+        (TokenType.IDENTIFIER, "c"), (TokenType.NEWLINE, "\n"), (TokenType.EOF, "")
+    ]
+    assert grape.errorHandler.hadError
+
+def test_unterminated_strings_end_at_the_end_of_their_line(grape, capsys):
+    source = "y = ]\nprint(\"abc)\nz = 1 +\nw = )\nv = 2\n"
+
+    assert grape.check(source) is None
+    assert errors(capsys) == [(2, "Unterminated string."), (1, "Unexpected ']'."), (3, "Unexpected end of line."), (4, "Unexpected ')'.")]
+
+    tokens = grape.lex("a = \"b\nc\n")
+    assert [(token.type, token.lexeme) for token in tokens][2:5] == [(TokenType.ERROR, "\"b"), (TokenType.NEWLINE, "\n"), (TokenType.IDENTIFIER, "c")]
+
+def test_end_of_file(grape, capsys):
+    assert grape.check("fn f(a) do\n  a\n") is None
+    assert errors(capsys) == [(3, "Unexpected end of file.")]
@@ -0,0 +1,77 @@
+from decimal import Decimal
+from processes import Nodes, Pid
+
+def test_messages(run):
+    source = "fn pong() do\n  (sender, n) = receive()\n  send(sender, n * 2)\nend\n" \
+        "p = spawn(pong)\nsend(p, (self(), 21))\nprint(receive())\n"
+
+    assert run(source) == ("42\n", "")
+
+def test_processes_run_until_they_wait(run):
+    source = "fn say(a) do print(a)\nspawn(say, 1)\nspawn(say, 2)\nprint(0)\n"
+
+    # Spawning doesn't give up the turn, the processes run
+    # once the main process has ended.
+    assert run(source) == ("0\n1\n2\n", "")
+
+def test_errors_only_end_their_process(run):
+    source = "fn boom() do 1 / 0\nfn square(parent, n) do send(parent, n * n)\n" \
+        "spawn(boom)\nspawn(square, self(), 3)\nspawn(square, self(), 4)\nprint(receive() + receive())\n"
+
+    (out, err) = run(source)
+
+    assert out == "25\n"
+    assert "Runtime error at '/': Division by zero." in err
+
+def test_waiting_forever_is_an_error(run):
+    (_, err) = run("fn wait() do receive()\nspawn(wait)\nreceive()\n")
+
+    assert "Every process is waiting for a message." in err
+
+def test_messages_to_processes_that_ended_are_dropped(run, grape):
+    source = "fn once(parent) do send(parent, 1)\np = spawn(once, self())\nreceive()\nsend(p, 2)\nprint(3)\n"
+
+    assert run(source) == ("3\n", "")
+    assert len(grape.interpreter.scheduler.processes) == 1
+
+def test_only_plain_values_go_to_other_nodes():
+    assert Nodes.portable([Decimal(1), "a", (True, None, Pid(1, 0, 1))])
+    assert not Nodes.portable([Decimal(1), lambda: 1])
+
+def test_processes_run_on_other_nodes(run, grape):
+    grape.nodes = 2
+
+    source = "fn square(parent, n) do send(parent, (self(), n * n))\n" \
+        "spawn(square, self(), 3)\nspawn(square, self(), 4)\n" \
+        "(a, x) = receive()\n(b, y) = receive()\nprint(x + y)\n"
+
+    assert run(source) == ("25\n", "")
+
+    values = grape.interpreter.globals.values
+    assert {values["a"].node, values["b"].node} == {1, 2}
+
+def test_local_functions_stay_on_this_node(run, grape):
+    grape.nodes = 2
+
+    source = "fn outer(parent) do\n  fn inner(p) do send(p, self())\n  spawn(inner, parent)\nend\n" \
+        "spawn(outer, self())\nwhere = receive()\n"
+
+    assert run(source) == ("", "")
+    assert grape.interpreter.globals.values["where"].node != 0
+
+# The main node waits for the processes on the others before it stops them.
+def test_what_processes_on_other_nodes_print_is_not_lost(grape, capfd):
+    grape.nodes = 2
+    grape.run("fn show(n) do print(n)\nspawn(show, 1)\nspawn(show, 2)\n")
+
+    assert sorted(capfd.readouterr().out.split()) == ["1", "2"]
+
+def test_nodes_run_with_the_settings_of_the_main_node(grape):
+    grape.nodes = 2
+    grape.memoSize = 7
+    grape.profile = True
+
+    settings = Nodes(grape.settings()).settings
+
+    assert (settings["engine"], settings["memoSize"]) == (grape.engine, 7)
+    assert (settings["nodes"], settings["profile"], settings["debug"]) == (0, False, False)
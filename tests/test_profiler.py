@@ -0,0 +1,74 @@
+import json
+import os
+import subprocess
+import sys
+from conftest import ROOT
+from profiler import Sampler
+from syntax.ast import *
+
+FIB = "fn fib(n) do\n  if n < 2 do\n    n\n  else\n    fib(n - 1) + fib(n - 2)\n  end\nend\n"
+
+# Runs the source with the sampling profiler, and returns the profile.
+def profile(run, grape, tmp_path, source: str, name: str = "profile.txt") -> str:
+    path = str(tmp_path / name)
+
+    grape.memoSize = 0
+    grape.sampleProfile = path
+
+    assert run(source)[1] == ""
+
+    with open(path) as file:
+        return file.read()
+
+def test_collapsed_stacks(run, grape, tmp_path):
+    lines = profile(run, grape, tmp_path, FIB + "fn main() do fib(20)\nmain()\n").splitlines()
+
+    assert any(line.startswith("main (unknown:8:8);fib (unknown:1:7)") for line in lines)
+
+    for line in lines:
+        (stack, count) = line.rsplit(" ", 1)
+        frames = stack.split(";")
+
+        assert int(count) > 0
+
+        # Samples taken before main is called are outside of any function
+        if frames != [Sampler.PROGRAM]:
+            assert frames[0] == "main (unknown:8:8)"
+            assert set(frames[1:]) <= {"fib (unknown:1:7)"}
+
+def test_speedscope(run, grape, tmp_path):
+    data = json.loads(profile(run, grape, tmp_path, FIB + "fib(20)\n", "profile.json"))
+
+    frames = data["shared"]["frames"]
+    sampled = data["profiles"][0]
+
+    assert {"name": "fib", "file": "unknown", "line": 1, "col": 7} in frames
+    assert sampled["type"] == "sampled"
+    assert len(sampled["samples"]) == len(sampled["weights"]) > 0
+    assert all(0 <= index < len(frames) for stack in sampled["samples"] for index in stack)
+    assert abs(sampled["endValue"] - sum(sampled["weights"])) < 1e-9
+
+def test_processes_are_sampled_on_their_own_thread(run, grape, tmp_path):
+    lines = profile(run, grape, tmp_path, FIB + "fn work() do fib(20)\nspawn(work)\n").splitlines()
+
+    assert any(line.startswith("work (unknown:8:8);fib") for line in lines)
+
+def test_functions_are_found_at_their_name_or_first_parameter():
+    name = Token(TokenType.IDENTIFIER, "f", None, 3, 5, 0)
+    parameter = Token(TokenType.IDENTIFIER, "a", None, 4, 9, 0)
+
+    assert Sampler.position(Named(name, [], None)) is name
+    assert Sampler.position(Lambda([parameter], None)) is parameter
+    assert Sampler.position(Lambda([], None)) is None
+    assert Sampler.position(None) is None
+
+def test_command_line(tmp_path):
+    source = tmp_path / "fib.gr"
+    source.write_text(FIB + "fib(18)\n")
+    path = tmp_path / "profile.json"
+
+    process = subprocess.run([sys.executable, os.path.join(ROOT, "src", "grape.py"), "--memo-size=0", "--sample-profile=" + str(path), str(source)],
+        capture_output=True, text=True, timeout=60)
+
+    assert process.returncode == 0
+    assert json.loads(path.read_text())["name"] == "fib.gr"
@@ -0,0 +1,62 @@
+from decimal import Decimal
+import pytest
+from ranges import Range
+
+def test_ranges_are_calculated():
+    numbers = Range.of(Decimal(0), Decimal(10) ** 20, Decimal(3))
+
+    assert numbers.length == 33333333333333333334
+    assert numbers[-1] == Decimal(10) ** 20 - 1
+    assert Decimal(3) * 10 ** 15 in numbers
+    assert Decimal(10) ** 15 not in numbers
+    assert numbers.take(3) == Range.of(Decimal(0), Decimal(9), Decimal(3))
+
+# Whole numbers aren't rounded to the 28 digits of a Decimal.
+def test_long_ranges_are_exact():
+    big = 10 ** 40
+    numbers = Range.of(Decimal(1), Decimal(big + 2), Decimal(1))
+
+    assert numbers.length == big + 1
+    assert numbers[big] == Decimal(big + 1)
+    assert Decimal(big + 1) in numbers
+    assert Decimal(big + 3) not in numbers
+    assert numbers.stop() == Decimal(big + 2)
+    assert Range.of(Decimal(big), Decimal(big + 3), Decimal(1)).sum() == Decimal(3 * big + 3)
+    assert list(Range.of(Decimal(big), Decimal(big + 2), Decimal(1))) == [Decimal(big), Decimal(big + 1)]
+
+def test_sum_is_the_series():
+    assert Range.of(Decimal(1), Decimal(101), Decimal(1)).sum() == 5050
+    assert Range.of(Decimal(0), Decimal(10) ** 20, Decimal(1)).sum() == (Decimal(10) ** 20 - 1) * Decimal(10) ** 20 / 2
+
+def test_empty_and_reversed_ranges():
+    assert list(Range.of(Decimal(5), Decimal(0), Decimal(-2))) == [5, 3, 1]
+    assert len(Range.of(Decimal(5), Decimal(0), Decimal(1))) == 0
+    assert Range.of(Decimal(5), Decimal(0), Decimal(1)) == Range.of(Decimal(1), Decimal(1), Decimal(3))
+
+def test_indices_out_of_range():
+    numbers = Range.of(Decimal(0), Decimal(4), Decimal(1))
+
+    with pytest.raises(IndexError):
+        numbers[4]
+
+    with pytest.raises(IndexError):
+        numbers[-5]
+
+def test_ranges(run):
+    source = "r = range(0, 10, 2)\n" \
+        "print(r)\n" \
+        "print(len(r), r[1], r[-1], 4 in r, 5 in r, 10 in r)\n" \
+        "print(sum(range(1, 101, 1)))\n" \
+        "print(take(r, 2))\n" \
+        "print(range(0, 1, 0.25) |> collect)\n" \
+        "print(array(range(0, 3, 1)))\n" \
+        "print(len(range(0, 10 ^ 30, 1)))\n"
+
+    assert run(source) == ("range(0, 10, 2)\n5 2 8 true false false\n5050\nrange(0, 4, 2)\n"
+        "[0, 0.25, 0.5, 0.75]\narray([0, 1, 2])\n1000000000000000000000000000000\n", "")
+
+def test_range_errors(run):
+    assert "The step of a range can't be 0." in run("range(0, 1, 0)\n")[1]
+
+def test_index_errors(run):
+    assert "Index out of range." in run("r = range(0, 10, 2)\nr[5]\n")[1]
@@ -0,0 +1,65 @@
+import pickle
+import pytest
+from records import FieldCache, Shape, Struct
+
+def test_records_with_the_same_fields_share_a_shape():
+    assert Shape.of(("a", "b")) is Shape.of(("a", "b"))
+    assert Shape.of(("a", "b")) is not Shape.of(("b", "a"))
+    assert Shape.of(("a", "b")).slots == {"a": 0, "b": 1}
+
+def test_fields_are_read_from_their_slot():
+    record = Struct(Shape.of(("a", "b")), [1, 2])
+
+    assert (record.get("a"), record.get("b")) == (1, 2)
+
+    with pytest.raises(KeyError):
+        record.get("c")
+
+def test_order_of_fields_does_not_matter_for_equality():
+    assert Struct(Shape.of(("a", "b")), [1, 2]) == Struct(Shape.of(("b", "a")), [2, 1])
+    assert Struct(Shape.of(("a", "b")), [1, 2]) != Struct(Shape.of(("a", "c")), [1, 2])
+
+def test_records_sent_to_another_process_keep_the_interned_shape():
+    record = pickle.loads(pickle.dumps(Struct(Shape.of(("a", "b")), [1, 2])))
+
+    assert record.shape is Shape.of(("a", "b"))
+
+def test_cache_remembers_the_last_shape():
+    cache = FieldCache("b")
+
+    assert cache.miss(Struct(Shape.of(("a", "b")), [1, 2])) == 2
+    assert (cache.shape, cache.slot) == (Shape.of(("a", "b")), 1)
+
+    assert cache.miss(Struct(Shape.of(("b",)), [3])) == 3
+    assert (cache.shape, cache.slot) == (Shape.of(("b",)), 0)
+
+def test_fields(run):
+    source = "opts = {start_value: 100, max_t: 10, dt: 1}\n" \
+        "print(opts.max_t + opts.dt)\n" \
+        "print(opts)\n" \
+        "print({a: 1, b: 2} == {b: 2, a: 1})\n" \
+        "interest = {index: 3}\n" \
+        "print(interest.index)\n"
+
+    assert run(source) == ("11\n{start_value: 100, max_t: 10, dt: 1}\ntrue\n3\n", "")
+
+def test_one_place_reads_records_of_different_shapes(run):
+    source = "fn x(r) do r.x\nprint(x({x: 1}))\nprint(x({y: 2, x: 3}))\nprint(x({x: 4}))\n"
+
+    assert run(source) == ("1\n3\n4\n", "")
+
+def test_field_errors(run):
+    (out, err) = run("r = {a: 1}\nprint(r.a)\nprint(r.b)\n")
+
+    assert out == "1\n"
+    assert "Runtime error at 'b': Undefined field." in err
+
+def test_only_records_have_fields(run):
+    (out, err) = run("x = 1\nprint(x.a)\n")
+
+    assert "Runtime error at 'a': Only records have fields." in err
+
+def test_fields_can_only_be_given_once(run):
+    (out, err) = run("r = {a: 1, a: 2}\n")
+
+    assert "Syntax error: Duplicate field 'a'." in err
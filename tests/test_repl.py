@@ -0,0 +1,71 @@
+from repl import Repl
+
+def session(monkeypatch, grape, lines: list[str]) -> list[str]:
+    entries = iter(lines)
+    prompts = []
+
+    def read(prompt: str) -> str:
+        prompts.append(prompt)
+
+        try:
+            return next(entries)
+
+        except StopIteration:
+            raise EOFError
+
+    monkeypatch.setattr("builtins.input", read)
+    Repl(grape).start()
+
+    return prompts
+
+def test_values_are_printed(monkeypatch, capsys, grape):
+    session(monkeypatch, grape, ["1 + 2", "[1, \"a\"]"])
+
+    assert capsys.readouterr().out == "3\n[1, a]\n\n"
+
+def test_definitions_are_kept_between_entries(monkeypatch, capsys, grape):
+    session(monkeypatch, grape, ["x = 20", "fn double(a) do a * 2", "double(x) + 2"])
+
+    assert capsys.readouterr().out.splitlines()[-2] == "42"
+
+def test_blocks_continue_on_the_next_lines(monkeypatch, capsys, grape):
+    prompts = session(monkeypatch, grape, ["fn f(a) do", "  b = a + 1", "  b * 2", "end", "f(1)"])
+
+    assert prompts == [Repl.PROMPT, Repl.CONTINUATION, Repl.CONTINUATION, Repl.CONTINUATION, Repl.PROMPT, Repl.PROMPT]
+    assert capsys.readouterr().out.splitlines()[-2] == "4"
+
+def test_errors_do_not_end_the_session(monkeypatch, capsys, grape):
+    session(monkeypatch, grape, ["x = 1", "x +", "y", "x + 1"])
+
+    captured = capsys.readouterr()
+
+    assert "Syntax error" in captured.err
+    assert "Undefined variable" in captured.err
+    assert captured.out.splitlines()[-2] == "2"
+
+def test_errors_are_reported_at_the_line_of_the_session(monkeypatch, capsys, grape):
+    session(monkeypatch, grape, ["x = 1", "do", "  y", "end"])
+
+    assert "[repl:3:" in capsys.readouterr().err
+
+def test_entries_that_cant_be_lexed_report_their_other_errors_as_well(monkeypatch, capsys, grape):
+    session(monkeypatch, grape, ["x = 1", "y = ) # 2", "x + 1"])
+
+    captured = capsys.readouterr()
+
+    assert captured.err.count("Syntax error") == 2
+    assert captured.out.splitlines()[-2] == "2"
+
+def test_open_entries_that_cant_be_lexed_are_dropped(monkeypatch, capsys, grape):
+    prompts = session(monkeypatch, grape, ["fn f(a) do ~", "1"])
+
+    assert prompts == [Repl.PROMPT, Repl.PROMPT, Repl.PROMPT]
+    assert capsys.readouterr().err.count("Syntax error") == 1
+
+def test_unterminated_strings_do_not_end_the_session(monkeypatch, capsys, grape):
+    session(monkeypatch, grape, ["print(\"a)", "1 + 1"])
+
+    captured = capsys.readouterr()
+
+    assert captured.err.count("Unterminated string") == 1
+    assert captured.out.splitlines()[-2] == "2"
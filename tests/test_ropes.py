@@ -0,0 +1,42 @@
+from ropes import Rope
+
+# A rope of 2048 characters
+LONG = "fn double(s, n) do\n  if n > 0 do\n    double(s + s, n - 1)\n  else\n    s\n  end\nend\n" \
+    "r = double(\"ab\", 10)\n"
+
+def test_short_strings_stay_strings():
+    assert Rope.concat("a", "b") == "ab"
+    assert type(Rope.concat("a", "b")) is str
+
+def test_long_strings_become_ropes():
+    rope = Rope.concat("a" * 600, "b" * 600)
+
+    assert type(rope) is Rope
+    assert (len(rope), rope.flat) == (1200, None)
+    assert rope == "a" * 600 + "b" * 600
+    assert hash(rope) == hash("a" * 600 + "b" * 600)
+
+def test_short_pieces_are_merged_into_the_ends():
+    rope = Rope.concat(Rope.concat("a" * 600, "b" * 600), "c")
+    rope = Rope.concat("d", rope)
+
+    assert (rope.left, rope.right) == ("d" + "a" * 600, "b" * 600 + "c")
+
+def test_deep_ropes_are_put_together_without_recursion():
+    rope = "a" * 1024
+
+    for _ in range(100000):
+        rope = Rope.concat(rope, Rope.concat("b" * 600, "c" * 600))
+
+    assert str(rope).count("b") == 60000000
+
+def test_ropes_in_strings(run):
+    source = LONG + "print(\"abab\" in r, \"ba\" in r, \"aa\" in r)\n" \
+        "print(r in r, r in \"ab\", (r + \"c\") in (\"x\" + r + \"cd\"))\n"
+
+    assert run(source) == ("true true false\ntrue false true\n", "")
+
+def test_ropes_are_strings(run):
+    source = LONG + "print(len(r), r[1], r == double(\"abab\", 9), r == \"ab\")\n"
+
+    assert run(source) == ("2048 b true false\n", "")
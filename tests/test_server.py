@@ -0,0 +1,74 @@
+import os
+import subprocess
+import sys
+import time
+import pytest
+from conftest import ROOT
+
+GRAPE = os.path.join(ROOT, "src", "grape.py")
+CLIENT = os.path.join(ROOT, "src", "client.py")
+
+# A server that runs with the given options, on a socket of its own.
+@pytest.fixture
+def serve(tmp_path):
+    servers = []
+
+    def start(*options: str) -> str:
+        path = str(tmp_path / ("grape" + str(len(servers)) + ".sock"))
+        servers.append(subprocess.Popen([sys.executable, GRAPE, *options, "serve", path], stdout=subprocess.DEVNULL))
+
+        for _ in range(200):
+            if os.path.exists(path): return path
+            time.sleep(0.05)
+
+        raise AssertionError("The server did not start")
+
+    yield start
+
+    for server in servers:
+        server.terminate()
+        server.wait()
+
+def request(socket: str, command: str, path: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, CLIENT, command, str(path), socket], capture_output=True, text=True, timeout=30)
+
+def program(tmp_path, source: str) -> str:
+    path = tmp_path / "program.gr"
+    path.write_text(source)
+
+    return path
+
+def test_run_streams_the_output(serve, tmp_path):
+    socket = serve()
+    result = request(socket, "run", program(tmp_path, "print(1 + 2)\n"))
+
+    assert (result.returncode, result.stdout) == (0, "3\n")
+
+def test_check_reports_errors(serve, tmp_path):
+    socket = serve()
+    result = request(socket, "check", program(tmp_path, "x = 1 +\n"))
+
+    assert result.returncode == 65
+    assert "Syntax error" in result.stderr
+
+def test_files_are_parsed_again_when_they_change(serve, tmp_path):
+    socket = serve()
+    path = program(tmp_path, "print(1)\n")
+
+    assert request(socket, "run", path).stdout == "1\n"
+
+    path.write_text("print(22)\n")
+    assert request(socket, "run", path).stdout == "22\n"
+
+def test_options_of_serve_are_used(serve, tmp_path):
+    socket = serve("--profile", "--memo-size=7")
+    result = request(socket, "run", program(tmp_path, "fn f(a) do a * 2\nprint(f(1))\n"))
+
+    assert "Memoized functions" in result.stdout
+    assert "/7" in result.stdout
+
+def test_output_of_processes_goes_to_the_client(serve, tmp_path):
+    socket = serve("--engine=closures")
+    result = request(socket, "run", program(tmp_path, "fn greet(a) do print(a)\nspawn(greet, 5)\n"))
+
+    assert (result.returncode, result.stdout) == (0, "5\n")
@@ -0,0 +1,68 @@
+import threading
+from shell import Shell
+
+# A command that says it started, and waits until the other one did as
+# well. It only succeeds when both run at the same time, which doesn't
+# depend on how fast the machine is.
+def meet(directory, me: str, other: str, tries: int = 100) -> str:
+    here = str(directory / me)
+    there = str(directory / other)
+
+    return "$\"touch " + here + "; for i in $(seq " + str(tries) + "); do [ -f " + there + " ] && break; sleep 0.05; done; " \
+        "[ -f " + there + " ] && echo " + me + "\""
+
+def test_output_without_trailing_newlines(run):
+    assert run("print($\"printf 'a\\n\\n'\")\n") == ("a\n", "")
+
+def test_items_run_at_the_same_time(run, tmp_path):
+    source = "print([" + meet(tmp_path, "a", "b") + ", " + meet(tmp_path, "b", "a") + "])\n"
+
+    assert run(source) == ("[a, b]\n", "")
+
+def test_arguments_run_at_the_same_time(run, tmp_path):
+    source = "fn join(a, b) do a + b\nprint(join(" + meet(tmp_path, "a", "b") + ", " + meet(tmp_path, "b", "a") + "))\n"
+
+    assert run(source) == ("ab\n", "")
+
+def test_piped_values_run_with_the_arguments(run, tmp_path):
+    source = "fn join(a, b) do a + b\nprint(" + meet(tmp_path, "a", "b") + " |> join(" + meet(tmp_path, "b", "a") + "))\n"
+
+    assert run(source) == ("ab\n", "")
+
+# Commands can depend on each other through the files they write
+def test_statements_run_in_order(run, tmp_path):
+    directory = str(tmp_path / "d")
+    source = "$\"mkdir " + directory + "\"\nx = $\"touch " + directory + "/f; echo done\"\nprint(x)\n"
+
+    assert run(source) == ("done\n", "")
+
+def test_limit_holds_for_all_commands(run, grape, tmp_path):
+    grape.execLimit = 1
+
+    (_, err) = run("print([" + meet(tmp_path, "a", "b", 20) + ", " + meet(tmp_path, "b", "a", 20) + "])\n")
+
+    assert "Command exited with status 1." in err
+
+def test_failures(run):
+    (_, err) = run("x = $\"echo oops >&2; exit 3\"\n")
+
+    assert "Runtime error at '$': Command exited with status 3: oops." in err
+
+def test_only_strings_are_commands(run):
+    assert "Can only run strings as commands." in run("$1\n")[1]
+
+def test_commands_can_be_started_from_any_thread():
+    shell = Shell(2)
+    commands = []
+
+    def start(i: int):
+        commands.append(shell.start("echo " + str(i)))
+
+    loops = sum(thread.name == "grape-shell" for thread in threading.enumerate())
+    threads = [threading.Thread(target=start, args=(i,)) for i in range(8)]
+
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+
+    assert sorted(command.result() for command in commands) == [str(i) for i in range(8)]
+    assert sum(thread.name == "grape-shell" for thread in threading.enumerate()) == loops + 1
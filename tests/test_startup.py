@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+from conftest import ROOT
+from utils import Lazy
+
+GRAPE = os.path.join(ROOT, "src", "grape.py")
+SMALL = os.path.join(ROOT, "bench", "small.gr")
+
+# The modules that are loaded after running the CLI with the arguments.
+# -X importtime doesn't show modules that importlib imports, so the lazy
+# ones are looked up in sys.modules instead.
+def imported(*arguments: str) -> set[str]:
+    script = "import os, runpy, sys\n" \
+        "sys.argv = sys.argv[1:]\n" \
+        "sys.path.insert(0, os.path.dirname(sys.argv[0]))\n" \
+        "runpy.run_path(sys.argv[0], run_name='__main__')\n" \
+        "print(' '.join(sys.modules), file=sys.stderr)\n"
+
+    process = subprocess.run([sys.executable, "-c", script, GRAPE, *arguments], capture_output=True, text=True, timeout=60)
+    assert process.returncode == 0
+
+    return set(process.stderr.split())
+
+def test_help_only_imports_the_cli():
+    modules = imported("--help")
+
+    assert modules.isdisjoint({"parser", "decimal", "interpreter", "compiler", "numpy", "asyncio", "multiprocessing"})
+
+def test_check_does_not_import_the_engines():
+    modules = imported("check", SMALL)
+
+    assert "parser" in modules
+    assert modules.isdisjoint({"interpreter", "compiler", "numpy", "asyncio", "multiprocessing", "json"})
+
+def test_lazy_modules_are_imported_on_first_use():
+    module = Lazy("colorsys")
+
+    assert module.module is None
+    assert module.rgb_to_hsv(0, 0, 0) == (0, 0, 0)
+    assert module.module is sys.modules["colorsys"]
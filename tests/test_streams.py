@@ -0,0 +1,51 @@
+from decimal import Decimal
+from arrays import NumericArray
+from streams import Stream
+
+LOUD = "fn loud(x) do\n  print(x)\n  x * 2\nend\n"
+
+def test_stages_are_added_to_one_stream():
+    stream = Stream.of([1, 2, 3]).then(Stream.MAP, lambda x: x * 2).then(Stream.FILTER, lambda x: x > 2)
+
+    assert stream.source == [1, 2, 3]
+    assert len(stream.stages) == 2
+    assert list(stream) == [4, 6]
+
+def test_items_after_a_full_take_are_not_read():
+    read = []
+
+    def source():
+        for item in range(100):
+            read.append(item)
+            yield item
+
+    stream = Stream(source(), ((Stream.FILTER, lambda x: x % 2 == 1), (Stream.TAKE, 3)))
+
+    assert list(stream) == [1, 3, 5]
+    assert read == [0, 1, 2, 3, 4, 5]
+
+def test_pipelines(run):
+    source = "print([1, 2, 3] |> map(fn(x) do x + 1) |> collect)\n" \
+        "print([1, 2, 3, 4] |> filter(fn(x) do x > 2) |> collect)\n" \
+        "print([1, 2, 3] |> take(0) |> collect)\n"
+
+    assert run(source) == ("[2, 3, 4]\n[3, 4]\n[]\n", "")
+
+def test_items_flow_through_one_at_a_time(run):
+    source = LOUD + "fn big(x) do x > 4\n" \
+        "print(range(0, 1000000000, 1) |> map(loud) |> filter(big) |> take(2) |> collect)\n"
+
+    assert run(source) == ("0\n1\n2\n3\n4\n[6, 8]\n", "")
+
+def test_streams_run_when_they_are_used(run):
+    source = LOUD + "s = [1, 2] |> map(loud)\nprint(\"made\")\nprint(collect(s))\n"
+
+    assert run(source) == ("made\n1\n2\n[2, 4]\n", "")
+
+def test_arrays_are_streamed_as_numbers():
+    assert list(Stream.of(NumericArray.of([Decimal(1), Decimal("0.5")]))) == [Decimal(1), Decimal("0.5")]
+
+def test_only_collections_are_streamed(run):
+    (_, err) = run(LOUD + "print(5 |> map(loud))\n")
+
+    assert "Can only stream lists, tuples, arrays, ranges and streams." in err
@@ -0,0 +1,85 @@
+import json
+import os
+import struct
+import subprocess
+import sys
+import pytest
+from decimal import Decimal
+from conftest import ROOT
+from grape import Grape
+from sweep import Sweep, Worker, Columns
+
+GRAPE = os.path.join(ROOT, "src", "grape.py")
+
+MODEL = "fn main(a, b) do\n  if b == 0 do\n    a / b\n  else\n    a * b\n  end\nend\n"
+
+def sweep(tmp_path, grid: dict, *options: str) -> subprocess.CompletedProcess:
+    (tmp_path / "model.gr").write_text(MODEL)
+    (tmp_path / "grid.json").write_text(json.dumps(grid))
+
+    return subprocess.run([sys.executable, GRAPE, "sweep", str(tmp_path / "model.gr"), "--grid", str(tmp_path / "grid.json"), *options],
+        capture_output=True, text=True, timeout=120)
+
+def test_every_combination_is_evaluated(tmp_path):
+    result = sweep(tmp_path, {"a": [1, 2, 3], "b": [1, 2]}, "--workers", "2")
+    rows = [json.loads(line) for line in result.stdout.splitlines()]
+
+    assert result.returncode == 0
+    assert sorted((row["a"], row["b"], row["result"]) for row in rows) == \
+        [(1, 1, 1), (1, 2, 2), (2, 1, 2), (2, 2, 4), (3, 1, 3), (3, 2, 6)]
+
+def test_failed_combinations_are_reported_with_the_others(tmp_path):
+    result = sweep(tmp_path, {"a": [1], "b": [0, 1]}, "--engine=closures")
+    rows = sorted((json.loads(line) for line in result.stdout.splitlines()), key=lambda row: row["b"])
+
+    assert result.returncode == 65
+    assert "Division by zero" in rows[0]["error"]
+    assert rows[1]["result"] == 1
+
+def test_columns(tmp_path):
+    output = tmp_path / "results.bin"
+    result = sweep(tmp_path, {"a": [2], "b": [0, 3]}, "--format", "columns", "--output", str(output))
+
+    data = output.read_bytes()
+    header = Columns.MAGIC + (json.dumps(["a", "b", "result"]) + "\n").encode()
+
+    assert result.returncode == 65
+    assert data.startswith(header)
+
+    rows = struct.unpack("<I", data[len(header):len(header) + 4])[0]
+    columns = struct.unpack("<" + str(rows * 3) + "d", data[len(header) + 4:])
+
+    assert rows == 2
+    assert columns[4] != columns[4] and columns[5] == 6
+
+def test_outputs_that_cant_be_opened_are_reported(tmp_path):
+    result = sweep(tmp_path, {"a": [1], "b": [1]}, "--output", str(tmp_path / "missing" / "results.json"))
+
+    assert result.returncode == 65
+    assert "No such file or directory: '" + str(tmp_path / "missing" / "results.json") + "'" in result.stderr
+    assert "Traceback" not in result.stderr
+
+def test_invalid_options():
+    with pytest.raises(ValueError, match="Missing '--grid'"):
+        Sweep.options(["--workers", "2"])
+
+    with pytest.raises(ValueError, match="Invalid value for '--workers'"):
+        Sweep.options(["--grid", "grid.json", "--workers", "0"])
+
+# Workers use the options that were given to the CLI.
+def test_workers_are_configured_like_the_cli(monkeypatch):
+    monkeypatch.setattr(sys, "stdout", sys.stdout)
+
+    grape = Grape()
+    grape.debug = False
+    grape.engine = "closures"
+    grape.memoSize = 7
+    grape.execLimit = 3
+    grape.nodes = 2
+    grape.sampleProfile = "profile.json"
+
+    Worker.start(grape.check(MODEL), grape.settings(), "main")
+
+    assert (Worker.grape.engine, Worker.grape.memoSize, Worker.grape.execLimit, Worker.grape.nodes) == ("closures", 7, 3, 2)
+    assert Worker.grape.sampleProfile is None
+    assert Worker.evaluate([(Decimal(3), Decimal(4))]) == [((3, 4), 12, None)]